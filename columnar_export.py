@@ -0,0 +1,175 @@
+import argparse
+import datetime
+import glob
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+
+from corpus import corpus_files, iter_releases
+
+MEMBER_TYPE = pa.dictionary(pa.int8(), pa.string())
+TAG_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("member", MEMBER_TYPE),
+    ("position", pa.int32()),
+    ("title", pa.string()),
+    ("date_raw", pa.string()),
+    ("date", pa.date32()),
+    ("year", pa.int16()),
+    ("date_status", pa.dictionary(pa.int8(), pa.string())),
+    ("subtitle", pa.string()),
+    ("tags", pa.list_(TAG_TYPE)),
+    ("content", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("member", pa.string()), ("year", pa.int16())]), flavor="hive")
+
+
+def record_tags(record):
+    # Greene's Tags, AOC's Issues and Pocan's PR Tag all end up as one tag list
+    tags = []
+    for field in ("tags", "issues", "pr_tag"):
+        value = record.get(field) or ""
+        if value.startswith("No "):
+            continue
+        tags.extend(tag.strip() for tag in value.split(",") if tag.strip())
+    return tags
+
+
+def record_date(record):
+    # A year-only date is stored as January 1st of its year; date_status
+    # records the precision so readers can tell it from a real January 1st
+    date_iso = record.get("date_iso")
+    if record.get("date_status") == "parsed":
+        return datetime.date.fromisoformat(date_iso)
+    if record.get("date_status") == "year_only":
+        return datetime.date(int(date_iso), 1, 1)
+    return None
+
+
+def records_to_table(records):
+    columns = {name: [] for name in SCHEMA.names}
+    for record in records:
+        date_iso = record.get("date_iso")
+        columns["id"].append(record["id"])
+        columns["member"].append(record["member"])
+        columns["position"].append(record["index"])
+        columns["title"].append(record.get("title"))
+        columns["date_raw"].append(record.get("date"))
+        columns["date"].append(record_date(record))
+        columns["year"].append(int(date_iso[:4]) if date_iso else None)
+        columns["date_status"].append(record.get("date_status"))
+        columns["subtitle"].append(record.get("subtitle"))
+        columns["tags"].append(record_tags(record))
+        columns["content"].append(record.get("content"))
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def existing_ids(output_directory):
+    arrow_files = glob.glob(os.path.join(output_directory, "arrow", "*.arrow"))
+    if not arrow_files:
+        return set()
+    return set(read_arrow(output_directory).column("id").to_pylist())
+
+
+def export(records, output_directory):
+    os.makedirs(os.path.join(output_directory, "arrow"), exist_ok=True)
+    seen = existing_ids(output_directory)
+    table = records_to_table(record for record in records if record["id"] not in seen)
+    if table.num_rows == 0:
+        return 0
+
+    # Each export adds one new Arrow file and new Parquet files per partition,
+    # so earlier data is never rewritten
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    with pa.OSFile(os.path.join(output_directory, "arrow", f"part-{stamp}.arrow"), 'wb') as sink:
+        with ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table, max_chunksize=10000)
+
+    ds.write_dataset(
+        table.cast(SCHEMA.set(SCHEMA.get_field_index("member"), pa.field("member", pa.string()))),
+        os.path.join(output_directory, "parquet"),
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{stamp}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=10000,
+    )
+    return table.num_rows
+
+
+def read_arrow(output_directory):
+    # Memory-mapped IPC files: column buffers point straight into the page cache
+    tables = []
+    for path in sorted(glob.glob(os.path.join(output_directory, "arrow", "*.arrow"))):
+        tables.append(ipc.open_file(pa.memory_map(path, 'r')).read_all())
+    if not tables:
+        return SCHEMA.empty_table()
+    return pa.concat_tables(tables)
+
+
+def build_filter(member=None, start=None, end=None):
+    # The year conditions are redundant with the date ones but let the Parquet
+    # reader skip whole year= partitions. A year-only release matches any
+    # range that overlaps its year, like search_index and release_store
+    conditions = []
+    if member:
+        conditions.append(ds.field("member") == member)
+    if start:
+        start = datetime.date.fromisoformat(start)
+        year_only = ds.field("date_status") == "year_only"
+        conditions += [ds.field("year") >= start.year, (ds.field("date") >= start) | year_only]
+    if end:
+        end = datetime.date.fromisoformat(end)
+        conditions += [ds.field("year") <= end.year, ds.field("date") <= end]
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_parquet(output_directory, member=None, start=None, end=None, columns=None):
+    dataset = ds.dataset(os.path.join(output_directory, "parquet"), format="parquet", partitioning=PARTITIONING)
+    return dataset.to_table(columns=columns, filter=build_filter(member, start, end))
+
+
+def filter_table(table, member=None, start=None, end=None):
+    expression = build_filter(member, start, end)
+    return table if expression is None else table.filter(expression)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export press releases to Arrow IPC and partitioned Parquet.")
+    parser.add_argument("--out", default="columnar")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("input_directory", nargs="?", default="output")
+    export_parser.add_argument("--formatted", action="store_true")
+
+    read_parser = subparsers.add_parser("read")
+    read_parser.add_argument("--member")
+    read_parser.add_argument("--start", help="ISO date, inclusive")
+    read_parser.add_argument("--end", help="ISO date, inclusive")
+    read_parser.add_argument("--parquet", action="store_true", help="Read the Parquet dataset instead of the Arrow files")
+
+    args = parser.parse_args()
+    start_time = time.time()
+
+    if args.command == "export":
+        records = (record for path in corpus_files(args.input_directory, args.formatted) for record in iter_releases(path))
+        print(f"Exported {export(records, args.out)} new releases to {args.out}")
+    elif args.parquet:
+        table = read_parquet(args.out, args.member, args.start, args.end, columns=["id", "member", "date", "title"])
+        print(f"{table.num_rows} releases")
+    else:
+        table = filter_table(read_arrow(args.out), args.member, args.start, args.end)
+        print(f"{table.num_rows} releases")
+
+    print(f"Total time taken: {time.time() - start_time:.3f} seconds")
@@ -0,0 +1,112 @@
+import os
+import re
+
+from date_normalizer import normalize_date
+
+# Member slugs, matching the archive names in output/
+MEMBERS = [
+    "aoc",
+    "hawley",
+    "lee",
+    "manchin",
+    "markey",
+    "mtg",
+    "pocan",
+    "sanders",
+    "stefanik"
+]
+
+# Scraper filename prefixes that differ from the member slug
+MEMBER_ALIASES = {
+    "ocasio": "aoc",
+    "greene": "mtg",
+}
+
+# Header lines written by the scrapers, mapped to record keys
+HEADER_FIELDS = {
+    "Title": "title",
+    "Date": "date",
+    "Issues": "issues",
+    "PR Tag": "pr_tag",
+    "Subtitle": "subtitle",
+    "Tags": "tags",
+}
+
+# A record ends with "==" on its own line (or glued to the last paragraph)
+# followed by the next "Title:" header or the end of the file
+RECORD_END = re.compile(r'==[ \t]*(?:\n+|\Z)(?=Title\s?:|\Z)')
+HEADER_KEY = re.compile(r'\b(Title|Date|Issues|PR Tag|Subtitle|Tags)\s?:[ \t]*')
+CONTENT_KEY = re.compile(r'\bContent\s?:[ \t]*')
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def source_from_path(path):
+    # Archive name without extension, shared by its formatted copy; record
+    # ids are qualified by it so two archives of one member can't collide
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name[:-len("_formatted")] if name.endswith("_formatted") else name
+
+
+def member_from_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    prefix = name.split('_')[0].lower()
+    return MEMBER_ALIASES.get(prefix, prefix)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def split_releases(text):
+    return [raw.strip() for raw in RECORD_END.split(text) if raw.strip()]
+
+
+def parse_release(raw, member=None, index=0, source=None):
+    record = {"id": f"{source or member}:{index}", "member": member, "index": index, "title": "", "date": ""}
+
+    parts = CONTENT_KEY.split(raw, maxsplit=1)
+    head = parts[0]
+    record["content"] = parts[1].strip() if len(parts) > 1 else ""
+
+    # Headers are one per line in the raw archives but run together on one
+    # line after speech_corrector, so split on the keys rather than on newlines
+    matches = list(HEADER_KEY.finditer(head))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(head)
+        record[HEADER_FIELDS[match.group(1)]] = head[match.end():end].strip()
+
+    record["date_iso"], record["date_status"] = normalize_date(member, record["date"])
+    return record
+
+
+def iter_releases(path, member=None):
+    member = member or member_from_path(path)
+    source = source_from_path(path)
+    with open(path, 'r', encoding='utf-8') as file:
+        text = file.read()
+    for index, raw in enumerate(split_releases(text)):
+        yield parse_release(raw, member, index, source)
+
+
+def corpus_files(directory, formatted=False):
+    files = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.txt'):
+            continue
+        if filename.endswith('_formatted.txt') != formatted:
+            continue
+        files.append(os.path.join(directory, filename))
+    return files
+
+
+def iter_corpus(directory, formatted=False):
+    for path in corpus_files(directory, formatted):
+        yield from iter_releases(path)
+
+
+def format_release(record):
+    lines = [f"Title: {record.get('title', '')}", f"Date: {record.get('date', '')}"]
+    for key, field in HEADER_FIELDS.items():
+        if field not in ("title", "date") and field in record:
+            lines.append(f"{key}: {record[field]}")
+    return "\n".join(lines) + f"\n\nContent:\n{record.get('content', '')}\n\n==\n"
@@ -0,0 +1,176 @@
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from corpus import corpus_files, iter_releases, tokenize
+
+CACHE_DIRECTORY = ".corpus_stats_cache"
+
+
+def corpus_hash(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class CorpusStats:
+    def __init__(self, vocab, members, months, token_ids, doc_starts, doc_member, doc_month):
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.members = members
+        self.months = months
+        self.token_ids = token_ids
+        self.doc_starts = doc_starts
+        self.doc_member = doc_member
+        self.doc_month = doc_month
+
+        # Per-token document, member and month labels, so every table below is one bincount
+        doc_lengths = np.diff(np.append(doc_starts, len(token_ids)))
+        self.token_doc = np.repeat(np.arange(len(doc_starts)), doc_lengths)
+        self.token_member = doc_member[self.token_doc]
+        self.token_month = doc_month[self.token_doc]
+
+    @classmethod
+    def from_records(cls, records):
+        term_ids = {}
+        member_ids = {}
+        month_ids = {}
+        chunks = []
+        doc_starts = []
+        doc_member = []
+        doc_month = []
+        offset = 0
+
+        for record in records:
+            ids = [term_ids.setdefault(token, len(term_ids)) for token in tokenize(f"{record['title']}\n{record['content']}")]
+            chunks.append(np.array(ids, dtype=np.int32))
+            doc_starts.append(offset)
+            offset += len(ids)
+
+            doc_member.append(member_ids.setdefault(record["member"], len(member_ids)))
+
+            # Year-only and unparsed dates have no month bucket
+            month = record["date_iso"][:7] if record.get("date_status") == "parsed" else ""
+            doc_month.append(month_ids.setdefault(month, len(month_ids)))
+
+        return cls(
+            list(term_ids),
+            list(member_ids),
+            list(month_ids),
+            np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32),
+            np.array(doc_starts, dtype=np.int64),
+            np.array(doc_member, dtype=np.int32),
+            np.array(doc_month, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_directory(cls, input_directory, formatted=False, cache_directory=CACHE_DIRECTORY):
+        paths = corpus_files(input_directory, formatted)
+        cache_path = os.path.join(cache_directory, f"{corpus_hash(paths)}.npz")
+        if os.path.exists(cache_path):
+            return cls.load(cache_path)
+
+        stats = cls.from_records(record for path in paths for record in iter_releases(path))
+        os.makedirs(cache_directory, exist_ok=True)
+        stats.save(cache_path)
+        return stats
+
+    def save(self, path):
+        np.savez(
+            path,
+            vocab=np.array(self.vocab, dtype=str),
+            members=np.array(self.members, dtype=str),
+            months=np.array(self.months, dtype=str),
+            token_ids=self.token_ids,
+            doc_starts=self.doc_starts,
+            doc_member=self.doc_member,
+            doc_month=self.doc_month,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(
+            data["vocab"].tolist(),
+            data["members"].tolist(),
+            data["months"].tolist(),
+            data["token_ids"],
+            data["doc_starts"],
+            data["doc_member"],
+            data["doc_month"],
+        )
+
+    def unigram_counts(self):
+        return np.bincount(self.token_ids, minlength=len(self.vocab))
+
+    def bigram_counts(self):
+        # Pairs that straddle two documents are dropped
+        valid = np.ones(max(len(self.token_ids) - 1, 0), dtype=bool)
+        boundaries = self.doc_starts[self.doc_starts > 0] - 1
+        valid[boundaries[boundaries < len(valid)]] = False
+        pairs = self.token_ids[:-1][valid].astype(np.int64) * len(self.vocab) + self.token_ids[1:][valid]
+        keys, counts = np.unique(pairs, return_counts=True)
+        return keys // len(self.vocab), keys % len(self.vocab), counts
+
+    def table(self, labels, n_labels):
+        flat = labels.astype(np.int64) * len(self.vocab) + self.token_ids
+        return np.bincount(flat, minlength=n_labels * len(self.vocab)).reshape(n_labels, len(self.vocab))
+
+    def member_table(self):
+        return self.table(self.token_member, len(self.members))
+
+    def month_table(self):
+        return self.table(self.token_month, len(self.months))
+
+    def log_odds(self, counts=None, prior_strength=None):
+        # Log-odds ratio with an informative Dirichlet prior (Monroe et al. 2008),
+        # each row against all other rows, returned as z-scores
+        counts = self.member_table() if counts is None else counts
+        counts = counts.astype(np.float64)
+        totals = counts.sum(axis=1, keepdims=True)
+        background = counts.sum(axis=0, keepdims=True)
+        prior_strength = prior_strength or background.sum() / 10
+        alpha = prior_strength * background / background.sum()
+        alpha0 = alpha.sum()
+
+        rest = background - counts
+        rest_totals = totals.sum() - totals
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = (np.log((counts + alpha) / (totals + alpha0 - counts - alpha))
+                     - np.log((rest + alpha) / (rest_totals + alpha0 - rest - alpha)))
+            variance = 1 / (counts + alpha) + 1 / (rest + alpha)
+        return delta / np.sqrt(variance)
+
+    def top_terms(self, scores, n=10):
+        order = np.argsort(-scores)[:n]
+        return [(self.vocab[i], float(scores[i])) for i in order]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Term statistics per member and month over the press releases.")
+    parser.add_argument("input_directory", nargs="?", default="output")
+    parser.add_argument("--formatted", action="store_true")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    stats = CorpusStats.from_directory(args.input_directory, args.formatted)
+    print(f"Loaded {len(stats.token_ids)} tokens, {len(stats.vocab)} terms in {time.time() - start_time:.2f} seconds")
+
+    first, second, counts = stats.bigram_counts()
+    top = np.argsort(-counts)[:args.top]
+    print("Top bigrams: " + ", ".join(f"{stats.vocab[first[i]]} {stats.vocab[second[i]]} ({counts[i]})" for i in top))
+
+    scores = stats.log_odds()
+    for row, member in enumerate(stats.members):
+        terms = ", ".join(term for term, _ in stats.top_terms(scores[row], args.top))
+        print(f"{member}: {terms}")
+
+    print(f"Total time taken: {time.time() - start_time:.2f} seconds")
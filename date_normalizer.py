@@ -0,0 +1,144 @@
+import datetime
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+MONTH_NAME = r'(?P<month>[A-Za-z]{3,9})\.?'
+
+# Shapes seen on the member sites, e.g. Lee "July 31, 2024", Hawley
+# "Thursday, August 01, 2024", Greene "Washington, March 11, 2024"
+FORMATS = [
+    ("month_day_year", re.compile(rf'^{MONTH_NAME}\s+(?P<day>\d{{1,2}}),?\s+(?P<year>\d{{4}})$')),
+    ("weekday_month_day_year", re.compile(rf'^[A-Za-z]+day,\s+{MONTH_NAME}\s+(?P<day>\d{{1,2}}),?\s+(?P<year>\d{{4}})$')),
+    ("place_month_day_year", re.compile(rf'^(?:[^,\d]+,\s+)+{MONTH_NAME}\s+(?P<day>\d{{1,2}}),?\s+(?P<year>\d{{4}})$')),
+    ("day_month_year", re.compile(rf'^(?P<day>\d{{1,2}})\s+{MONTH_NAME}\s+(?P<year>\d{{4}})$')),
+    ("iso", re.compile(r'^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})')),
+    ("us_numeric", re.compile(r'^(?P<month>\d{1,2})[/.-](?P<day>\d{1,2})[/.-](?P<year>\d{4}|\d{2})$')),
+    ("year_only", re.compile(r'^(?P<year>\d{4})$')),
+]
+
+# Last resort when no anchored shape matches, e.g. a date embedded in a sentence
+SEARCH_FALLBACK = re.compile(rf'{MONTH_NAME}\s+(?P<day>\d{{1,2}}),?\s+(?P<year>\d{{4}})')
+
+PARSED = "parsed"
+YEAR_ONLY = "year_only"
+UNPARSED = "unparsed"
+
+FORMATS_FILENAME = "date_formats.json"
+
+
+def _month_number(value):
+    if value.isdigit():
+        return int(value)
+    return MONTHS.get(value[:3].lower())
+
+
+def _build(match):
+    groups = match.groupdict()
+    year = int(groups["year"])
+    if year < 100:
+        year += 2000
+    if "month" not in groups:
+        return str(year), YEAR_ONLY
+
+    month = _month_number(groups["month"])
+    if month is None:
+        return None
+    try:
+        return datetime.date(year, month, int(groups["day"])).isoformat(), PARSED
+    except ValueError:
+        return None
+
+
+class DateNormalizer:
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.hits = defaultdict(Counter)
+        self.winners = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as file:
+                self.winners = json.load(file)
+        self.format_index = {name: i for i, (name, _) in enumerate(FORMATS)}
+        # A cache written before a format was renamed or dropped
+        self.winners = {site: name for site, name in self.winners.items() if name in self.format_index}
+
+    def normalize(self, site, raw):
+        text = " ".join((raw or "").split())
+        if not text or text.startswith("No date"):
+            return None, UNPARSED
+
+        # Fast path: the format that last won for this site
+        winner = self.winners.get(site)
+        if winner is not None:
+            match = FORMATS[self.format_index[winner]][1].match(text)
+            if match:
+                result = _build(match)
+                if result:
+                    self.hits[site][winner] += 1
+                    return result
+
+        for name, pattern in FORMATS:
+            if name == winner:
+                continue
+            match = pattern.match(text)
+            if match:
+                result = _build(match)
+                if result:
+                    self._learn(site, name)
+                    return result
+
+        match = SEARCH_FALLBACK.search(text)
+        if match:
+            result = _build(match)
+            if result:
+                self.hits[site]["search"] += 1
+                return result
+
+        self.hits[site][UNPARSED] += 1
+        return None, UNPARSED
+
+    def _learn(self, site, name):
+        self.hits[site][name] += 1
+        current = self.winners.get(site)
+        # Switch the fast path once another format has out-hit the current winner
+        if current is None or self.hits[site][name] > self.hits[site][current]:
+            self.winners[site] = name
+
+    def save(self, cache_path=None):
+        cache_path = cache_path or self.cache_path
+        with open(cache_path, 'w', encoding='utf-8') as file:
+            json.dump(self.winners, file, indent=2, sort_keys=True)
+
+    def stats(self):
+        return {site: dict(counts) for site, counts in self.hits.items()}
+
+
+default_normalizer = DateNormalizer(FORMATS_FILENAME)
+
+
+def normalize_date(site, raw):
+    return default_normalizer.normalize(site, raw)
+
+
+if __name__ == "__main__":
+    from corpus import iter_corpus
+
+    input_directory = 'output'
+    normalizer = DateNormalizer(FORMATS_FILENAME)
+    unparsed = Counter()
+    for record in iter_corpus(input_directory):
+        iso, status = normalizer.normalize(record["member"], record["date"])
+        if status != PARSED:
+            unparsed[(record["member"], status)] += 1
+
+    for site, winner in sorted(normalizer.winners.items()):
+        print(f"{site}: {winner} {dict(normalizer.hits[site])}")
+    for (site, status), count in sorted(unparsed.items()):
+        print(f"{site}: {count} records flagged {status}")
+    normalizer.save()
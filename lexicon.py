@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import re
+import time
+
+from spellchecker import SpellChecker
+
+from corpus import corpus_files, iter_releases
+
+LEXICON_FILENAME = "lexicon.json"
+
+# Letters with inner apostrophes, not glued to digits (1st, 2nd, H2O stay whole)
+WORD = r"(?<![0-9A-Za-z])[A-Za-z]+(?:['’][A-Za-z]+)*(?![0-9A-Za-z])"
+WORD_PATTERN = re.compile(WORD)
+POSSESSIVE = re.compile(r"['’]s$", re.I)
+
+# Runs of two or more capitalized words, allowing lowercase connectors inside
+# ("Department of Veterans Affairs", "Tax Relief for American Families")
+CAPITALIZED = r"[A-Z][a-z]+(?:['’][a-z]+)?(?:[A-Z][a-z]+)?"
+CAPITALIZED_RUN = re.compile(rf"(?<![\w-]){CAPITALIZED}(?:\s+(?:(?:of|the|and|for|on|in|to|de|la)\s+)*{CAPITALIZED})+")
+SENTENCE_START = re.compile(r"(?:^|[.!?:;\"“”—]\s*|\n)$")
+
+METADATA_FIELDS = ("title", "subtitle", "tags", "issues", "pr_tag")
+
+# A term joins the lexicon once it has enough evidence of being a name or
+# domain word rather than a typo: capitalized mid-sentence or inside a
+# capitalized run, in release metadata, or simply frequent across releases
+MIN_CAPITALIZED = 2
+MIN_METADATA = 2
+MIN_COUNT = 5
+MIN_DOCS = 3
+
+TOTAL, DOCS, CAPS, METADATA, MANUAL = range(5)
+
+
+class Lexicon:
+    # Words missing from the SpellChecker dictionary, with counts mined from
+    # the scraped archives. Each archive's release count is remembered, so an
+    # update only reads the releases appended since the last one.
+    def __init__(self, counts=None, files=None):
+        self.counts = counts or {}  # lowercase term -> [total, docs, capitalized, metadata, manual]
+        self.files = files or {}  # archive basename -> releases already mined
+        self.spell = None
+        self.known = {}
+        self._terms = None
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return cls(data["counts"], data["files"])
+
+    def save(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({"files": self.files, "counts": self.counts, "terms": sorted(self.terms())}, file, indent=0)
+        os.replace(temp_path, path)
+
+    def in_dictionary(self, word):
+        known = self.known.get(word)
+        if known is None:
+            if self.spell is None:
+                self.spell = SpellChecker()
+            plain = word.replace('’', "'")  # The dictionary only has straight apostrophes
+            known = self.known[word] = plain in self.spell or POSSESSIVE.sub('', plain) in self.spell
+        return known
+
+    def _count(self, term, field):
+        entry = self.counts.get(term)
+        if entry is None:
+            entry = self.counts[term] = [0, 0, 0, 0, 0]
+        entry[field] += 1
+
+    def add_release(self, record):
+        self._terms = None
+        content = record.get("content", "")
+        seen = set()
+        capitalized = set()
+
+        for run in CAPITALIZED_RUN.finditer(content):
+            for match in WORD_PATTERN.finditer(run.group()):
+                capitalized.add(run.start() + match.start())
+
+        for match in WORD_PATTERN.finditer(content):
+            word = match.group()
+            lower = word.lower()
+            if len(word) == 1 or word.isupper() or self.in_dictionary(lower):
+                continue
+            self._count(lower, TOTAL)
+            if lower not in seen:
+                seen.add(lower)
+                self._count(lower, DOCS)
+            if word[0].isupper() and (match.start() in capitalized
+                                      or not SENTENCE_START.search(content[max(0, match.start() - 3):match.start()])):
+                self._count(lower, CAPS)
+
+        for field in METADATA_FIELDS:
+            for match in WORD_PATTERN.finditer(record.get(field, "")):
+                word = match.group()
+                lower = word.lower()
+                if len(word) > 1 and not word.isupper() and not self.in_dictionary(lower):
+                    self._count(lower, METADATA)
+
+    def add_terms(self, terms):
+        # Hand-picked words that are always accepted
+        self._terms = None
+        for term in terms:
+            self._count(term.lower(), MANUAL)
+
+    def update_from_directory(self, input_directory, formatted=False):
+        added = 0
+        for path in corpus_files(input_directory, formatted):
+            name = os.path.basename(path)
+            done = self.files.get(name, 0)
+            index = -1
+            for index, record in enumerate(iter_releases(path)):
+                if index >= done:
+                    self.add_release(record)
+                    added += 1
+            if index + 1 < done:
+                # The archive was replaced rather than appended to; its old
+                # counts can't be taken back, so the caller should rebuild
+                raise ValueError(f"{name} has {index + 1} releases but {done} were already mined; rebuild the lexicon")
+            self.files[name] = index + 1
+        return added
+
+    def accepted(self, entry):
+        return (entry[MANUAL] > 0 or entry[CAPS] >= MIN_CAPITALIZED or entry[METADATA] >= MIN_METADATA
+                or (entry[TOTAL] >= MIN_COUNT and entry[DOCS] >= MIN_DOCS))
+
+    def terms(self):
+        if self._terms is None:
+            self._terms = frozenset(term for term, entry in self.counts.items() if self.accepted(entry))
+        return self._terms
+
+    def __contains__(self, word):
+        terms = self.terms()
+        lower = word.lower()
+        return lower in terms or POSSESSIVE.sub('', lower) in terms
+
+
+def update_lexicon(input_directory, path=None, formatted=False, rebuild=False):
+    path = path or os.path.join(input_directory, LEXICON_FILENAME)
+    lexicon = Lexicon() if rebuild else Lexicon.load(path)
+    try:
+        added = lexicon.update_from_directory(input_directory, formatted)
+    except ValueError:
+        manual = [term for term, entry in lexicon.counts.items() if entry[MANUAL]]
+        lexicon = Lexicon()
+        lexicon.add_terms(manual)
+        added = lexicon.update_from_directory(input_directory, formatted)
+    if added or rebuild or not os.path.exists(path):
+        lexicon.save(path)
+    return lexicon, added
+
+
+def load_terms(path):
+    # Just the accepted terms, for worker processes that only look words up
+    if not path or not os.path.exists(path):
+        return frozenset()
+    with open(path, 'r', encoding='utf-8') as file:
+        return frozenset(json.load(file)["terms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mine names and domain words from the press releases into a spelling lexicon.")
+    parser.add_argument("input_directory", nargs="?", default="output")
+    parser.add_argument("--lexicon", help=f"Defaults to {LEXICON_FILENAME} in the input directory")
+    parser.add_argument("--formatted", action="store_true")
+    parser.add_argument("--rebuild", action="store_true", help="Mine every release again instead of only new ones")
+    parser.add_argument("--add", nargs="+", default=[], help="Words to accept regardless of counts")
+    parser.add_argument("--show", type=int, default=20)
+    args = parser.parse_args()
+
+    path = args.lexicon or os.path.join(args.input_directory, LEXICON_FILENAME)
+    start_time = time.time()
+    lexicon, added = update_lexicon(args.input_directory, path, args.formatted, args.rebuild)
+    if args.add:
+        lexicon.add_terms(args.add)
+        lexicon.save(path)
+
+    terms = lexicon.terms()
+    print(f"Mined {added} new releases; {len(terms)} of {len(lexicon.counts)} unknown words accepted "
+          f"in {time.time() - start_time:.2f} seconds")
+    top = sorted(terms, key=lambda term: -lexicon.counts[term][TOTAL])[:args.show]
+    print("Most frequent: " + ", ".join(f"{term} ({lexicon.counts[term][TOTAL]})" for term in top))
+    print(f"Saved to {path}")
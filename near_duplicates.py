@@ -0,0 +1,197 @@
+import argparse
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from corpus import iter_corpus
+
+# FNV prime for the 64-bit shingle hash; SEED fixes the MinHash permutations
+SHINGLE_BASE = np.uint64(1099511628211)
+SEED = 1
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def token_hashes(text):
+    tokens = WORD_PATTERN.findall(text.lower())
+    return np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def shingle_hashes(text, k=5):
+    tokens = token_hashes(text)
+    if len(tokens) == 0:
+        return tokens
+    if len(tokens) < k:
+        k = len(tokens)
+
+    # Polynomial hash of every k-token window, computed for all windows at once
+    n = len(tokens) - k + 1
+    hashes = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for offset in range(k):
+            hashes = hashes * SHINGLE_BASE + tokens[offset:offset + n]
+    return np.unique(hashes)
+
+
+class MinHashLSH:
+    def __init__(self, num_perm=128, bands=16, threshold=0.8, shingle_size=5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(SEED)
+        # Odd multipliers keep the multiply-shift hash a permutation of uint64
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+        self.ids = []
+        self.positions = {}
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.pending = []
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+
+    def signature(self, text):
+        shingles = shingle_hashes(text, self.shingle_size)
+        if len(shingles) == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        with np.errstate(over='ignore'):
+            permuted = self.a[:, None] * shingles[None, :] + self.b[:, None]
+        return (permuted >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, record_id, text):
+        # Empty releases all share the same blank signature and would
+        # otherwise cluster together as duplicates of each other
+        if not (text or "").strip():
+            return None
+        if record_id in self.positions:
+            raise KeyError(f"Record already indexed: {record_id}")
+        signature = self.signature(text)
+        self.positions[record_id] = len(self.ids)
+        self.ids.append(record_id)
+        self.pending.append(signature)
+        for band, key in enumerate(self.band_keys(signature)):
+            self.buckets[band][key].append(record_id)
+        return signature
+
+    def _matrix(self):
+        if self.pending:
+            self.signatures = np.vstack([self.signatures, np.array(self.pending, dtype=np.uint32)])
+            self.pending = []
+        return self.signatures
+
+    def similarity(self, first, second):
+        matrix = self._matrix()
+        return float(np.mean(matrix[self.positions[first]] == matrix[self.positions[second]]))
+
+    def candidates(self, signature):
+        found = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def query(self, record_id=None, text=None, threshold=None):
+        threshold = self.threshold if threshold is None else threshold
+        matrix = self._matrix()
+        if record_id is not None:
+            signature = matrix[self.positions[record_id]]
+        else:
+            signature = self.signature(text)
+
+        found = [candidate for candidate in self.candidates(signature) if candidate != record_id]
+        if not found:
+            return []
+        rows = matrix[[self.positions[candidate] for candidate in found]]
+        scores = np.mean(rows == signature[None, :], axis=1)
+        results = [(candidate, float(score)) for candidate, score in zip(found, scores) if score >= threshold]
+        return sorted(results, key=lambda item: -item[1])
+
+    def clusters(self, threshold=None):
+        threshold = self.threshold if threshold is None else threshold
+        matrix = self._matrix()
+        parent = list(range(len(self.ids)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Only records sharing a band bucket are ever compared, and each bucket
+        # is checked against its first member in a single vectorized step
+        for band in self.buckets:
+            for members in band.values():
+                if len(members) < 2:
+                    continue
+                positions = np.array([self.positions[member] for member in members])
+                scores = np.mean(matrix[positions[1:]] == matrix[positions[0]], axis=1)
+                root = find(positions[0])
+                for position in positions[1:][scores >= threshold]:
+                    parent[find(position)] = root
+
+        groups = defaultdict(list)
+        for i, record_id in enumerate(self.ids):
+            groups[find(i)].append(record_id)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            ids=np.array(self.ids, dtype=object),
+            signatures=self._matrix(),
+            params=np.array([self.num_perm, self.bands, self.shingle_size]),
+            threshold=np.array(self.threshold),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=True)
+        num_perm, bands, shingle_size = (int(value) for value in data['params'])
+        index = cls(num_perm=num_perm, bands=bands, threshold=float(data['threshold']), shingle_size=shingle_size)
+        index.signatures = data['signatures']
+        for position, record_id in enumerate(data['ids'].tolist()):
+            index.positions[record_id] = position
+            index.ids.append(record_id)
+            for band, key in enumerate(index.band_keys(index.signatures[position])):
+                index.buckets[band][key].append(record_id)
+        return index
+
+
+def build_index(input_directory, index=None, formatted=False):
+    index = index or MinHashLSH()
+    for record in iter_corpus(input_directory, formatted):
+        if record["id"] not in index.positions:
+            index.add(record["id"], record["content"])
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate press releases across members.")
+    parser.add_argument("input_directory", nargs="?", default="output")
+    parser.add_argument("--index", help="Load/save the MinHash index at this .npz path")
+    parser.add_argument("--query", help="Record id (archive:index, e.g. hawley:12) to find near-duplicates of")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    index = MinHashLSH.load(args.index) if args.index and os.path.exists(args.index) else None
+    index = build_index(args.input_directory, index)
+    if args.index:
+        index.save(args.index)
+
+    if args.query:
+        for record_id, score in index.query(args.query, threshold=args.threshold):
+            print(f"{record_id}\t{score:.2f}")
+    else:
+        clusters = index.clusters(args.threshold)
+        for cluster in sorted(clusters, key=len, reverse=True):
+            print(", ".join(cluster))
+        print(f"Found {len(clusters)} near-duplicate clusters across {len(index.ids)} releases.")
@@ -0,0 +1,168 @@
+import argparse
+import sqlite3
+import time
+
+from corpus import corpus_files, iter_releases
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    id INTEGER PRIMARY KEY,
+    record_id TEXT NOT NULL UNIQUE,
+    member TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    date_raw TEXT,
+    date TEXT,
+    date_status TEXT,
+    issues TEXT,
+    pr_tag TEXT,
+    subtitle TEXT,
+    tags TEXT,
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS releases_member_date ON releases (member, date);
+CREATE INDEX IF NOT EXISTS releases_date ON releases (date);
+CREATE VIRTUAL TABLE IF NOT EXISTS releases_fts USING fts5 (
+    title, content, content='releases', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS releases_fts_insert AFTER INSERT ON releases BEGIN
+    INSERT INTO releases_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS releases_fts_delete AFTER DELETE ON releases BEGIN
+    INSERT INTO releases_fts (releases_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+"""
+
+COLUMNS = ["record_id", "member", "position", "title", "date_raw", "date", "date_status", "issues", "pr_tag", "subtitle", "tags", "content"]
+
+INSERT = f"INSERT OR IGNORE INTO releases ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_row(record):
+    return (
+        record["id"],
+        record["member"],
+        record["index"],
+        record.get("title"),
+        record.get("date"),
+        record.get("date_iso"),
+        record.get("date_status"),
+        record.get("issues"),
+        record.get("pr_tag"),
+        record.get("subtitle"),
+        record.get("tags"),
+        record.get("content"),
+    )
+
+
+def load_records(conn, records, batch_size=1000):
+    inserted = 0
+    batch = []
+    for record in records:
+        batch.append(record_row(record))
+        if len(batch) >= batch_size:
+            inserted += _insert_batch(conn, batch)
+            batch = []
+    if batch:
+        inserted += _insert_batch(conn, batch)
+    return inserted
+
+
+def _insert_batch(conn, batch):
+    # One transaction per batch keeps WAL commits off the per-row path
+    with conn:
+        return conn.executemany(INSERT, batch).rowcount
+
+
+def load_directory(conn, input_directory, formatted=False, batch_size=1000):
+    total = 0
+    for path in corpus_files(input_directory, formatted):
+        inserted = load_records(conn, iter_releases(path), batch_size)
+        print(f"Loaded {inserted} new releases from {path}")
+        total += inserted
+    return total
+
+
+def fts_query(text):
+    # Each whitespace-separated term as an FTS5 string, so bill numbers like
+    # "H.R. 1234" or a stray quote aren't read as query syntax
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+
+
+def search(conn, text=None, member=None, year=None, start=None, end=None, limit=50):
+    if year is not None:
+        start, end = f"{year}", f"{year}"
+    if end and len(end) == 4:
+        end += "-12-31"
+
+    query = fts_query(text or "")
+    clauses = []
+    params = []
+    if query:
+        sql = "SELECT releases.* FROM releases_fts JOIN releases ON releases.id = releases_fts.rowid"
+        clauses.append("releases_fts MATCH ?")
+        params.append(query)
+    else:
+        sql = "SELECT releases.* FROM releases"
+    if member:
+        clauses.append("releases.member = ?")
+        params.append(member)
+    if start:
+        # Year-only dates are stored as "YYYY", which sorts before "YYYY-01-01";
+        # like search_index they match any range that overlaps their year
+        clauses.append("(releases.date >= ? OR releases.date = substr(?, 1, 4))")
+        params.extend([start, start])
+    if end:
+        clauses.append("releases.date <= ?")
+        params.append(end)
+
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY bm25(releases_fts)" if query else " ORDER BY releases.date DESC"
+    sql += " LIMIT ?"
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load and query press releases in SQLite.")
+    parser.add_argument("--db", default="releases.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = subparsers.add_parser("load", help="Bulk-load the text archives")
+    load_parser.add_argument("input_directory", nargs="?", default="output")
+    load_parser.add_argument("--formatted", action="store_true", help="Load the *_formatted.txt archives instead")
+    load_parser.add_argument("--batch-size", type=int, default=1000)
+
+    search_parser = subparsers.add_parser("search", help="Full-text search over titles and bodies")
+    search_parser.add_argument("text", nargs="?")
+    search_parser.add_argument("--member")
+    search_parser.add_argument("--year", type=int)
+    search_parser.add_argument("--start", help="ISO date or year, inclusive")
+    search_parser.add_argument("--end", help="ISO date or year, inclusive")
+    search_parser.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+    start_time = time.time()
+
+    if args.command == "load":
+        total = load_directory(conn, args.input_directory, args.formatted, args.batch_size)
+        print(f"Total releases loaded: {total}")
+    else:
+        rows = search(conn, args.text, args.member, args.year, args.start, args.end, args.limit)
+        for row in rows:
+            print(f"{row['date'] or row['date_raw']}\t{row['member']}\t{row['title']}")
+        print(f"{len(rows)} results")
+
+    end_time = time.time()
+    print(f"Total time taken: {end_time - start_time:.3f} seconds")
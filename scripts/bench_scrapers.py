@@ -0,0 +1,268 @@
+import argparse
+import contextlib
+from collections import Counter
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from content_extractor import main_text
+from html_text import preserve_formatting
+from fixture_server import FIXTURES_DIRECTORY, FixtureBundle, FixtureServer, local_base_url, start_in_thread
+from sites import SITES, listing_strainer, load_scraper, page_range, page_url, run_scraper
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm", 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return None
+
+
+class RssSampler(threading.Thread):
+    # Samples resident memory while the scraper runs. A streaming crawl
+    # levels off once warm; one that keeps every release climbs with pages.
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None:
+                self.samples.append(rss)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        if len(self.samples) < 5:
+            return None, None
+        # Warm = a fifth of the way in, after imports, sessions and parser caches
+        warm = self.samples[len(self.samples) // 5]
+        return warm, self.samples[-1] - warm
+
+
+def listing_key(name, page):
+    url = urlparse(page_url(name, SITES[name]["base_url"], page))
+    return url.path + (f"?{url.query}" if url.query else "")
+
+
+def loop_aliases(name, pages):
+    # Answers listing pages first..first+pages-1 with the first recorded one
+    # and the page after with a 404, so a crawl of any length can run from
+    # one recorded listing page and its detail pages
+    first_page = page_range(name)[0]
+    aliases = {listing_key(name, page): listing_key(name, first_page) for page in range(first_page, first_page + pages)}
+    aliases[listing_key(name, first_page + pages)] = None
+    aliases["/sitemap.xml"] = None
+    return aliases
+
+
+def recorded_listings(name, bundle, max_pages=1000):
+    first_page = page_range(name)[0]
+    keys = {listing_key(name, page) for page in range(first_page, first_page + max_pages)}
+    return [bundle.get(key)[2].decode('utf-8', errors='replace') for key in sorted(keys & set(bundle.responses))]
+
+
+def parse_cost(bodies, selector, strainer, repeats):
+    start_cpu = time.process_time()
+    for _ in range(repeats):
+        for body in bodies:
+            BeautifulSoup(body, 'html.parser', parse_only=strainer)
+    cpu = (time.process_time() - start_cpu) / (repeats * len(bodies))
+
+    # Peak traced allocation while one page's tree is alive
+    peak = 0
+    entries = 0
+    for body in bodies:
+        tracemalloc.start()
+        soup = BeautifulSoup(body, 'html.parser', parse_only=strainer)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        entries += len(soup.select(selector))
+    return cpu, peak, entries
+
+
+def bench_listing_parse(name, fixtures, repeats=5):
+    # Full parse against the strained parse of the recorded listing pages
+    bundle = FixtureBundle(os.path.join(fixtures, name))
+    bodies = recorded_listings(name, bundle)
+    if not bodies:
+        return None
+    selector = SITES[name]["listing_selector"]
+    full_cpu, full_peak, full_entries = parse_cost(bodies, selector, None, repeats)
+    strained_cpu, strained_peak, strained_entries = parse_cost(bodies, selector, listing_strainer(name), repeats)
+    return {
+        "pages": len(bodies),
+        "full_ms": 1000 * full_cpu, "strained_ms": 1000 * strained_cpu,
+        "full_kb": full_peak / 1024, "strained_kb": strained_peak / 1024,
+        "same_entries": full_entries == strained_entries,
+    }
+
+
+def word_overlap(expected, found):
+    # Recall and precision of found's words against expected's, as multisets
+    expected_words = Counter(expected.split())
+    found_words = Counter(found.split())
+    common = sum((expected_words & found_words).values())
+    return common / max(sum(expected_words.values()), 1), common / max(sum(found_words.values()), 1)
+
+
+def bench_generic_extractor(name, fixtures):
+    # Runs the generic extractor on every recorded detail page (a page the
+    # adapter's content_selector matches) and scores it against that text
+    bundle = FixtureBundle(os.path.join(fixtures, name))
+    selector = SITES[name]["content_selector"]
+    pages = found = 0
+    cpu = recall = precision = 0.0
+    for key in sorted(bundle.responses):
+        status, content_type, body = bundle.get(key)
+        if status != 200 or "html" not in content_type:
+            continue
+        soup = BeautifulSoup(body.decode('utf-8', errors='replace'), 'html.parser')
+        element = soup.select_one(selector)
+        if element is None:
+            continue
+        expected = preserve_formatting(element)
+        start_cpu = time.process_time()
+        text = main_text(soup)
+        cpu += time.process_time() - start_cpu
+        pages += 1
+        if text != "No content found":
+            found += 1
+            page_recall, page_precision = word_overlap(expected, text)
+            recall += page_recall
+            precision += page_precision
+    if not pages:
+        return None
+    return {"pages": pages, "found": found, "ms": 1000 * cpu / pages,
+            "recall": recall / max(found, 1), "precision": precision / max(found, 1)}
+
+
+def run_child(name, port):
+    # Runs in its own process so CPU time and peak RSS belong to the scraper alone
+    module = load_scraper(name)
+    module.robots.enforce_delay = False
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        sampler = RssSampler()
+        sampler.start()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            releases = run_scraper(name, base_url=local_base_url(name, port))
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        warm_mb, growth_mb = sampler.stop()
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    print(json.dumps({"releases": releases, "wall": wall, "cpu": cpu, "peak_mb": peak_mb,
+                      "warm_mb": warm_mb, "growth_mb": growth_mb}))
+
+
+def bench_site(name, fixtures, loop_pages=None, **server_options):
+    bundle = FixtureBundle(os.path.join(fixtures, name))
+    if not bundle.responses:
+        return None
+
+    aliases = loop_aliases(name, loop_pages) if loop_pages else None
+    server = FixtureServer(bundle, seed=0, aliases=aliases, **server_options)
+    port, stop = start_in_thread(server)
+    try:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name, str(port)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    finally:
+        stop()
+
+    if child.returncode != 0:
+        return {"error": child.stderr.strip().splitlines()[-1] if child.stderr.strip() else f"exit {child.returncode}"}
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    result["pages"] = server.requests
+    result["bytes"] = server.bytes_sent
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark each scraper against its recorded fixtures.")
+    parser.add_argument("sites", nargs="*", default=sorted(SITES))
+    parser.add_argument("--fixtures", default=FIXTURES_DIRECTORY)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--parse", action="store_true",
+                        help="Compare full and strained parsing of the recorded listing pages instead of crawling")
+    parser.add_argument("--extract", action="store_true",
+                        help="Score the generic content extractor on the recorded detail pages instead of crawling")
+    parser.add_argument("--loop-pages", type=int,
+                        help="Replay the first listing page this many times, to watch memory over a long crawl")
+    args = parser.parse_args()
+
+    if args.parse:
+        print(f"{'site':<10}{'pages':>7}{'full ms':>10}{'strained ms':>13}{'speedup':>9}{'full KB':>10}"
+              f"{'strained KB':>13}{'entries':>9}")
+        for name in args.sites:
+            result = bench_listing_parse(name, os.path.abspath(args.fixtures))
+            if result is None:
+                print(f"{name:<10}  no listing pages recorded")
+                continue
+            print(f"{name:<10}{result['pages']:>7}{result['full_ms']:>10.2f}{result['strained_ms']:>13.2f}"
+                  f"{result['full_ms'] / result['strained_ms']:>8.1f}x{result['full_kb']:>10.0f}"
+                  f"{result['strained_kb']:>13.0f}{'same' if result['same_entries'] else 'DIFFER':>9}")
+        sys.exit(0)
+
+    if args.extract:
+        print(f"{'site':<10}{'pages':>7}{'found':>7}{'ms/page':>9}{'recall':>8}{'precision':>11}")
+        for name in args.sites:
+            result = bench_generic_extractor(name, os.path.abspath(args.fixtures))
+            if result is None:
+                print(f"{name:<10}  no detail pages recorded")
+                continue
+            print(f"{name:<10}{result['pages']:>7}{result['found']:>7}{result['ms']:>9.2f}"
+                  f"{result['recall']:>8.0%}{result['precision']:>11.0%}")
+        sys.exit(0)
+
+    options = {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "bandwidth": args.bandwidth,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+    }
+
+    print(f"{'site':<10}{'pages':>7}{'pages/s':>10}{'cpu ms/page':>13}{'peak MB':>10}{'warm MB':>10}"
+          f"{'growth MB':>11}{'releases':>10}")
+    for name in args.sites:
+        result = bench_site(name, os.path.abspath(args.fixtures), args.loop_pages, **options)
+        if result is None:
+            print(f"{name:<10}  no fixtures recorded")
+        elif "error" in result:
+            print(f"{name:<10}  failed: {result['error']}")
+        else:
+            pages = max(result["pages"], 1)
+            warm = "-" if result["warm_mb"] is None else f"{result['warm_mb']:.1f}"
+            growth = "-" if result["growth_mb"] is None else f"{result['growth_mb']:+.1f}"
+            print(f"{name:<10}{result['pages']:>7}{result['pages'] / result['wall']:>10.1f}"
+                  f"{1000 * result['cpu'] / pages:>13.2f}{result['peak_mb']:>10.1f}{warm:>10}{growth:>11}"
+                  f"{result['releases']:>10}")
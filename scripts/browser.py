@@ -0,0 +1,327 @@
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict, deque
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from crawl_metrics import metrics, host_label
+from log_setup import setup_logging
+
+CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "congress_press_releases")
+DRIVER_CACHE = os.path.join(CACHE_DIRECTORY, "chromedriver.json")
+STARTUP_LOG = os.path.join(CACHE_DIRECTORY, "browser_startup.jsonl")
+
+logger = logging.getLogger("browser")
+
+# Fetched by headless Chrome on every page but never read by the scrapers,
+# which only need the server-rendered DOM. Sites can opt back in to a pattern
+# through "resource_allowlist" in sites.py. Each extension is blocked with and
+# without a query string, since WordPress and most CDNs version their assets
+# (style.css?ver=4.24.2, logo.png?w=32).
+BLOCKED_EXTENSIONS = [
+    "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "css",
+    "mp4", "webm", "mp3",
+]
+BLOCKED_URL_PATTERNS = [pattern for extension in BLOCKED_EXTENSIONS for pattern in (f"*.{extension}", f"*.{extension}?*")] + [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*connect.facebook.com*", "*twitter.com/widgets*", "*platform.twitter.com*",
+    "*addthis.com*", "*sharethis.com*", "*hotjar.com*", "*newrelic.com*", "*nr-data.net*",
+    "*youtube.com/embed*", "*ytimg.com*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*use.typekit.net*", "*cdn.siteimprove.net*", "*siteimproveanalytics*",
+]
+
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const entry of resources) { bytes += entry.transferSize || 0; }
+return [nav ? nav.domContentLoadedEventEnd : null, bytes, resources.length];
+"""
+
+PAGE_STATS = defaultdict(lambda: [0, 0, 0, 0])  # site -> [pages, load_ms, bytes, resources] running totals
+
+CONTENT_READY_SCRIPT = """
+const matches = document.querySelectorAll(arguments[0]);
+for (const element of matches) { if (element.textContent.trim()) { return 'ready'; } }
+return document.readyState;
+"""
+
+DEFAULT_TIMEOUT = 10
+READY_GRACE = 1.0  # Seconds to keep polling after the load event when nothing matched
+
+
+class LoadTimer:
+    # Recent time-to-content for one site and page kind; the timeout follows
+    # the slow tail of what the site has actually needed
+    def __init__(self, window=50, floor=3.0, ceiling=30.0, headroom=2.0, min_samples=5):
+        self.samples = deque(maxlen=window)
+        self.floor = floor
+        self.ceiling = ceiling
+        self.headroom = headroom
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def timeout(self):
+        if len(self.samples) < self.min_samples:
+            return DEFAULT_TIMEOUT
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return min(max(p95 * self.headroom + 1, self.floor), self.ceiling)
+
+
+LOAD_TIMERS = defaultdict(LoadTimer)  # (site, kind) -> LoadTimer
+
+
+def resolve_driver_path(refresh=False):
+    # ChromeDriverManager().install() hits the network on every call, so the
+    # resolved path is pinned and reused until it disappears or stops working
+    if not refresh and os.path.exists(DRIVER_CACHE):
+        with open(DRIVER_CACHE, 'r', encoding='utf-8') as file:
+            path = json.load(file).get("path")
+        if path and os.path.exists(path):
+            return path
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    with open(DRIVER_CACHE, 'w', encoding='utf-8') as file:
+        json.dump({"path": path, "resolved_at": time.time()}, file)
+    return path
+
+
+def lean_options():
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-first-run")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    # Hand the page back at DOMContentLoaded; the scrapers only read the DOM
+    options.page_load_strategy = "eager"
+    return options
+
+
+def blocked_patterns(allowlist=()):
+    # Allowing "*.css" also allows its "*.css?*" form
+    return [pattern for pattern in BLOCKED_URL_PATTERNS
+            if pattern not in allowlist and pattern.replace("?*", "") not in allowlist]
+
+
+def url_blocked(url, patterns):
+    # Same matching as Network.setBlockedURLs: "*" is the only wildcard and
+    # the pattern has to cover the whole URL
+    return any(re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url) for pattern in patterns)
+
+
+def block_resources(driver, allowlist=()):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_patterns(allowlist)})
+
+
+def setup_driver(use_proxy=False, proxies=None, site=None, block=True):
+    options = lean_options()
+
+    endpoint = None
+    if use_proxy and proxies is not None:
+        # One proxy per browser; a fresh browser is started when it gets evicted
+        argument, endpoint = proxies.chrome_argument()
+        options.add_argument(argument)
+
+    start = time.time()
+    try:
+        driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+    except WebDriverException as e:
+        # Most often Chrome was upgraded past the pinned driver
+        logger.warning("Cached chromedriver failed to start (%s); resolving a new one", e.msg)
+        metrics.inc("crawl_retries_total", reason="driver_start")
+        driver = webdriver.Chrome(service=Service(resolve_driver_path(refresh=True)), options=options)
+
+    if block:
+        from sites import SITES
+        block_resources(driver, SITES.get(site, {}).get("resource_allowlist", ()))
+
+    driver.site = site
+    driver.proxy_endpoint = endpoint
+    driver.launch_seconds = time.time() - start
+    driver.first_page_seconds = None
+    driver.launched_at = start
+    logger.info("Browser started in %.2f seconds", driver.launch_seconds)
+    return driver
+
+
+def mark_first_page(driver):
+    if driver.first_page_seconds is not None:
+        return
+    driver.first_page_seconds = time.time() - driver.launched_at
+    logger.info("Time to first page: %.2f seconds", driver.first_page_seconds)
+
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    with open(STARTUP_LOG, 'a', encoding='utf-8') as file:
+        file.write(json.dumps({
+            "time": driver.launched_at,
+            "launch": round(driver.launch_seconds, 3),
+            "first_page": round(driver.first_page_seconds, 3),
+            "proxy": driver.proxy_endpoint[0] if driver.proxy_endpoint else None,
+        }) + "\n")
+
+
+def content_ready(selector, required=False):
+    # Ready once an element matching the selector has text. A page that
+    # finished loading without a match is accepted after a short grace so
+    # empty listing pages don't sit out the whole timeout; when the match is
+    # required (detail pages) it fails as a timeout instead, so the release
+    # is recorded as an error and fetched again rather than saved empty.
+    completed_at = []
+
+    def condition(driver):
+        state = driver.execute_script(CONTENT_READY_SCRIPT, selector)
+        if state == "ready":
+            return True
+        if state == "complete":
+            if not completed_at:
+                completed_at.append(time.monotonic())
+            if time.monotonic() - completed_at[0] < READY_GRACE:
+                return False
+            if required:
+                raise TimeoutException(f"{selector} never matched")
+            return True
+        return False
+
+    return condition
+
+
+def wait_for_content(driver, kind, started):
+    from sites import SITES
+    site = SITES.get(driver.site, {})
+    selectors = {"listing": site.get("listing_selector"), **site.get("ready_selectors", {})}
+    selector = selectors.get(kind) or "body"
+    timer = LOAD_TIMERS[(driver.site, kind)]
+    timeout = timer.timeout()
+    host = host_label(site.get("base_url", ""))
+    try:
+        WebDriverWait(driver, max(timeout - (time.time() - started), 0.5), poll_frequency=0.1).until(content_ready(selector, required=kind != "listing"))
+    except TimeoutException:
+        # Count the miss at its full length so repeated slow pages widen the timeout
+        timer.record(timeout)
+        metrics.inc("crawl_responses_total", host=host, status="timeout")
+        raise
+    timer.record(time.time() - started)
+    metrics.observe("crawl_request_seconds", time.time() - started, host=host, phase=kind)
+    metrics.inc("crawl_responses_total", host=host, status="ready")
+
+
+def record_page_metrics(driver):
+    try:
+        load_ms, transferred, resources = driver.execute_script(PAGE_METRICS_SCRIPT)
+    except WebDriverException:
+        return None
+    stats = PAGE_STATS[driver.site]
+    stats[0] += 1
+    stats[1] += load_ms or 0
+    stats[2] += transferred or 0
+    stats[3] += resources or 0
+    metrics.inc("crawl_bytes_in_total", transferred or 0, host=host_label(driver.current_url))
+    return load_ms, transferred, resources
+
+
+def page_stats_summary(site):
+    stats = PAGE_STATS.get(site)
+    if not stats or not stats[0]:
+        return f"{site}: no pages measured"
+    pages = stats[0]
+    load_ms = stats[1] / pages
+    transferred = stats[2] / pages
+    return f"{site}: {pages} pages, avg DOM ready {load_ms:.0f} ms, avg {transferred / 1024:.0f} KiB transferred"
+
+
+def compare_blocking(site, url=None, repeats=3):
+    # Loads the same page with and without the block list to show what it saves
+    from sites import SITES
+    url = url or SITES[site]["base_url"]
+    results = {}
+    for block in (False, True):
+        driver = setup_driver(site=site, block=block)
+        try:
+            driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+            samples = []
+            for _ in range(repeats):
+                driver.get(url)
+                samples.append(driver.execute_script(PAGE_METRICS_SCRIPT))
+        finally:
+            driver.quit()
+        results[block] = (
+            sum(sample[0] or 0 for sample in samples) / repeats,
+            sum(sample[1] or 0 for sample in samples) / repeats,
+        )
+
+    (full_ms, full_bytes), (lean_ms, lean_bytes) = results[False], results[True]
+    print(f"{site}: {full_bytes / 1024:.0f} KiB -> {lean_bytes / 1024:.0f} KiB "
+          f"(saved {(full_bytes - lean_bytes) / 1024:.0f} KiB), DOM ready {full_ms:.0f} ms -> {lean_ms:.0f} ms")
+    return results
+
+
+def page_resources(html, base_url):
+    # Subresource URLs a saved page would make Chrome fetch (links to other
+    # pages and documents are left out)
+    from bs4 import BeautifulSoup
+    from urllib.parse import urljoin
+    soup = BeautifulSoup(html, 'html.parser')
+    urls = []
+    for tag in soup.find_all(['img', 'script', 'source', 'video', 'audio', 'iframe', 'link']):
+        if tag.name == 'link':
+            if tag.get('href') and set(tag.get('rel', [])) & {'stylesheet', 'icon', 'preload', 'shortcut'}:
+                urls.append(tag['href'])
+            continue
+        if tag.get('src'):
+            urls.append(tag['src'])
+        for candidate in (tag.get('srcset') or '').split(','):
+            if candidate.strip():
+                urls.append(candidate.split()[0])
+    return [urljoin(base_url, url) for url in urls]
+
+
+def saved_page_coverage(path, site=None, patterns=None):
+    # Offline check of the block list against a saved page: which of its
+    # subresources Chrome would be told not to fetch
+    from sites import SITES
+    base_url = SITES.get(site, {}).get("base_url", "https://example.com/")
+    if patterns is None:
+        patterns = blocked_patterns(SITES.get(site, {}).get("resource_allowlist", ()))
+    with open(path, 'r', encoding='utf-8') as file:
+        resources = page_resources(file.read(), base_url)
+    blocked = [url for url in resources if url_blocked(url, patterns)]
+    return blocked, [url for url in resources if url not in blocked]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure bytes and load time saved by resource blocking.")
+    parser.add_argument("sites", nargs="*", default=["hawley", "lee", "manchin"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--saved", nargs="+", metavar="PAGE",
+                        help="Check the block list against saved pages instead of loading the sites")
+    args = parser.parse_args()
+    setup_logging()
+    if args.saved:
+        for path in args.saved:
+            site = os.path.splitext(os.path.basename(path))[0]
+            blocked, loaded = saved_page_coverage(path, site)
+            print(f"{path}: {len(blocked)} of {len(blocked) + len(loaded)} subresources blocked")
+            for url in loaded:
+                print(f"  loads {url}")
+    else:
+        for site in args.sites:
+            compare_blocking(site, repeats=args.repeats)
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+
+from crawl_metrics import metrics
+
+CHECKPOINT_DIRECTORY = ".checkpoints"
+
+logger = logging.getLogger("checkpoint")
+
+
+class CrawlJournal:
+    # Append-only journal of one member's crawl. Each detail page is recorded
+    # as pending when it is requested and with its text once scraped; when a
+    # listing page's releases reach the output file the journal is compacted
+    # to a single state line holding the page and the output offset.
+    # A journal with a parent (the sitemap crawl of a member) shares the
+    # parent's output file and keeps the parent's offset in step, so the
+    # parent's truncate on resume never drops batches the child wrote.
+    # A crawl over a fixed URL list saves the list beside the journal, so a
+    # resume walks the same list even if the source has changed since.
+    def __init__(self, member, filename=None, directory=CHECKPOINT_DIRECTORY, parent=None):
+        self.member = member
+        self.path = os.path.join(directory, f"{member}.journal")
+        self.urls_path = os.path.join(directory, f"{member}.urls.json")
+        self.filename = filename
+        self.parent = parent
+        self.page = None  # Last listing page whose releases are in the output
+        self.offset = 0
+        self.pending = set()
+        self.releases = {}  # url -> scraped release of the unfinished page
+        self.finished = False
+        self.resumed = False
+        self.lock = threading.Lock()  # Selenium crawls record releases from several threads
+        os.makedirs(directory, exist_ok=True)
+
+        # A child left over from a finished parent belongs to an old output file
+        if os.path.exists(self.path) and (parent is None or parent.resumed):
+            self._replay()
+        if self.resumed and not self.finished:
+            self._truncate_output()
+            logger.info("Resuming %s after page %s in %s (%d releases cached, %d pending)",
+                        member, self.page, self.filename, len(self.releases), len(self.pending))
+        else:
+            self.page, self.offset, self.pending, self.releases = None, 0, set(), {}
+            self.finished = False
+            self.resumed = False
+            self.filename = filename
+            self._compact()
+            if os.path.exists(self.urls_path):
+                os.remove(self.urls_path)
+
+    def _replay(self):
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn last line from a crash mid-write
+                event = entry["event"]
+                if event == "state":
+                    self.filename = entry["filename"]
+                    self.page = entry["page"]
+                    self.offset = entry["offset"]
+                    self.finished = entry["finished"]
+                    self.resumed = True
+                elif event == "pending":
+                    self.pending.add(entry["url"])
+                elif event == "release":
+                    self.pending.discard(entry["url"])
+                    self.releases[entry["url"]] = entry["text"]
+
+    def _truncate_output(self):
+        # Drops whatever part of an unfinished page made it into the output
+        if self.filename and os.path.exists(self.filename) and os.path.getsize(self.filename) > self.offset:
+            with open(self.filename, 'r+b') as file:
+                file.truncate(self.offset)
+
+    def _append(self, entry):
+        with self.lock, open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _compact(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({
+                "event": "state",
+                "filename": self.filename,
+                "page": self.page,
+                "offset": self.offset,
+                "finished": self.finished,
+            }) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+    def saved_urls(self):
+        if not self.resumed or not os.path.exists(self.urls_path):
+            return None
+        with open(self.urls_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save_urls(self, urls):
+        temp_path = f"{self.urls_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(urls, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.urls_path)
+
+    def resume_page(self, start_page):
+        return start_page if self.page is None else self.page + 1
+
+    def release(self, url):
+        return self.releases.get(url)
+
+    def mark_pending(self, url):
+        self.pending.add(url)
+        self._append({"event": "pending", "url": url})
+
+    def record_release(self, url, text):
+        self.pending.discard(url)
+        # Error records are left pending so the next run fetches them again
+        if text.startswith("Error:"):
+            return
+        self.releases[url] = text
+        self._append({"event": "release", "url": url, "text": text})
+
+    def write_page(self, page, releases):
+        with metrics.timer("crawl_phase_seconds", phase="write"):
+            with open(self.filename, 'a', encoding='utf-8') as f:
+                for release in releases:
+                    f.write(release)
+                f.flush()
+                os.fsync(f.fileno())
+                self.offset = f.tell()
+            if self.parent is not None:
+                # Parent first: on resume it truncates before the child does,
+                # so its offset may run ahead of the child's but never behind
+                self.parent.offset = self.offset
+                self.parent._compact()
+            self.complete_page(page)
+        metrics.inc("crawl_releases_total", len(releases), member=self.member.removesuffix("-sitemap"))
+
+    def complete_page(self, page):
+        self.page = page
+        self.pending, self.releases = set(), {}
+        self._compact()
+
+    def finish(self):
+        self.finished = True
+        self._compact()
+        if os.path.exists(self.urls_path):
+            os.remove(self.urls_path)
+
+
+async def fetch_release(journal, url, fetch, *args, robots=None):
+    # robots paces each detail request that isn't already in the journal
+    cached = journal.release(url) if journal is not None else None
+    if cached is not None:
+        return cached
+    if robots is not None:
+        await robots.wait(url)
+    if journal is not None:
+        journal.mark_pending(url)
+    metrics.add("crawl_queue_depth", 1, queue="detail")
+    try:
+        text = await fetch(*args, url)
+    finally:
+        metrics.add("crawl_queue_depth", -1, queue="detail")
+    if journal is not None:
+        journal.record_release(url, text)
+    return text
+
+
+def fetch_release_sync(journal, url, fetch, *args, robots=None):
+    cached = journal.release(url) if journal is not None else None
+    if cached is not None:
+        return cached
+    if robots is not None:
+        robots.wait_sync(url)
+    if journal is not None:
+        journal.mark_pending(url)
+    metrics.add("crawl_queue_depth", 1, queue="detail")
+    try:
+        text = fetch(*args, url)
+    finally:
+        metrics.add("crawl_queue_depth", -1, queue="detail")
+    if journal is not None:
+        journal.record_release(url, text)
+    return text
@@ -0,0 +1,143 @@
+import argparse
+import logging
+import re
+import sys
+import urllib.request
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from crawl_metrics import metrics
+from html_text import SKIPPED_TAGS, preserve_formatting
+from sites import SITES
+
+logger = logging.getLogger("content_extractor")
+
+# Blocks whose text counts as a paragraph of their parent; a div or section
+# counts too when it holds text but no block of its own
+PARAGRAPH_TAGS = {"p", "pre", "blockquote", "li", "td", "h2", "h3", "h4"}
+CONTAINER_TAGS = {"div", "section", "article", "main", "center"}
+IGNORED_TAGS = SKIPPED_TAGS | {"svg", "iframe", "form", "button", "select", "head"}
+MIN_PARAGRAPH_CHARS = 25
+
+POSITIVE = re.compile(r"article|body|content|entry|main|news|post|press|release|story|text", re.I)
+NEGATIVE = re.compile(r"banner|breadcrumb|comment|cookie|footer|header|menu|meta|modal|nav|related|share|"
+                      r"sidebar|social|sponsor|subscribe|widget", re.I)
+PENALIZED_TAGS = {"nav", "header", "footer", "aside"}
+
+
+def class_weight(tag):
+    names = " ".join(tag.get("class", [])) + " " + (tag.get("id") or "")
+    weight = 0
+    if NEGATIVE.search(names):
+        weight -= 25
+    if POSITIVE.search(names):
+        weight += 25
+    if tag.name in PENALIZED_TAGS:
+        weight -= 50
+    return weight
+
+
+def measure(root):
+    # One post-order walk. Each tag's text, link text and commas are summed
+    # from its children as it closes, so no subtree is read twice; each
+    # paragraph adds its score to its parent and half to its grandparent,
+    # and a container paragraph keeps its score as well.
+    stats = {}  # id(tag) -> [text chars, link chars, commas, holds a block]
+    scores = {}  # id(tag) -> [tag, paragraph score]
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        if not closing:
+            stats[id(node)] = [0, 0, 0, False]
+            stack.append((node, True))
+            for child in reversed(node.contents):
+                if isinstance(child, Tag):
+                    if child.name not in IGNORED_TAGS:
+                        stack.append((child, False))
+                elif type(child) is NavigableString:
+                    text = child.strip()
+                    if text:
+                        own = stats[id(node)]
+                        own[0] += len(text)
+                        own[2] += text.count(",")
+            continue
+
+        own = stats[id(node)]
+        if node.name == "a":
+            own[1] = own[0]
+
+        is_paragraph = node.name in PARAGRAPH_TAGS or (node.name in CONTAINER_TAGS and not own[3])
+        plain = own[0] - own[1]
+        parent = node.parent
+        if is_paragraph and plain >= MIN_PARAGRAPH_CHARS and id(parent) in stats:
+            score = 1 + own[2] + min(plain // 100, 3)
+            if node.name in CONTAINER_TAGS:
+                # Text split only by <br> is the article itself, not one
+                # paragraph of it, so it competes with its parent
+                scores.setdefault(id(node), [node, 0])[1] += score
+            scores.setdefault(id(parent), [parent, 0])[1] += score
+            grandparent = parent.parent
+            if id(grandparent) in stats:
+                scores.setdefault(id(grandparent), [grandparent, 0])[1] += score / 2
+
+        if id(parent) in stats:
+            totals = stats[id(parent)]
+            totals[0] += own[0]
+            totals[1] += own[1]
+            totals[2] += own[2]
+            totals[3] = totals[3] or own[3] or node.name in PARAGRAPH_TAGS or (node.name in CONTAINER_TAGS and own[0] > 0)
+    return stats, scores
+
+
+def main_content(soup):
+    # Readability-style: the element whose paragraphs score highest after
+    # its class/id hints, discounted by how much of its text is links
+    root = soup.body or soup
+    stats, scores = measure(root)
+    best, best_score = None, 0
+    for key, (tag, score) in scores.items():
+        text, links = stats[key][0], stats[key][1]
+        if not text:
+            continue
+        score = (score + class_weight(tag)) * (1 - links / text)
+        if score > best_score:
+            best, best_score = tag, score
+    return best
+
+
+def main_text(soup):
+    element = main_content(soup)
+    return preserve_formatting(element) if element is not None else "No content found"
+
+
+def uses_generic(site):
+    # Adapters with "extractor": "generic" skip their content selectors
+    return SITES.get(site, {}).get("extractor") == "generic"
+
+
+def generic_text(site, soup, url=None):
+    if not uses_generic(site):
+        logger.warning("Selectors found no content for %s; using the generic extractor", url, extra={"url": url})
+    with metrics.timer("crawl_phase_seconds", phase="extract"):
+        text = main_text(soup)
+    found = text != "No content found"
+    metrics.inc("crawl_generic_extractions_total", site=site, result="hit" if found else "miss")
+    if not found:
+        logger.warning("No content found for %s", url, extra={"url": url})
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the main text of a press release page found by the generic extractor.")
+    parser.add_argument("source", help="URL or saved HTML file")
+    args = parser.parse_args()
+
+    if args.source.startswith(("http://", "https://")):
+        from url_discovery import ssl_context
+        request = urllib.request.Request(args.source, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(request, context=ssl_context, timeout=30) as response:
+            html = response.read().decode('utf-8', errors='replace')
+    else:
+        with open(args.source, 'r', encoding='utf-8', errors='replace') as file:
+            html = file.read()
+    sys.stdout.write(main_text(BeautifulSoup(html, 'html.parser')) + "\n")
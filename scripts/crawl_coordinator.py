@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from crawl_metrics import metrics, start_display
+from log_setup import setup_logging
+from sites import SITES, load_scraper, page_range
+
+# The store is a single SQLite file. Workers on other machines can share it
+# over a network disk as long as that disk honours POSIX locks (NFSv4, SMB);
+# every state change is one short write transaction.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    first_page INTEGER NOT NULL,
+    last_page INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    releases INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (site, first_page)
+);
+CREATE INDEX IF NOT EXISTS shards_state ON shards (state, lease_expires);
+"""
+
+PENDING, LEASED, DONE, FAILED, SKIPPED = "pending", "leased", "done", "failed", "skipped"
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+logger = logging.getLogger("coordinator")
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def plan(conn, site, first_page, last_page, shard_size=10):
+    rows = [(site, start, min(start + shard_size - 1, last_page))
+            for start in range(first_page, last_page + 1, shard_size)]
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO shards (site, first_page, last_page) VALUES (?, ?, ?)", rows)
+    return len(rows)
+
+
+def lease(conn, worker, sites=None, lease_seconds=LEASE_SECONDS):
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers can never
+    # pick the same shard. Expired leases are picked up again.
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # A worker that died on the last attempt leaves its lease to expire;
+        # the shard can't be leased again, so it fails here instead of
+        # staying leased forever
+        conn.execute(
+            "UPDATE shards SET state = ?, error = ?, lease_expires = NULL "
+            "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, "lease expired on the last attempt", LEASED, now, MAX_ATTEMPTS),
+        )
+        query = ("SELECT id, site, first_page, last_page, attempts FROM shards "
+                 "WHERE (state = ? OR (state = ? AND lease_expires < ?)) AND attempts < ?")
+        params = [PENDING, LEASED, now, MAX_ATTEMPTS]
+        if sites:
+            query += f" AND site IN ({', '.join('?' * len(sites))})"
+            params.extend(sites)
+        row = conn.execute(query + " ORDER BY site, first_page LIMIT 1", params).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE shards SET state = ?, worker = ?, lease_expires = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+            (LEASED, worker, now + lease_seconds, now, row[0]),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return {"id": row[0], "site": row[1], "first_page": row[2], "last_page": row[3], "attempt": row[4] + 1}
+
+
+def heartbeat(conn, shard_id, worker, lease_seconds=LEASE_SECONDS):
+    # False means the lease was lost (expired and re-leased elsewhere)
+    now = time.time()
+    with conn:
+        cursor = conn.execute(
+            "UPDATE shards SET lease_expires = ?, heartbeat_at = ? WHERE id = ? AND worker = ? AND state = ?",
+            (now + lease_seconds, now, shard_id, worker, LEASED),
+        )
+    return cursor.rowcount == 1
+
+
+def complete(conn, shard, worker, releases, end_page=None):
+    with conn:
+        conn.execute("UPDATE shards SET state = ?, releases = ?, error = NULL WHERE id = ? AND worker = ?",
+                     (DONE, releases, shard["id"], worker))
+        if end_page is not None:
+            # The listing ran out inside this shard; nothing after it exists
+            conn.execute("UPDATE shards SET state = ? WHERE site = ? AND first_page > ? AND state = ?",
+                         (SKIPPED, shard["site"], end_page, PENDING))
+
+
+def fail(conn, shard, worker, error):
+    with conn:
+        conn.execute(
+            "UPDATE shards SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_expires = NULL "
+            "WHERE id = ? AND worker = ?",
+            (MAX_ATTEMPTS, FAILED, PENDING, error, shard["id"], worker),
+        )
+
+
+def pending_shards(conn):
+    return conn.execute("SELECT COUNT(*) FROM shards WHERE state = ?", (PENDING,)).fetchone()[0]
+
+
+def status(conn):
+    return conn.execute(
+        "SELECT site, state, COUNT(*), SUM(releases) FROM shards GROUP BY site, state ORDER BY site, state"
+    ).fetchall()
+
+
+class Heartbeat(threading.Thread):
+    # Keeps the lease alive while a long page (a Selenium listing with all its
+    # detail pages) is in flight
+    def __init__(self, db_path, shard_id, worker, interval=LEASE_SECONDS / 3):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.shard_id = shard_id
+        self.worker = worker
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        conn = connect(self.db_path)
+        try:
+            while not self.stopped.wait(self.interval):
+                if not heartbeat(conn, self.shard_id, self.worker):
+                    self.lost = True
+                    return
+        finally:
+            conn.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def page_path(output_directory, site, page):
+    return os.path.join(output_directory, site, f"page-{page:05d}.jsonl")
+
+
+def write_page(output_directory, site, page, releases):
+    # Written whole and renamed into place, so a page file is either complete
+    # or absent and a re-leased shard can skip pages already on disk
+    path = page_path(output_directory, site, page)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        for position, release in enumerate(releases):
+            file.write(json.dumps({"page": page, "position": position, "text": release}) + "\n")
+    os.replace(temp_path, path)
+
+
+def read_page(output_directory, site, page):
+    path = page_path(output_directory, site, page)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line)["text"] for line in file]
+
+
+async def crawl_pages_aiohttp(site, pages, on_page):
+    import aiohttp
+    module = load_scraper(site)
+    base_url = SITES[site]["base_url"]
+    headers = getattr(module, "HEADERS", None)
+    connector = aiohttp.TCPConnector(ssl=module.ssl_context)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await module.robots.load(session, base_url, ssl=module.ssl_context, headers=headers)
+        for page in pages:
+            if not on_page(page, await module.scrape_page(session, base_url, page)):
+                return
+
+
+def crawl_pages_selenium(site, pages, on_page):
+    from browser import setup_driver
+    module = load_scraper(site)
+    base_url = SITES[site]["base_url"]
+    driver = setup_driver(site=site)
+    module.robots.load_sync(base_url)
+    try:
+        for page in pages:
+            if not on_page(page, module.scrape_page(driver, base_url, page)):
+                return
+    finally:
+        driver.quit()
+
+
+def run_shard(db_path, conn, shard, worker, output_directory):
+    site = shard["site"]
+    selenium = SITES[site]["engine"] == "selenium"
+    # Same stopping rules as the scrapers' own loops
+    empty_limit = 3 if selenium else 1
+    state = {"releases": 0, "empty": 0, "end_page": None}
+
+    def on_page(page, releases):
+        if beat.lost:
+            raise RuntimeError(f"lease on shard {shard['id']} was lost")
+        if releases is None:
+            # A timeout or error, not the end of the listing; failing the shard
+            # leaves the page unwritten so the next lease fetches it again
+            raise RuntimeError(f"{site} listing page {page} failed to load")
+        write_page(output_directory, site, page, releases)
+        state["releases"] += len(releases)
+        state["empty"] = 0 if releases else state["empty"] + 1
+        if state["empty"] >= empty_limit:
+            state["end_page"] = page
+            return False
+        return True
+
+    # Pages finished by an earlier, interrupted lease are kept as they are
+    pages = []
+    for page in range(shard["first_page"], shard["last_page"] + 1):
+        done = read_page(output_directory, site, page)
+        if done is None:
+            pages.append(page)
+        else:
+            state["releases"] += len(done)
+
+    beat = Heartbeat(db_path, shard["id"], worker)
+    beat.start()
+    try:
+        if pages and selenium:
+            crawl_pages_selenium(site, pages, on_page)
+        elif pages:
+            asyncio.run(crawl_pages_aiohttp(site, pages, on_page))
+    except Exception as e:
+        fail(conn, shard, worker, str(e))
+        logger.error("Shard %s %s-%s failed: %s", site, shard['first_page'], shard['last_page'], e)
+        return False
+    finally:
+        beat.stop()
+
+    complete(conn, shard, worker, state["releases"], state["end_page"])
+    logger.info("Shard %s %s-%s done: %s releases", site, shard['first_page'], shard['last_page'], state['releases'])
+    return True
+
+
+def run_worker(db_path, output_directory, sites=None, poll=5.0, exit_when_idle=True):
+    conn = connect(db_path)
+    worker = worker_id()
+    logger.info("Worker %s started", worker)
+    try:
+        while True:
+            shard = lease(conn, worker, sites)
+            if shard is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll)
+                continue
+            logger.info("Worker %s leased %s pages %s-%s (attempt %s)", worker, shard['site'],
+                        shard['first_page'], shard['last_page'], shard['attempt'])
+            if shard["attempt"] > 1:
+                metrics.inc("crawl_retries_total", reason="shard")
+            metrics.set("crawl_queue_depth", pending_shards(conn), queue="shards")
+            run_shard(db_path, conn, shard, worker, output_directory)
+    finally:
+        conn.close()
+
+
+def merge(conn, site, output_directory, filename):
+    # Listing order (page, then position on the page); a release that shifted
+    # onto the next page while the crawl ran is kept only where it first appears
+    unfinished = conn.execute(
+        "SELECT COUNT(*) FROM shards WHERE site = ? AND state IN (?, ?, ?)", (site, PENDING, LEASED, FAILED)
+    ).fetchone()[0]
+    if unfinished:
+        logger.warning("%s %s shards are not done; their pages are missing from %s", unfinished, site, filename)
+    pages = conn.execute(
+        "SELECT first_page, last_page FROM shards WHERE site = ? AND state = ? ORDER BY first_page", (site, DONE)
+    ).fetchall()
+    seen = set()
+    written = duplicates = 0
+    with open(filename, 'w', encoding='utf-8') as out:
+        for first_page, last_page in pages:
+            for page in range(first_page, last_page + 1):
+                for release in read_page(output_directory, site, page) or []:
+                    key = hashlib.sha1(release.strip().encode('utf-8')).digest()
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    out.write(release)
+                    written += 1
+    return written, duplicates
+
+
+def spawn_workers(count, db_path, output_directory, sites):
+    command = [sys.executable, os.path.abspath(__file__), "--db", db_path, "--out", output_directory, "worker"]
+    if sites:
+        command += ["--sites", *sites]
+    processes = [subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__))) for _ in range(count)]
+    return [process.wait() for process in processes]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard member crawls across worker processes and machines.")
+    parser.add_argument("--db", default="crawl.db")
+    parser.add_argument("--out", default="crawl_pages", help="Directory for per-page output, shared by all workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan")
+    plan_parser.add_argument("sites", nargs="+", choices=sorted(SITES))
+    plan_parser.add_argument("--first-page", type=int)
+    plan_parser.add_argument("--end-page", type=int)
+    plan_parser.add_argument("--shard-size", type=int, default=10)
+    plan_parser.add_argument("--discover", action="store_true",
+                             help="Probe for the last listing page instead of trusting end_page")
+
+    worker_parser = subparsers.add_parser("worker")
+    worker_parser.add_argument("--sites", nargs="*", choices=sorted(SITES))
+    worker_parser.add_argument("--wait", action="store_true", help="Keep polling for new shards instead of exiting")
+
+    run_parser = subparsers.add_parser("run", help="Start local workers and wait for them")
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    run_parser.add_argument("--sites", nargs="*", choices=sorted(SITES))
+
+    subparsers.add_parser("status")
+
+    merge_parser = subparsers.add_parser("merge")
+    merge_parser.add_argument("site", choices=sorted(SITES))
+    merge_parser.add_argument("filename")
+
+    args = parser.parse_args()
+    db_path = os.path.abspath(args.db)
+    output_directory = os.path.abspath(args.out)
+    conn = connect(db_path)
+
+    if args.command == "plan":
+        for site in args.sites:
+            first_page, end_page = page_range(site)
+            first_page = first_page if args.first_page is None else args.first_page
+            end_page = end_page if args.end_page is None else args.end_page
+            if args.end_page is None and (args.discover or end_page is None):
+                from pagination import discover_last_page
+                end_page, probes = discover_last_page(site)
+                print(f"{site}: last listing page is {end_page} ({len(probes)} probes)")
+            shards = plan(conn, site, first_page, end_page, args.shard_size)
+            print(f"{site}: pages {first_page}-{end_page} in {shards} shards")
+    elif args.command == "worker":
+        conn.close()
+        os.makedirs(output_directory, exist_ok=True)
+        setup_logging(json_path=os.path.join(output_directory, f"worker-{worker_id().replace(':', '-')}.jsonl"))
+        display = start_display(os.path.join(output_directory, f"metrics-{worker_id().replace(':', '-')}.prom"))
+        try:
+            run_worker(db_path, output_directory, args.sites, exit_when_idle=not args.wait)
+        finally:
+            display.stop()
+    elif args.command == "run":
+        conn.close()
+        spawn_workers(args.workers, db_path, output_directory, args.sites)
+    elif args.command == "status":
+        for site, state, count, releases in status(conn):
+            print(f"{site:<10}{state:<9}{count:>6} shards{releases or 0:>8} releases")
+    elif args.command == "merge":
+        written, duplicates = merge(conn, args.site, output_directory, args.filename)
+        print(f"Wrote {written} releases to {args.filename} ({duplicates} duplicates dropped)")
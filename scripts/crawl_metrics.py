@@ -0,0 +1,216 @@
+import bisect
+import contextlib
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+# Seconds; covers a fast cached listing page up to a Selenium page near its timeout
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "crawl_request_seconds": "Time from request to parsed response, by host and phase (listing/detail).",
+    "crawl_phase_seconds": "Time spent in local work, by phase (parse/extract/write).",
+    "crawl_responses_total": "Responses by host and status code.",
+    "crawl_bytes_in_total": "Response body bytes received, by host.",
+    "crawl_retries_total": "Requests or shards that were tried again, by reason.",
+    "crawl_releases_total": "Releases written to the output, by member.",
+    "crawl_queue_depth": "Work waiting or in flight, by queue.",
+    "crawl_generic_extractions_total": "Pages whose text came from the generic extractor, by site and result (hit/miss).",
+    "crawl_selector_total": "Content selector lookups by site, field, selector and result (hit/miss).",
+}
+
+
+def host_label(url):
+    return urlparse(url).netloc or url
+
+
+def escape_label(value):
+    # Prometheus text format: backslash, double quote and newline are escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    # Counters, gauges and histograms keyed by (name, sorted labels). One
+    # registry per process; the lock makes it safe to share between the
+    # event loop, Selenium code and the display thread.
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def add(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        # Plain context manager, so it also times an awaited block in a coroutine
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def total(self, name, **match):
+        with self.lock:
+            return sum(value for (key, labels), value in self.counters.items()
+                       if key == name and match.items() <= dict(labels).items())
+
+    def merged_histogram(self, name, **match):
+        merged = Histogram(self.buckets)
+        with self.lock:
+            for (key, labels), histogram in self.histograms.items():
+                if key == name and match.items() <= dict(labels).items():
+                    merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                    merged.count += histogram.count
+                    merged.sum += histogram.sum
+        return merged
+
+    def to_prometheus(self):
+        def labels_text(labels, extra=()):
+            pairs = [f'{key}="{escape_label(value)}"' for key, value in list(labels) + list(extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        with self.lock:
+            families = {}
+            for kind, store in (("counter", self.counters), ("gauge", self.gauges), ("histogram", self.histograms)):
+                for (name, labels), value in store.items():
+                    families.setdefault((name, kind), []).append((labels, value))
+            for (name, kind), series in sorted(families.items()):
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series, key=lambda item: item[0]):
+                    if kind != "histogram":
+                        lines.append(f"{name}{labels_text(labels)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(value.buckets) + ["+Inf"], value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{labels_text(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{labels_text(labels)} {value.sum:.6f}")
+                    lines.append(f"{name}_count{labels_text(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Renamed into place so a node_exporter textfile collector never reads half a file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def progress_line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        requests = self.total("crawl_responses_total")
+        with self.lock:
+            statuses = {}
+            for (name, labels), value in self.counters.items():
+                if name == "crawl_responses_total":
+                    status = str(dict(labels).get("status", "?"))
+                    group = f"{status[0]}xx" if status[:1].isdigit() else status
+                    statuses[group] = statuses.get(group, 0) + value
+            queued = sum(value for (name, _), value in self.gauges.items() if name == "crawl_queue_depth")
+        megabytes = self.total("crawl_bytes_in_total") / (1024 * 1024)
+
+        parts = [f"{elapsed:6.0f}s", f"{requests} req ({requests / elapsed:.1f}/s)"]
+        parts.append(" ".join(f"{group} {count}" for group, count in sorted(statuses.items())) or "no responses")
+        parts.append(f"{megabytes:.1f} MB")
+        for phase in ("listing", "detail"):
+            p50 = self.merged_histogram("crawl_request_seconds", phase=phase).quantile(0.5)
+            if p50 is not None:
+                parts.append(f"{phase} p50<{p50}s")
+        parts.append(f"{self.total('crawl_releases_total')} releases")
+        parts.append(f"queue {queued}")
+        return " | ".join(parts)
+
+
+metrics = MetricsRegistry()
+
+
+class ProgressDisplay(threading.Thread):
+    # Redraws one status line on stderr and refreshes the Prometheus file
+    def __init__(self, registry=metrics, path=None, interval=1.0, stream=sys.stderr):
+        super().__init__(daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.stream = stream
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.refresh()
+
+    def refresh(self):
+        if self.stream.isatty():
+            self.stream.write("\r\033[K" + self.registry.progress_line())
+            self.stream.flush()
+        if self.path:
+            self.registry.write_prometheus(self.path)
+
+    def stop(self):
+        self.stopped.set()
+        self.refresh()
+        if self.stream.isatty():
+            self.stream.write("\n")
+        else:
+            self.stream.write(self.registry.progress_line() + "\n")
+
+
+def start_display(path=None, interval=1.0):
+    display = ProgressDisplay(path=path, interval=interval)
+    display.start()
+    return display
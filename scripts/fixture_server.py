@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import ssl
+import tempfile
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+from sites import SITES, origin_of, run_scraper
+
+# Upstream fetches in record mode use the same unverified context as the scrapers
+ssl_context = ssl.create_default_context()
+ssl_context.check_hostname = False
+ssl_context.verify_mode = ssl.CERT_NONE
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureBundle:
+    def __init__(self, directory, origin=None):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.origin = origin
+        self.responses = {}
+        self.lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self.origin = self.origin or data["origin"]
+            self.responses = data["responses"]
+
+    def get(self, key):
+        entry = self.responses.get(key)
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry["file"]), 'rb') as file:
+            return entry["status"], entry["content_type"], file.read()
+
+    def put(self, key, status, content_type, body):
+        filename = hashlib.sha1(key.encode('utf-8')).hexdigest() + ".body"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, filename), 'wb') as file:
+            file.write(body)
+        with self.lock:
+            self.responses[key] = {"status": status, "content_type": content_type, "file": filename}
+            self.save()
+
+    def save(self):
+        # Written after every response so an interrupted recording is still usable
+        with open(self.index_path, 'w', encoding='utf-8') as file:
+            json.dump({"origin": self.origin, "responses": self.responses}, file, indent=1, sort_keys=True)
+
+
+def make_site_local(body, origin):
+    # Absolute links back to the live site become root-relative, so scrapers
+    # that urljoin() against the local base URL stay on the fixture server
+    host = origin.split("://", 1)[1]
+    for prefix in (f"https://{host}", f"http://{host}", f"//{host}"):
+        body = body.replace(prefix.encode('utf-8'), b"")
+    return body
+
+
+class FixtureServer:
+    def __init__(self, bundle, record=False, latency=0.0, jitter=0.0, bandwidth=None,
+                 error_rate=0.0, throttle_rate=0.0, max_requests=None, seed=None, aliases=None):
+        self.bundle = bundle
+        self.aliases = aliases or {}  # Request key -> recorded key it is answered with, or None for a 404
+        self.record = record
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth  # bytes per second, None for unlimited
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_requests = max_requests
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.session = None
+
+    async def handle(self, request):
+        key = request.path_qs
+        self.requests += 1
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            return web.Response(status=429, headers={"Retry-After": "1"}, text="Too Many Requests")
+        if roll < self.throttle_rate + self.error_rate:
+            return web.Response(status=500, text="Injected error")
+
+        if key in self.aliases:
+            # An alias to None stands for a page the site doesn't have
+            if self.aliases[key] is None:
+                return web.Response(status=404, text="Not recorded")
+            key = self.aliases[key]
+        stored = self.bundle.get(key)
+        if stored is None and self.record and (self.max_requests is None or len(self.bundle.responses) < self.max_requests):
+            stored = await self.fetch_upstream(key)
+        if stored is None:
+            return web.Response(status=404, text="Not recorded")
+
+        status, content_type, body = stored
+        return await self.send(request, status, content_type, body)
+
+    async def fetch_upstream(self, key):
+        async with self.session.get(self.bundle.origin + key, ssl=ssl_context) as response:
+            body = make_site_local(await response.read(), self.bundle.origin)
+            content_type = response.headers.get("Content-Type", "text/html")
+            self.bundle.put(key, response.status, content_type, body)
+            print(f"Recorded {response.status} {key}")
+            return response.status, content_type, body
+
+    async def send(self, request, status, content_type, body):
+        headers = {"Content-Type": content_type}
+        if not self.bandwidth:
+            self.bytes_sent += len(body)
+            return web.Response(status=status, body=body, headers=headers)
+
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_length = len(body)
+        await response.prepare(request)
+        chunk_size = 16384
+        for offset in range(0, len(body), chunk_size):
+            chunk = body[offset:offset + chunk_size]
+            await response.write(chunk)
+            self.bytes_sent += len(chunk)
+            await asyncio.sleep(len(chunk) / self.bandwidth)
+        await response.write_eof()
+        return response
+
+    async def start(self, host="127.0.0.1", port=0):
+        if self.record:
+            self.session = aiohttp.ClientSession()
+        app = web.Application()
+        app.router.add_route("GET", "/{tail:.*}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        return self.port
+
+    async def stop(self):
+        await self.runner.cleanup()
+        if self.session:
+            await self.session.close()
+
+
+def start_in_thread(server, host="127.0.0.1", port=0):
+    # The scrapers call asyncio.run() themselves, so the server gets its own loop
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start(host, port))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return server.port, stop
+
+
+def local_base_url(name, port):
+    base_url = SITES[name]["base_url"]
+    return f"http://127.0.0.1:{port}" + base_url[len(origin_of(base_url)):]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay a member site's responses for offline scraper runs.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("site", choices=sorted(SITES))
+    parser.add_argument("--fixtures", default=FIXTURES_DIRECTORY)
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--max-requests", type=int, default=200, help="Stop recording new URLs after this many")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--bandwidth", type=float, help="Bytes per second per response")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    bundle = FixtureBundle(os.path.join(os.path.abspath(args.fixtures), args.site), origin_of(SITES[args.site]["base_url"]))
+
+    if args.mode == "record":
+        # Run the real scraper against a recording proxy of its own site
+        server = FixtureServer(bundle, record=True, max_requests=args.max_requests)
+        port, stop = start_in_thread(server, port=args.port)
+        start_time = time.time()
+        try:
+            # The scrapers write their archive to the working directory
+            with tempfile.TemporaryDirectory() as scratch:
+                os.chdir(scratch)
+                run_scraper(args.site, base_url=local_base_url(args.site, port))
+        finally:
+            stop()
+        print(f"Recorded {len(bundle.responses)} responses to {bundle.directory} in {time.time() - start_time:.2f} seconds")
+    else:
+        server = FixtureServer(bundle, latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+
+        async def serve():
+            port = await server.start(port=args.port)
+            print(f"Replaying {len(bundle.responses)} responses at {local_base_url(args.site, port)}")
+            await asyncio.Event().wait()
+
+        asyncio.run(serve())
@@ -0,0 +1,101 @@
+import re
+from bs4 import NavigableString, SoupStrainer, Tag
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+# tag, tag.class or tag[attr*='value'] (also =, ^=, $=)
+SIMPLE_SELECTOR = re.compile(r"^(\w+)(?:\.([\w-]+))?(?:\[(\w[\w-]*)([*^$]?=)['\"]?([^'\"\]]*)['\"]?\])?$")
+ATTRIBUTE_TESTS = {
+    "=": lambda value, wanted: value == wanted,
+    "*=": lambda value, wanted: wanted in value,
+    "^=": lambda value, wanted: value.startswith(wanted),
+    "$=": lambda value, wanted: value.endswith(wanted),
+}
+
+
+class TextWriter:
+    # Collects output pieces in a list and never lets more than two newlines
+    # pile up, so no "\n\n\n" cleanup pass is needed afterwards
+    def __init__(self):
+        self.parts = []
+        self.newlines = 2  # Swallow leading blank lines
+
+    def text(self, text):
+        if not text:
+            return
+        if "\n\n\n" in text:
+            text = re.sub(r'\n{3,}', '\n\n', text)
+        self.parts.append(text)
+        self.newlines = 0
+
+    def newline(self, count=1):
+        count = min(count, 2 - self.newlines)
+        if count > 0:
+            self.parts.append("\n" * count)
+            self.newlines += count
+
+    def getvalue(self):
+        return "".join(self.parts).strip()
+
+
+def render_node(node, writer):
+    for child in node.children:
+        if isinstance(child, Tag):
+            name = child.name
+            if name == 'p':
+                writer.text(child.get_text(strip=True))
+                writer.newline(2)
+            elif name == 'ul':
+                for li in child.find_all('li'):
+                    writer.text("• " + li.get_text(strip=True))
+                    writer.newline()
+                writer.newline()
+            elif name == 'ol':
+                for i, li in enumerate(child.find_all('li'), 1):
+                    writer.text(f"{i}. " + li.get_text(strip=True))
+                    writer.newline()
+                writer.newline()
+            elif name == 'br':
+                writer.newline()
+            elif name == 'div' and 'media-item' in child.get('class', []):
+                writer.text("[Embedded media content]")
+                writer.newline(2)
+            elif name not in SKIPPED_TAGS:
+                render_node(child, writer)
+        elif type(child) is NavigableString:
+            text = child.strip()
+            if text:
+                writer.text(text)
+                writer.newline()
+
+
+def render_blocks(element):
+    writer = TextWriter()
+    render_node(element, writer)
+    return writer.getvalue()
+
+
+def preserve_formatting(element):
+    if not element:
+        return "No content found"
+    return render_blocks(element)
+
+
+def selector_strainer(selector):
+    # SoupStrainer that builds only the elements matching a simple CSS
+    # selector, with their descendants; the rest of the page is tokenized
+    # but never becomes a tree. None (parse everything) for selectors it
+    # can't express.
+    match = SIMPLE_SELECTOR.match(selector.strip())
+    if not match:
+        return None
+    tag, class_name, attribute, operator, wanted = match.groups()
+    attrs = {}
+    if class_name:
+        # At parse time class is still the raw "a b c" string
+        attrs["class"] = lambda value: value is not None and class_name in (
+            value.split() if isinstance(value, str) else value)
+    if attribute:
+        test = ATTRIBUTE_TESTS[operator]
+        attrs[attribute] = lambda value: value is not None and test(value, wanted)
+    return SoupStrainer(tag, attrs=attrs)
@@ -1,64 +1,24 @@
 import time
+import logging
 import re
 from urllib.parse import urljoin
 import datetime
-import os
-import random
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-
-# PIA SOCKS5 proxy settings
-PIA_SERVERS = [
-    "proxy-us-atlanta.privateinternetaccess.com",
-    "proxy-us-california.privateinternetaccess.com",
-    "proxy-us-chicago.privateinternetaccess.com",
-    "proxy-us-dallas.privateinternetaccess.com",
-    "proxy-us-denver.privateinternetaccess.com",
-    "proxy-us-florida.privateinternetaccess.com",
-    "proxy-us-houston.privateinternetaccess.com",
-    "proxy-us-lasvegas.privateinternetaccess.com",
-    "proxy-us-newyorkcity.privateinternetaccess.com",
-    "proxy-us-seattle.privateinternetaccess.com",
-    "proxy-us-siliconvalley.privateinternetaccess.com",
-    "proxy-us-washingtondc.privateinternetaccess.com",
-    "proxy-us-baltimore.privateinternetaccess.com",
-    "proxy-us-boston.privateinternetaccess.com",
-    "proxy-us-charlotte.privateinternetaccess.com",
-    "proxy-us-detroit.privateinternetaccess.com",
-    "proxy-us-honolulu.privateinternetaccess.com",
-    "proxy-us-indianapolis.privateinternetaccess.com",
-    "proxy-us-losangeles.privateinternetaccess.com",
-    "proxy-us-miami.privateinternetaccess.com",
-    "proxy-us-minneapolis.privateinternet.com",
-]
-
-# PIA credentials
-PIA_USERNAME = os.getenv("PIA_USERNAME", "")
-PIA_PASSWORD = os.getenv("PIA_PASSWORD", "")
-
-def get_random_pia_proxy():
-    server = random.choice(PIA_SERVERS)
-    return f"{server}:1080"
-
-def setup_driver(use_proxy=False):
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    if use_proxy:
-        proxy = get_random_pia_proxy()
-        options.add_argument(f'--proxy-server=socks5://{PIA_USERNAME}:{PIA_PASSWORD}@{proxy}')
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
+from robots_policy import RobotsCache
+from log_setup import setup_logging
+from crawl_metrics import start_display
+from proxy_pool import ProxyPool, report_driver
+from checkpoint import CrawlJournal, fetch_release_sync
+from sites import listing_strainer, page_url
+from content_extractor import generic_text, uses_generic
+from url_discovery import scrape_discovered_sync
+from pagination import find_last_page_sync, scrape_listing_pages_sync
+from browser import setup_driver, mark_first_page, record_page_metrics, page_stats_summary, wait_for_content
+
+proxies = ProxyPool()
+robots = RobotsCache()
+logger = logging.getLogger("lee")
 
 def extract_content(html):
     soup = BeautifulSoup(html, 'html.parser')
@@ -73,9 +33,15 @@ def extract_content(html):
     return "No content found"
 
 def scrape_press_release(driver, url):
+    loaded = False  # Errors after the page loaded are parse errors, not the proxy's
     try:
+        start = time.time()
         driver.get(url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        robots.mark(url)
+        wait_for_content(driver, "detail", start)
+        report_driver(proxies, driver, True, time.time() - start)
+        loaded = True
+        record_page_metrics(driver)
 
         soup = BeautifulSoup(driver.page_source, 'html.parser')
 
@@ -88,35 +54,46 @@ def scrape_press_release(driver, url):
         date_text = date_elem.text.strip() if date_elem else 'No date found'
 
         # Extract content
-        content = extract_content(driver.page_source)
+        content = "No content found" if uses_generic("lee") else extract_content(driver.page_source)
         if content == "No content found":
-            print(f"No content found for {url}")
+            content = generic_text("lee", soup, url)
 
         return f"Title: {title_text}\nDate: {date_text}\n\nContent:\n{content}\n\n==\n"
     except TimeoutException:
-        print(f"Timeout occurred while loading {url}")
+        logger.warning("Timeout occurred while loading %s", url, extra={"url": url})
+        report_driver(proxies, driver, False)
         return f"Error: Timeout occurred while loading {url}\n\n==\n"
     except NoSuchElementException as e:
-        print(f"Element not found on {url}: {e}")
+        logger.warning("Element not found on %s: %s", url, e, extra={"url": url})
         return f"Error: Element not found on {url}\n\n==\n"
     except Exception as e:
-        print(f"An error occurred while scraping {url}: {e}")
+        logger.error("An error occurred while scraping %s: %s", url, e, extra={"url": url})
+        if not loaded:
+            report_driver(proxies, driver, False)
         return f"Error: An error occurred while scraping {url}\n\n==\n"
 
-def scrape_page(driver, base_url, page):
-    url = f"{base_url}?page={page}" if page > 1 else base_url
+def scrape_page(driver, base_url, page, journal=None):
+    # [] when the listing page has no entries, None when it failed to load
+    url = page_url("lee", base_url, page)
+    if not robots.can_fetch(url):
+        logger.info("robots.txt disallows scraping %s", url)
+        return []
+
     try:
+        robots.wait_sync(url)
+        start = time.time()
         driver.get(url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        mark_first_page(driver)
+        wait_for_content(driver, "listing", start)
 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        soup = BeautifulSoup(driver.page_source, 'html.parser', parse_only=listing_strainer("lee"))
         press_release_elements = soup.find_all('div', class_='element')
 
         if not press_release_elements:
-            print(f"No press releases found on page {page}. This might be the last page.")
+            logger.info("No press releases found on page %s. This might be the last page.", page)
             return []
 
-        print(f"Found {len(press_release_elements)} press release elements on page {page}")
+        logger.debug("Found %s press release elements on page %s", len(press_release_elements), page)
 
         releases = []
         for element in press_release_elements:
@@ -124,57 +101,72 @@ def scrape_page(driver, base_url, page):
             if title_elem and title_elem.a:
                 link = title_elem.a['href']
                 full_url = urljoin(base_url, link)
-                releases.append(scrape_press_release(driver, full_url))
+                if robots.can_fetch(full_url):
+                    releases.append(fetch_release_sync(journal, full_url, scrape_press_release, driver, robots=robots))
+                else:
+                    logger.info("robots.txt disallows scraping %s", full_url)
 
         return releases
     except TimeoutException:
-        print(f"Timeout occurred while loading page {page}")
-        return []
+        logger.warning("Timeout occurred while loading page %s", page)
+        report_driver(proxies, driver, False)
+        return None
     except Exception as e:
-        print(f"An error occurred while scraping page {page}: {e}")
-        return []
-
-def scrape_all_press_releases(base_url, start_page, end_page, filename, use_proxy=False):
-    all_releases = []
-    driver = setup_driver(use_proxy)
-    empty_pages = 0
+        logger.error("An error occurred while scraping page %s: %s", page, e)
+        return None
+
+def scrape_all_press_releases(base_url, start_page, end_page, filename, use_proxy=False, workers=2):
+    # end_page only caps the crawl; the last page is found by probing
+    driver = setup_driver(use_proxy, proxies, site="lee")
+    drivers = [driver]
+    robots.load_sync(base_url)
+    journal = CrawlJournal("lee", filename)
+
+    def refresh(driver):
+        if not use_proxy or proxies.is_healthy(driver.proxy_endpoint):
+            return driver
+        driver.quit()
+        return setup_driver(use_proxy, proxies, site="lee")
 
+    scraped = 0  # Releases live only in the output file; this is just the count
     try:
-        for page in range(start_page, end_page + 1):
-            page_releases = scrape_page(driver, base_url, page)
-            if not page_releases:
-                empty_pages += 1
-                if empty_pages >= 3:  # Stop if we encounter 3 consecutive empty pages
-                    print(f"No more press releases found after 3 consecutive empty pages. Stopping.")
-                    break
-            else:
-                empty_pages = 0  # Reset the counter if we find releases
-                all_releases.extend(page_releases)
-
-                with open(filename, 'a', encoding='utf-8') as f:
-                    for release in page_releases:
-                        f.write(release)
-
-            print(f"Completed page {page}")
-            time.sleep(2)  # Short delay between pages
+        discovered = scrape_discovered_sync(driver, "lee", base_url, journal)
+        if discovered is not None:
+            return discovered, journal.filename
+
+        last_page, probes = find_last_page_sync("lee", base_url, driver)
+        if end_page is not None:
+            last_page = min(last_page, end_page)
+        logger.info("Last listing page is %s (%d probes)", last_page, len(probes))
+
+        drivers += [setup_driver(use_proxy, proxies, site="lee") for _ in range(workers - 1)]
+        scraped, completed = scrape_listing_pages_sync(scrape_page, drivers, base_url, journal.resume_page(start_page),
+                                                       last_page, journal, refresh)
+        if completed:
+            journal.finish()
     except Exception as e:
-        print(f"An error occurred during scraping: {e}")
+        logger.exception("An error occurred during scraping: %s", e)
     finally:
-        driver.quit()
+        for driver in drivers:
+            driver.quit()
+        logger.info("%s", page_stats_summary("lee"))
 
-    return all_releases
+    return scraped, journal.filename
 
 if __name__ == "__main__":
+    setup_logging(json_path="lee_scrape.jsonl")
     base_url = "https://www.lee.senate.gov/press-releases"
     start_page = 1
-    end_page = 119  # Set to the last known page number
+    end_page = None  # Found by probing; set a number to stop early
     filename = f"lee_press_releases_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
 
     start_time = time.time()
+    display = start_display("lee_metrics.prom")
 
     use_proxy = False  # Set this to True if you want to use the proxy
-    all_releases = scrape_all_press_releases(base_url, start_page, end_page, filename, use_proxy=use_proxy)
-    print(f"Total press releases scraped: {len(all_releases)}")
+    scraped, filename = scrape_all_press_releases(base_url, start_page, end_page, filename, use_proxy=use_proxy)
+    display.stop()
+    print(f"Total press releases scraped: {scraped}")
 
     end_time = time.time()
     print(f"Press releases appended to: {filename}")
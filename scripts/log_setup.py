@@ -0,0 +1,118 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# Verbosity comes from LOG_LEVEL (DEBUG shows every fetched URL); LOG_JSON
+# names a file that gets every record as one JSON object per line.
+CONSOLE_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+THROTTLE_INTERVAL = 5.0
+
+# Attributes every LogRecord has; anything else came in through extra=
+STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "throttle", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateFilter(logging.Filter):
+    # extra={"throttle": key} lets through at most one record per key every
+    # interval seconds; extra={"sample": n} lets through every n-th record of
+    # that message. The next record that passes carries the number dropped.
+    def __init__(self, interval=THROTTLE_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self.last = {}
+        self.counts = {}
+        self.suppressed = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        throttle = getattr(record, "throttle", None)
+        sample = getattr(record, "sample", None)
+        if throttle is None and not sample:
+            return True
+
+        key = throttle if throttle is not None else (record.name, record.msg)
+        with self.lock:
+            if throttle is not None:
+                now = time.monotonic()
+                if now - self.last.get(key, float("-inf")) < self.interval:
+                    self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                    return False
+                self.last[key] = now
+            if sample:
+                count = self.counts.get(key, 0)
+                self.counts[key] = count + 1
+                if count % sample:
+                    self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                    return False
+            suppressed = self.suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def _queue_handler(log_queue):
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RateFilter())
+    return handler
+
+
+def setup_logging(level=None, json_path=None, console=True, log_queue=None):
+    # Hot paths only pay for a level check and a queue put; formatting and
+    # I/O happen on the listener thread. Pass a multiprocessing queue to let
+    # worker processes (see worker_logging) log through the same listener.
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    json_path = json_path or os.environ.get("LOG_JSON")
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(stream)
+    if json_path:
+        file_handler = logging.FileHandler(json_path, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = log_queue if log_queue is not None else queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+    root.addHandler(_queue_handler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def worker_logging(log_queue, level=None):
+    # ProcessPoolExecutor initializer: send this process's records to the parent
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level or os.environ.get("LOG_LEVEL", "INFO"))
+    root.addHandler(_queue_handler(log_queue))
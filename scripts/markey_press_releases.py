@@ -1,11 +1,21 @@
 import asyncio
+import logging
 import aiohttp
 from bs4 import BeautifulSoup
+from html_text import preserve_formatting
 import time
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 import ssl
 import datetime
-from urllib import robotparser
+from robots_policy import RobotsCache
+from proxy_pool import ProxyPool, report_session, open_session
+from log_setup import setup_logging
+from crawl_metrics import metrics, host_label, start_display
+from checkpoint import CrawlJournal, fetch_release
+from sites import listing_strainer, page_url
+from content_extractor import generic_text, uses_generic
+from url_discovery import scrape_discovered
+from pagination import find_last_page, scrape_listing_pages
 
 # Create a custom SSL context that doesn't verify certificates
 ssl_context = ssl.create_default_context()
@@ -18,46 +28,29 @@ HEADERS = {
     'From': 'educational reasons only',
 }
 
-async def check_robots_txt(session, base_url):
-    parsed_url = urlparse(base_url)
-    robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
-    
-    async with session.get(robots_url, ssl=ssl_context) as response:
-        if response.status == 200:
-            print(f"robots.txt found. Content:\n{await response.text()}\n")
-            return await response.text()
-        else:
-            print("No robots.txt found.")
-            return None
-
-def can_fetch(robots_txt, user_agent, url):
-    if not robots_txt:
-        return True
-    
-    rp = robotparser.RobotFileParser()
-    rp.parse(robots_txt.splitlines())
-    return rp.can_fetch(user_agent, url)
+robots = RobotsCache(HEADERS['User-Agent'])
+proxies = ProxyPool()
+logger = logging.getLogger("markey")
 
-async def get_soup(session, url):
-    print(f"Fetching URL: {url}")
-    async with session.get(url, ssl=ssl_context, headers=HEADERS) as response:
-        print(f"Status code: {response.status} for {url}")
-        return BeautifulSoup(await response.text(), 'html.parser')
-
-def preserve_formatting(element):
-    if not element:
-        return "No content found"
-    
-    formatted_text = ""
-    for child in element.descendants:
-        if child.name == 'p':
-            text = child.get_text(strip=True)
-            if text:
-                formatted_text += text + "\n\n"
-        elif child.name == 'br':
-            formatted_text += "\n"
-    
-    return formatted_text.strip()
+async def get_soup(session, url, phase="detail", parse_only=None):
+    logger.debug("Fetching %s", url)
+    host = host_label(url)
+    start = time.time()
+    try:
+        with metrics.timer("crawl_request_seconds", host=host, phase=phase):
+            async with session.get(url, ssl=ssl_context, headers=HEADERS) as response:
+                logger.debug("Status %s for %s", response.status, url, extra={"url": url, "status": response.status})
+                robots.mark(url)
+                body = await response.read()
+                text = await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        report_session(proxies, session, False)
+        raise
+    report_session(proxies, session, True, time.time() - start)
+    metrics.inc("crawl_responses_total", host=host, status=response.status)
+    metrics.inc("crawl_bytes_in_total", len(body), host=host)
+    with metrics.timer("crawl_phase_seconds", phase="parse"):
+        return BeautifulSoup(text, 'html.parser', parse_only=parse_only)
 
 async def scrape_press_release(session, url):
     soup = await get_soup(session, url)
@@ -71,76 +64,76 @@ async def scrape_press_release(session, url):
     title_text = title_elem.text.strip() if title_elem else 'No title found'
     
     # Scrape the main content
-    content = soup.find('div', class_='RawHTML')
+    content = None if uses_generic("markey") else soup.find('div', class_='RawHTML')
     if content:
         text = preserve_formatting(content)
     else:
-        print(f"No content found for {url}")
-        text = 'No content found'
+        text = generic_text("markey", soup, url)
     
     return f"Title: {title_text}\nDate: {date_text}\n\nContent:\n{text}\n\n==\n"
 
-async def scrape_page(session, base_url, page, robots_txt):
-    url = f"{base_url}{page}"
+async def scrape_page(session, base_url, page, journal=None):
+    url = page_url("markey", base_url, page)
     
-    if not can_fetch(robots_txt, HEADERS['User-Agent'], url):
-        print(f"robots.txt disallows scraping {url}")
+    if not robots.can_fetch(url):
+        logger.info("robots.txt disallows scraping %s", url)
         return []
     
-    soup = await get_soup(session, url)
+    await robots.wait(url)
+    soup = await get_soup(session, url, "listing", listing_strainer("markey"))
     
     links = soup.find_all('a', class_='ArticleBlock__title__link')
     if not links:
-        print(f"No more press releases found on page {page}. Stopping.")
+        logger.info("No more press releases found on page %s. Stopping.", page)
         return []
     
-    print(f"Found {len(links)} press release links on page {page}")
+    logger.debug("Found %s press release links on page %s", len(links), page)
     
     tasks = []
     for link in links:
         if 'href' in link.attrs:
             full_url = urljoin(base_url, link['href'])
-            if can_fetch(robots_txt, HEADERS['User-Agent'], full_url):
-                tasks.append(scrape_press_release(session, full_url))
+            if robots.can_fetch(full_url):
+                tasks.append(fetch_release(journal, full_url, scrape_press_release, session, robots=robots))
             else:
-                print(f"robots.txt disallows scraping {full_url}")
+                logger.info("robots.txt disallows scraping %s", full_url)
     
     return await asyncio.gather(*tasks)
 
-async def scrape_all_press_releases(base_url, start_page, filename, max_concurrent=5):
-    all_releases = []
-    page = start_page
-    connector = aiohttp.TCPConnector(ssl=ssl_context)
+async def scrape_all_press_releases(base_url, start_page, filename, max_concurrent=5, use_proxy=False):
+    scraped = 0  # Releases live only in the output file; this is just the count
+    journal = CrawlJournal("markey", filename)
+    page = journal.resume_page(start_page)
     
-    async with aiohttp.ClientSession(connector=connector) as session:
-        robots_txt = await check_robots_txt(session, base_url)
+    async with open_session(proxies, use_proxy, ssl=ssl_context) as session:
+        await robots.load(session, base_url, ssl=ssl_context, headers=HEADERS)
+
+        discovered = await scrape_discovered(session, "markey", base_url, journal)
+        if discovered is not None:
+            return discovered, journal.filename
         
-        while True:
-            page_releases = await scrape_page(session, base_url, page, robots_txt)
-            if not page_releases:
-                break
-            all_releases.extend(page_releases)
-            
-            # Append after each page
-            with open(filename, 'a', encoding='utf-8') as f:
-                for release in page_releases:
-                    f.write(release)
-            
-            page += 1
-            print(f"Moving to page {page}")
-            await asyncio.sleep(2)  # Short delay between pages
+        last_page, probes = await find_last_page("markey", base_url, session)
+        logger.info("Last listing page is %s (%d probes)", last_page, len(probes))
+        scraped = await scrape_listing_pages(scrape_page, session, base_url, page, last_page, journal, max_concurrent)
+
+        journal.finish()
     
-    return all_releases
+    return scraped, journal.filename
 
 if __name__ == "__main__":
+    setup_logging(json_path="markey_scrape.jsonl")
     base_url = "https://www.markey.senate.gov/news/press-releases?pagenum_rs="
-    start_page = 0  # Set your desired starting page here
-    filename = "markey_press_releases_20240802_023708.txt"  # Set your existing filename here
+    start_page = 0
+    # An interrupted run is picked up from .checkpoints/markey.journal and
+    # keeps appending to its original file, whose name is returned
+    filename = f"markey_press_releases_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
     
     start_time = time.time()
-    all_releases = asyncio.run(scrape_all_press_releases(base_url, start_page, filename))
+    display = start_display("markey_metrics.prom")
+    scraped, filename = asyncio.run(scrape_all_press_releases(base_url, start_page, filename))
+    display.stop()
     end_time = time.time()
     
-    print(f"Total press releases scraped: {len(all_releases)}")
+    print(f"Total press releases scraped: {scraped}")
     print(f"Press releases appended to: {filename}")
     print(f"Total time taken: {end_time - start_time:.2f} seconds")
\ No newline at end of file
@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import logging
+import time
+
+from bs4 import BeautifulSoup
+
+from log_setup import setup_logging
+from sites import SITES, listing_strainer, load_scraper, page_range, page_url
+
+logger = logging.getLogger("pagination")
+
+
+def boundary_search(first_page, hint=None):
+    # Generator: yields listing pages to probe and is sent back whether each
+    # one has entries; returns the last page that does (first_page - 1 when
+    # even the first is empty). Gallops from the last hit (or the hint) by
+    # doubling steps, then bisects the gap: O(log n) probes either way.
+    has_entries = yield first_page
+    if not has_entries:
+        return first_page - 1
+
+    low, high = first_page, None  # low has entries; high (once found) does not
+    if hint is not None and hint > first_page:
+        if (yield hint):
+            low = hint
+        else:
+            high = hint
+
+    step = 1
+    while high is None:
+        page = low + step
+        if (yield page):
+            low = page
+            step *= 2
+        else:
+            high = page
+
+    while high - low > 1:
+        page = (low + high) // 2
+        if (yield page):
+            low = page
+        else:
+            high = page
+    return low
+
+
+def listing_has_entries(name, html):
+    soup = BeautifulSoup(html, 'html.parser', parse_only=listing_strainer(name))
+    return soup.select_one(SITES[name]["listing_selector"]) is not None
+
+
+async def find_last_page(name, base_url=None, session=None, use_hint=True):
+    import aiohttp
+    module = load_scraper(name)
+    base_url = base_url or SITES[name]["base_url"]
+    first_page, end_page = page_range(name)
+    headers = getattr(module, "HEADERS", None)
+    probes = []
+
+    async def probe(session, page):
+        url = page_url(name, base_url, page)
+        await module.robots.wait(url)
+        async with session.get(url, ssl=module.ssl_context, headers=headers) as response:
+            found = response.status == 200 and listing_has_entries(name, await response.text())
+        probes.append((page, found))
+        return found
+
+    async def search(session):
+        await module.robots.load(session, base_url, ssl=module.ssl_context, headers=headers)
+        steps = boundary_search(first_page, end_page if use_hint else None)
+        page = next(steps)
+        try:
+            while True:
+                page = steps.send(await probe(session, page))
+        except StopIteration as done:
+            return done.value
+
+    if session is not None:
+        return await search(session), probes
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=module.ssl_context)) as session:
+        return await search(session), probes
+
+
+def find_last_page_sync(name, base_url=None, driver=None, use_hint=True):
+    from browser import setup_driver, wait_for_content
+    module = load_scraper(name)
+    base_url = base_url or SITES[name]["base_url"]
+    first_page, end_page = page_range(name)
+    probes = []
+    own_driver = driver is None
+    driver = driver or setup_driver(site=name)
+    module.robots.load_sync(base_url)
+
+    def probe(page):
+        url = page_url(name, base_url, page)
+        module.robots.wait_sync(url)
+        start = time.time()
+        driver.get(url)
+        wait_for_content(driver, "listing", start)
+        found = listing_has_entries(name, driver.page_source)
+        probes.append((page, found))
+        return found
+
+    steps = boundary_search(first_page, end_page if use_hint else None)
+    page = next(steps)
+    try:
+        while True:
+            page = steps.send(probe(page))
+    except StopIteration as done:
+        return done.value, probes
+    finally:
+        if own_driver:
+            driver.quit()
+
+
+async def scrape_listing_pages(scrape_page, session, base_url, first_page, last_page, journal, concurrency=5):
+    # Once the last page is known the listing pages can be fetched side by
+    # side: concurrency pages at a time, each window written in page order
+    # so the journal still resumes after the last page on disk
+    scraped = 0
+    for start in range(first_page, last_page + 1, concurrency):
+        window = range(start, min(start + concurrency, last_page + 1))
+        results = await asyncio.gather(*(scrape_page(session, base_url, page, journal) for page in window))
+        for page, page_releases in zip(window, results):
+            journal.write_page(page, page_releases)
+            scraped += len(page_releases)
+        logger.info("Completed page %s of %s", window[-1], last_page, extra={"throttle": "page"})
+    return scraped
+
+
+def scrape_listing_pages_sync(scrape_page, drivers, base_url, first_page, last_page, journal, refresh=None):
+    # Selenium version: one browser per worker thread, one page each per
+    # window. A page that fails to load (None) gets one retry; if it fails
+    # again the crawl stops there, leaving it unsealed for the next run.
+    # Returns the releases written and whether every page was reached.
+    from concurrent.futures import ThreadPoolExecutor
+    scraped = 0
+    with ThreadPoolExecutor(max_workers=len(drivers)) as pool:
+        for start in range(first_page, last_page + 1, len(drivers)):
+            window = range(start, min(start + len(drivers), last_page + 1))
+            results = list(pool.map(lambda driver, page: scrape_page(driver, base_url, page, journal), drivers, window))
+            for page, page_releases in zip(window, results):
+                if page_releases is None:
+                    page_releases = scrape_page(drivers[0], base_url, page, journal)
+                if page_releases is None:
+                    logger.warning("Page %s failed to load twice; stopping", page)
+                    return scraped, False
+                journal.write_page(page, page_releases)
+                scraped += len(page_releases)
+            logger.info("Completed page %s of %s", window[-1], last_page, extra={"throttle": "page"})
+            if refresh is not None:
+                drivers[:] = [refresh(driver) for driver in drivers]
+    return scraped, True
+
+
+def discover_last_page(name, base_url=None, use_hint=True):
+    if SITES[name]["engine"] == "selenium":
+        return find_last_page_sync(name, base_url, use_hint=use_hint)
+    return asyncio.run(find_last_page(name, base_url, use_hint=use_hint))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find each member's last listing page with a handful of probes.")
+    parser.add_argument("sites", nargs="*", default=sorted(SITES))
+    parser.add_argument("--base-url", help="Override the listing URL (e.g. a fixture server)")
+    parser.add_argument("--no-hint", action="store_true", help="Ignore end_page from sites.py")
+    args = parser.parse_args()
+    setup_logging()
+
+    for name in args.sites:
+        start_time = time.time()
+        last_page, probes = discover_last_page(name, args.base_url, use_hint=not args.no_hint)
+        print(f"{name}: last page {last_page} after {len(probes)} probes in {time.time() - start_time:.1f} seconds")
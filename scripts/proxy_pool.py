@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+# PIA SOCKS5 proxy settings
+PIA_SERVERS = [
+    "proxy-us-atlanta.privateinternetaccess.com",
+    "proxy-us-california.privateinternetaccess.com",
+    "proxy-us-chicago.privateinternetaccess.com",
+    "proxy-us-dallas.privateinternetaccess.com",
+    "proxy-us-denver.privateinternetaccess.com",
+    "proxy-us-florida.privateinternetaccess.com",
+    "proxy-us-houston.privateinternetaccess.com",
+    "proxy-us-lasvegas.privateinternetaccess.com",
+    "proxy-us-newyorkcity.privateinternetaccess.com",
+    "proxy-us-seattle.privateinternetaccess.com",
+    "proxy-us-siliconvalley.privateinternetaccess.com",
+    "proxy-us-washingtondc.privateinternetaccess.com",
+    "proxy-us-baltimore.privateinternetaccess.com",
+    "proxy-us-boston.privateinternetaccess.com",
+    "proxy-us-charlotte.privateinternetaccess.com",
+    "proxy-us-detroit.privateinternetaccess.com",
+    "proxy-us-honolulu.privateinternetaccess.com",
+    "proxy-us-indianapolis.privateinternetaccess.com",
+    "proxy-us-losangeles.privateinternetaccess.com",
+    "proxy-us-miami.privateinternetaccess.com",
+    "proxy-us-minneapolis.privateinternetaccess.com",
+]
+PIA_PORT = 1080
+
+logger = logging.getLogger("proxy_pool")
+
+# PIA credentials
+PIA_USERNAME = os.getenv("PIA_USERNAME", "")
+PIA_PASSWORD = os.getenv("PIA_PASSWORD", "")
+
+
+class ProxyError(Exception):
+    pass
+
+
+async def probe(host, port, username="", password="", timeout=5.0):
+    # Connects and completes the SOCKS5 greeting (and RFC 1929 login when
+    # credentials are set); returns the round-trip time in seconds
+    start = time.monotonic()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        method = 0x02 if username else 0x00
+        writer.write(bytes([0x05, 0x01, method]))
+        await writer.drain()
+        reply = await asyncio.wait_for(reader.readexactly(2), timeout)
+        if reply != bytes([0x05, method]):
+            raise ProxyError(f"SOCKS5 greeting rejected by {host}:{port}: {reply!r}")
+        if username:
+            user, secret = username.encode('utf-8'), password.encode('utf-8')
+            writer.write(bytes([0x01, len(user)]) + user + bytes([len(secret)]) + secret)
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readexactly(2), timeout)
+            if reply[1] != 0x00:
+                raise ProxyError(f"SOCKS5 login rejected by {host}:{port}")
+        return time.monotonic() - start
+    finally:
+        writer.close()
+
+
+class ProxyStats:
+    def __init__(self):
+        self.latency = None  # Exponentially weighted, seconds
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.evictions = 0
+        self.evicted_until = 0.0
+
+    @property
+    def error_rate(self):
+        return self.failures / self.requests if self.requests else 0.0
+
+    def score(self):
+        # Lower is better; unmeasured proxies sort after measured healthy ones
+        latency = self.latency if self.latency is not None else 10.0
+        return latency * (1 + 4 * self.error_rate)
+
+
+class ProxyPool:
+    def __init__(self, endpoints=None, username=PIA_USERNAME, password=PIA_PASSWORD, max_failures=3,
+                 backoff=30.0, max_backoff=1800.0, smoothing=0.3, seed=None):
+        endpoints = endpoints or [(server, PIA_PORT) for server in PIA_SERVERS]
+        self.endpoints = [tuple(endpoint) for endpoint in endpoints]
+        self.username = username
+        self.password = password
+        self.max_failures = max_failures
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.smoothing = smoothing
+        self.random = random.Random(seed)
+        self.stats = {endpoint: ProxyStats() for endpoint in self.endpoints}
+        self.probed = False
+
+    def url(self, endpoint, credentials=True):
+        host, port = endpoint
+        if credentials and self.username:
+            return f"socks5://{self.username}:{self.password}@{host}:{port}"
+        return f"socks5://{host}:{port}"
+
+    def report(self, endpoint, ok, latency=None):
+        stats = self.stats[endpoint]
+        stats.requests += 1
+        if ok:
+            stats.consecutive_failures = 0
+            if latency is not None:
+                stats.latency = latency if stats.latency is None else (
+                    self.smoothing * latency + (1 - self.smoothing) * stats.latency)
+            return
+
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.max_failures:
+            stats.evictions += 1
+            stats.consecutive_failures = 0
+            backoff = min(self.backoff * 2 ** (stats.evictions - 1), self.max_backoff)
+            stats.evicted_until = time.monotonic() + backoff
+            logger.warning("Evicting proxy %s for %.0fs", endpoint[0], backoff)
+
+    def is_healthy(self, endpoint):
+        return self.stats[endpoint].evicted_until <= time.monotonic()
+
+    def healthy(self):
+        return [endpoint for endpoint in self.endpoints if self.is_healthy(endpoint)]
+
+    async def probe_all(self, timeout=5.0):
+        async def check(endpoint):
+            try:
+                latency = await probe(endpoint[0], endpoint[1], self.username, self.password, timeout)
+                self.report(endpoint, True, latency)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ProxyError):
+                # A failed probe counts as a full eviction, not a single strike
+                for _ in range(self.max_failures - self.stats[endpoint].consecutive_failures):
+                    self.report(endpoint, False)
+
+        await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+        self.probed = True
+
+    def probe_all_sync(self, timeout=5.0):
+        # For the Selenium scrapers, which have no event loop of their own
+        asyncio.run(self.probe_all(timeout))
+
+    def acquire(self):
+        if not self.probed:
+            self.probe_all_sync()
+        return self.choose()
+
+    async def acquire_async(self):
+        # For code already inside an event loop, where asyncio.run can't be used
+        if not self.probed:
+            await self.probe_all()
+        return self.choose()
+
+    def choose(self):
+        # Power of two choices: pick two healthy proxies at random and keep the
+        # better-scored one, which spreads load without pinning to one server
+        candidates = self.healthy()
+        if not candidates:
+            candidates = sorted(self.endpoints, key=lambda endpoint: self.stats[endpoint].evicted_until)[:1]
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = self.random.sample(candidates, 2)
+        return first if self.stats[first].score() <= self.stats[second].score() else second
+
+    def connector(self, endpoint, **kwargs):
+        # aiohttp has no SOCKS support of its own; aiohttp_socks is optional
+        from aiohttp_socks import ProxyConnector
+        connector = ProxyConnector.from_url(self.url(endpoint), **kwargs)
+        connector.proxy_endpoint = endpoint
+        return connector
+
+    async def aiohttp_connector(self, endpoint=None, **kwargs):
+        return self.connector(endpoint or await self.acquire_async(), **kwargs)
+
+    def chrome_argument(self, endpoint=None):
+        # Chrome drops user:pass from --proxy-server and has no way to answer
+        # a SOCKS5 login, so an authenticated pool can't be used from Selenium
+        if self.username:
+            raise ProxyError("Chrome can't log in to SOCKS5 proxies; unset PIA_USERNAME/PIA_PASSWORD "
+                             "or run the Selenium scrapers without use_proxy")
+        endpoint = endpoint or self.acquire()
+        return f"--proxy-server={self.url(endpoint, credentials=False)}", endpoint
+
+    def summary(self):
+        lines = []
+        for endpoint in self.endpoints:
+            stats = self.stats[endpoint]
+            latency = f"{stats.latency * 1000:.0f}ms" if stats.latency is not None else "-"
+            state = "healthy" if self.is_healthy(endpoint) else "evicted"
+            lines.append(f"{endpoint[0]}:{endpoint[1]} {state} latency={latency} errors={stats.error_rate:.0%}")
+        return "\n".join(lines)
+
+
+def report_driver(pool, driver, ok, latency=None):
+    endpoint = getattr(driver, "proxy_endpoint", None)
+    if pool is not None and endpoint is not None:
+        pool.report(endpoint, ok, latency)
+
+
+def report_session(pool, session, ok, latency=None):
+    report_driver(pool, session.connector, ok, latency)
+
+
+class RotatingSession:
+    # aiohttp session on a pool proxy that moves to another proxy once the
+    # pool evicts its own. aiohttp can't route a single request through a
+    # SOCKS proxy, so moving means a new session on a new connector; the old
+    # one is left to finish its requests and closed on exit.
+    def __init__(self, pool, **kwargs):
+        self.pool = pool
+        self.kwargs = kwargs
+        self.session = None
+        self.retired = []
+
+    def _open(self, endpoint):
+        import aiohttp
+        if self.session is not None:
+            self.retired.append(self.session)
+        self.session = aiohttp.ClientSession(connector=self.pool.connector(endpoint, **self.kwargs))
+
+    async def __aenter__(self):
+        self._open(await self.pool.acquire_async())
+        return self
+
+    async def __aexit__(self, *exc):
+        for session in self.retired + [self.session]:
+            await session.close()
+
+    @property
+    def connector(self):
+        return self.session.connector
+
+    def get(self, url, **kwargs):
+        endpoint = self.session.connector.proxy_endpoint
+        if not self.pool.is_healthy(endpoint):
+            replacement = self.pool.choose()
+            if replacement != endpoint:
+                logger.info("Proxy %s was evicted; moving the session to %s", endpoint[0], replacement[0])
+                self._open(replacement)
+        return self.session.get(url, **kwargs)
+
+
+def open_session(pool, use_proxy, **kwargs):
+    # The session an aiohttp scraper crawls with: async with open_session(...)
+    import aiohttp
+    if use_proxy:
+        return RotatingSession(pool, **kwargs)
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(**kwargs))
+
+
+if __name__ == "__main__":
+    pool = ProxyPool()
+    pool.probe_all_sync()
+    print(pool.summary())
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib import robotparser
+from urllib.parse import urlparse
+
+DEFAULT_DELAY = 2  # Seconds between requests to a host whose robots.txt sets no pace
+DEFAULT_TTL = 3600
+RETRY_AFTER = 300  # Seconds before retrying a robots.txt reload that failed
+
+logger = logging.getLogger("robots")
+
+
+def host_of(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class RobotsCache:
+    def __init__(self, user_agent="*", ttl=DEFAULT_TTL, default_delay=DEFAULT_DELAY):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.default_delay = default_delay
+        self.enforce_delay = True  # Turned off for offline fixture runs
+        self.policies = {}  # host -> (RobotFileParser, expiry)
+        self.last_request = {}  # host -> time.monotonic() of the last request, or of the last slot handed out
+        self.loaders = {}  # host -> arguments of the load that fetched it, to reload once expired
+        self.lock = threading.Lock()  # Slots are also handed to Selenium worker threads
+
+    def _store(self, host, status, text):
+        if host in self.policies and (status is None or status >= 500):
+            # A failed reload keeps the policy already in force; expiry only
+            # means it is due for a refresh, never that anything is allowed
+            logger.warning("Keeping the previous robots.txt for %s until a reload succeeds", host)
+            parser = self.policies[host][0]
+            self.policies[host] = (parser, time.monotonic() + RETRY_AFTER)
+            return parser
+        parser = robotparser.RobotFileParser(f"{host}/robots.txt")
+        # Same conventions as RobotFileParser.read(): 401/403 forbid everything,
+        # any other failure allows everything
+        if status in (401, 403):
+            parser.disallow_all = True
+        elif status == 200 and text is not None:
+            parser.parse(text.splitlines())
+        else:
+            parser.allow_all = True
+        self.policies[host] = (parser, time.monotonic() + self.ttl)
+        return parser
+
+    def _cached(self, host):
+        entry = self.policies.get(host)
+        return entry[0] if entry else None
+
+    def _expired(self, host):
+        entry = self.policies.get(host)
+        return entry is None or entry[1] <= time.monotonic()
+
+    def _reloading(self, host):
+        # Requests made while a reload is in flight keep the current policy
+        entry = self.policies.get(host)
+        if entry:
+            self.policies[host] = (entry[0], time.monotonic() + RETRY_AFTER)
+
+    async def load(self, session, url, **kwargs):
+        host = host_of(url)
+        self.loaders[host] = ("async", session, kwargs)
+        if not self._expired(host):
+            return self._cached(host)
+        self._reloading(host)
+        try:
+            async with session.get(f"{host}/robots.txt", **kwargs) as response:
+                text = await response.text() if response.status == 200 else None
+                logger.debug("robots.txt status %s for %s", response.status, host)
+                return self._store(host, response.status, text)
+        except Exception as e:
+            logger.warning("Could not fetch robots.txt for %s: %s", host, e)
+            return self._store(host, None, None)
+
+    def load_sync(self, url, context=None, timeout=10):
+        host = host_of(url)
+        self.loaders[host] = ("sync", context, timeout)
+        if not self._expired(host):
+            return self._cached(host)
+        self._reloading(host)
+        request = urllib.request.Request(f"{host}/robots.txt", headers={"User-Agent": self.user_agent})
+        try:
+            with urllib.request.urlopen(request, context=context, timeout=timeout) as response:
+                return self._store(host, response.status, response.read().decode('utf-8', errors='replace'))
+        except urllib.error.HTTPError as e:
+            return self._store(host, e.code, None)
+        except Exception as e:
+            logger.warning("Could not fetch robots.txt for %s: %s", host, e)
+            return self._store(host, None, None)
+
+    def can_fetch(self, url):
+        parser = self._cached(host_of(url))
+        if parser is None:
+            return True
+        return parser.can_fetch(self.user_agent, url)
+
+    def sitemaps(self, url):
+        parser = self._cached(host_of(url))
+        return (parser.site_maps() or []) if parser else []
+
+    def delay(self, url):
+        parser = self._cached(host_of(url))
+        if parser is None:
+            return self.default_delay
+        crawl_delay = parser.crawl_delay(self.user_agent) or 0
+        rate = parser.request_rate(self.user_agent)
+        interval = rate.seconds / rate.requests if rate and rate.requests else 0
+        return max(float(crawl_delay), interval) or self.default_delay
+
+    def mark(self, url):
+        host = host_of(url)
+        self.last_request[host] = max(self.last_request.get(host, 0), time.monotonic())
+
+    def _reserve(self, url):
+        # Hands out the host's next request slot and returns how long to sleep
+        # until it. Slots are taken before sleeping, so concurrent requests
+        # (asyncio.gather over a listing page) queue up delay seconds apart
+        # instead of all waking at once.
+        host = host_of(url)
+        with self.lock:
+            now = time.monotonic()
+            last = self.last_request.get(host)
+            slot = now if last is None or not self.enforce_delay else max(now, last + self.delay(url))
+            self.last_request[host] = slot
+        return slot - now
+
+    async def wait(self, url):
+        host = host_of(url)
+        loader = self.loaders.get(host)
+        if loader and loader[0] == "async" and self._expired(host):
+            await self.load(loader[1], url, **loader[2])
+        remaining = self._reserve(url)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    def wait_sync(self, url):
+        host = host_of(url)
+        loader = self.loaders.get(host)
+        if loader and self._expired(host):
+            if loader[0] == "sync":
+                self.load_sync(url, *loader[1:])
+            else:
+                self.load_sync(url)
+        remaining = self._reserve(url)
+        if remaining > 0:
+            time.sleep(remaining)
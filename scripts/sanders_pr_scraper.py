@@ -1,6 +1,18 @@
 import asyncio
+import logging
 import aiohttp
 from bs4 import BeautifulSoup
+from html_text import preserve_formatting
+from robots_policy import RobotsCache
+from proxy_pool import ProxyPool, report_session, open_session
+from log_setup import setup_logging
+from crawl_metrics import metrics, host_label, start_display
+from checkpoint import CrawlJournal, fetch_release
+from sites import listing_strainer, page_url
+from content_extractor import generic_text, uses_generic
+from url_discovery import scrape_discovered
+from pagination import find_last_page, scrape_listing_pages
+from selector_cascade import SelectorCascade, cascade_summary
 import time
 from urllib.parse import urljoin
 import ssl
@@ -11,45 +23,63 @@ ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
-async def get_soup(session, url):
-    print(f"Fetching URL: {url}")
-    async with session.get(url, ssl=ssl_context) as response:
-        print(f"Status code: {response.status} for {url}")
-        return BeautifulSoup(await response.text(), 'html.parser')
+robots = RobotsCache()
+proxies = ProxyPool()
+logger = logging.getLogger("sanders")
 
-def preserve_formatting(element):
-    if not element:
-        return "No content found"
-    
-    formatted_text = ""
-    for child in element.descendants:
-        if child.name == 'p':
-            text = child.get_text(strip=True)
-            if text:
-                formatted_text += text + "\n\n"
-        elif child.name == 'br':
-            formatted_text += "\n"
-        elif child.string and child.string.strip():
-            formatted_text += child.string.strip() + "\n"
-    
-    while "\n\n\n" in formatted_text:
-        formatted_text = formatted_text.replace("\n\n\n", "\n\n")
-    
-    return formatted_text.strip()
+def evo_date(soup):
+    date_elem = soup.find('div', class_='evo-create-type')
+    return date_elem.find('div', class_='col-auto') if date_elem else None
+
+# Current pages are Elementor; older releases still use the evo template
+TEMPLATES = ("elementor",)
+
+TITLE = SelectorCascade("sanders", "title", [
+    ("h1.elementor-heading-title", lambda soup: soup.find('h1', class_='elementor-heading-title')),
+    ("h1.display-4", lambda soup: soup.find('h1', class_='display-4')),
+], templates=TEMPLATES)
+
+DATE = SelectorCascade("sanders", "date", [
+    ("span.elementor-post-info__item--type-date",
+     lambda soup: soup.find('span', class_='elementor-icon-list-text', attrs={'class': 'elementor-post-info__item--type-date'})),
+    ("div.evo-create-type div.col-auto", evo_date),
+], templates=TEMPLATES)
+
+CONTENT = SelectorCascade("sanders", "content", [
+    ("div.elementor-text-editor", lambda soup: soup.find('div', class_='elementor-text-editor')),
+    ("div.evo-press-release__body", lambda soup: soup.find('div', class_='evo-press-release__body')),
+    ("div.elementor-widget-container", lambda soup: soup.find('div', class_='elementor-widget-container')),
+], catch_all=["div.elementor-widget-container"], templates=TEMPLATES)
+
+async def get_soup(session, url, phase="detail", parse_only=None):
+    logger.debug("Fetching %s", url)
+    host = host_label(url)
+    start = time.time()
+    try:
+        with metrics.timer("crawl_request_seconds", host=host, phase=phase):
+            async with session.get(url, ssl=ssl_context) as response:
+                logger.debug("Status %s for %s", response.status, url, extra={"url": url, "status": response.status})
+                robots.mark(url)
+                body = await response.read()
+                text = await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        report_session(proxies, session, False)
+        raise
+    report_session(proxies, session, True, time.time() - start)
+    metrics.inc("crawl_responses_total", host=host, status=response.status)
+    metrics.inc("crawl_bytes_in_total", len(body), host=host)
+    with metrics.timer("crawl_phase_seconds", phase="parse"):
+        return BeautifulSoup(text, 'html.parser', parse_only=parse_only)
 
 async def scrape_press_release(session, url):
     soup = await get_soup(session, url)
     
     # Scrape the title
-    title_elem = soup.find('h1', class_='elementor-heading-title') or soup.find('h1', class_='display-4')
+    title_elem = TITLE.extract(soup)
     title_text = title_elem.text.strip() if title_elem else 'No title found'
     
     # Scrape the date
-    date_elem = soup.find('span', class_='elementor-icon-list-text', attrs={'class': 'elementor-post-info__item--type-date'})
-    if not date_elem:
-        date_elem = soup.find('div', class_='evo-create-type')
-        if date_elem:
-            date_elem = date_elem.find('div', class_='col-auto')
+    date_elem = DATE.extract(soup)
     date_text = date_elem.text.strip() if date_elem else 'No date found'
     
     # Scrape the subtitle (if exists)
@@ -57,68 +87,76 @@ async def scrape_press_release(session, url):
     subtitle_text = subtitle_elem.text.strip() if subtitle_elem else ''
     
     # Scrape the main content
-    content = soup.find('div', class_='elementor-text-editor') or soup.find('div', class_='evo-press-release__body')
-    if not content:
-        content = soup.find('div', class_='elementor-widget-container')
+    content = None if uses_generic("sanders") else CONTENT.extract(soup)
     
     if content:
         text = preserve_formatting(content)
     else:
-        print(f"No content found for {url}")
-        text = 'No content found'
+        text = generic_text("sanders", soup, url)
     
     return f"Title: {title_text}\nDate: {date_text}\nSubtitle: {subtitle_text}\n\nContent:\n{text}\n\n==\n"
 
-async def scrape_page(session, base_url, page):
-    url = f"{base_url}/{page}/" if page > 1 else base_url
-    soup = await get_soup(session, url)
+async def scrape_page(session, base_url, page, journal=None):
+    url = page_url("sanders", base_url, page)
+    if not robots.can_fetch(url):
+        logger.info("robots.txt disallows scraping %s", url)
+        return []
+    
+    await robots.wait(url)
+    soup = await get_soup(session, url, "listing", listing_strainer("sanders"))
     
     links = soup.find_all('h2', class_='elementor-post__title')
     if not links:
-        print(f"No more press releases found on page {page}. Stopping.")
+        logger.info("No more press releases found on page %s. Stopping.", page)
         return []
     
-    print(f"Found {len(links)} press release links on page {page}")
+    logger.debug("Found %s press release links on page %s", len(links), page)
     
     tasks = []
     for link in links:
         a_tag = link.find('a')
         if a_tag and 'href' in a_tag.attrs:
             full_url = urljoin(base_url, a_tag['href'])
-            tasks.append(scrape_press_release(session, full_url))
+            if robots.can_fetch(full_url):
+                tasks.append(fetch_release(journal, full_url, scrape_press_release, session, robots=robots))
+            else:
+                logger.info("robots.txt disallows scraping %s", full_url)
     
     return await asyncio.gather(*tasks)
 
-async def scrape_all_press_releases(base_url, max_concurrent=5):
-    all_releases = []
+async def scrape_all_press_releases(base_url, max_concurrent=5, use_proxy=False):
+    scraped = 0  # Releases live only in the output file; this is just the count
     page = 1
-    connector = aiohttp.TCPConnector(ssl=ssl_context)
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"sanders_press_releases_{timestamp}.txt"
+    journal = CrawlJournal("sanders", filename)
+    filename = journal.filename
+    page = journal.resume_page(page)
     
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while page <= 425:  # Adjust this if the total number of pages changes
-            page_releases = await scrape_page(session, base_url, page)
-            if not page_releases:
-                break
-            all_releases.extend(page_releases)
-            
-            # Save after each page
-            with open(filename, 'a', encoding='utf-8') as f:
-                for release in page_releases:
-                    f.write(release)
-            
-            page += 1
-            print(f"Moving to page {page}")
-            await asyncio.sleep(2)  # Short delay between pages
+    async with open_session(proxies, use_proxy, ssl=ssl_context) as session:
+        await robots.load(session, base_url, ssl=ssl_context)
+
+        discovered = await scrape_discovered(session, "sanders", base_url, journal)
+        if discovered is not None:
+            return discovered, filename
+        
+        last_page, probes = await find_last_page("sanders", base_url, session)
+        logger.info("Last listing page is %s (%d probes)", last_page, len(probes))
+        scraped = await scrape_listing_pages(scrape_page, session, base_url, page, last_page, journal, max_concurrent)
+
+        journal.finish()
     
-    return all_releases, filename
+    return scraped, filename
 
 if __name__ == "__main__":
+    setup_logging(json_path="sanders_scrape.jsonl")
     base_url = "https://www.sanders.senate.gov/media/press-releases"
     start_time = time.time()
-    all_releases, filename = asyncio.run(scrape_all_press_releases(base_url))
+    display = start_display("sanders_metrics.prom")
+    scraped, filename = asyncio.run(scrape_all_press_releases(base_url))
+    display.stop()
+    logger.info("%s", cascade_summary("sanders"))
     end_time = time.time()
-    print(f"Total press releases scraped: {len(all_releases)}")
+    print(f"Total press releases scraped: {scraped}")
     print(f"Press releases saved to: {filename}")
     print(f"Total time taken: {end_time - start_time:.2f} seconds")
\ No newline at end of file
@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+from crawl_metrics import metrics
+
+DECAY = 0.98  # Per lookup; a selector that stops matching after a redesign loses its lead in a few dozen pages
+
+CASCADES = defaultdict(list)  # site -> its cascades, for summaries
+
+
+def body_template(soup, markers):
+    # Cheap page-template key: the first marker found in the <body> classes
+    if not markers or soup.body is None:
+        return "default"
+    classes = " ".join(soup.body.get("class", []))
+    return next((marker for marker in markers if marker in classes), "default")
+
+
+class SelectorCascade:
+    # Ordered fallbacks for one field of one site. Each strategy is a
+    # function of the soup returning a truthy result or None. Strategies
+    # are tried best-first for the page's template, ranked by a decayed
+    # count of wins, with the written order breaking ties; catch_all
+    # strategies match almost any page, so they stay last and are only
+    # reached when every specific selector missed. Reordering only keeps the
+    # output unchanged for strategies that can't both match one page, so
+    # overlapping ones are listed in fixed: they may trade places with the
+    # others but always stay in their written order among themselves.
+    def __init__(self, site, field, strategies, catch_all=(), fixed=(), templates=(), decay=DECAY):
+        self.site = site
+        self.field = field
+        self.strategies = dict(strategies)
+        self.names = [name for name in self.strategies if name not in catch_all]
+        self.catch_all = [name for name in self.strategies if name in catch_all]
+        self.fixed = [name for name in self.names if name in fixed]
+        self.templates = templates
+        self.decay = decay
+        self.scores = defaultdict(dict)  # template -> name -> decayed wins
+        self.counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))  # template -> name -> [tries, hits]
+        self.lookups = defaultdict(int)
+        self.first_hits = defaultdict(int)  # Lookups answered by the first strategy tried
+        CASCADES[site].append(self)
+
+    def order(self, template):
+        scores = self.scores[template]
+        ranked = sorted(self.names, key=lambda name: -scores.get(name, 0.0))
+        fixed = iter(self.fixed)
+        ranked = [next(fixed) if name in self.fixed else name for name in ranked]
+        return ranked + self.catch_all
+
+    def extract(self, soup):
+        template = body_template(soup, self.templates)
+        self.lookups[template] += 1
+        for position, name in enumerate(self.order(template)):
+            result = self.strategies[name](soup)
+            counts = self.counts[template][name]
+            counts[0] += 1
+            if result:
+                counts[1] += 1
+                self._won(template, name)
+                if position == 0:
+                    self.first_hits[template] += 1
+                metrics.inc("crawl_selector_total", site=self.site, field=self.field, selector=name, result="hit")
+                return result
+            metrics.inc("crawl_selector_total", site=self.site, field=self.field, selector=name, result="miss")
+        return None
+
+    def _won(self, template, winner):
+        scores = self.scores[template]
+        for name in scores:
+            scores[name] *= self.decay
+        scores[winner] = scores.get(winner, 0.0) + 1
+
+    def stats(self):
+        return {
+            template: {
+                "lookups": self.lookups[template],
+                "first_choice_rate": self.first_hits[template] / self.lookups[template],
+                "order": self.order(template),
+                "selectors": {name: {"tries": tries, "hits": hits, "hit_rate": hits / tries}
+                              for name, (tries, hits) in self.counts[template].items()},
+            }
+            for template in self.lookups
+        }
+
+    def summary(self):
+        lines = []
+        for template, stats in self.stats().items():
+            selectors = ", ".join(f"{name} {stats['selectors'][name]['hit_rate']:.0%} of {stats['selectors'][name]['tries']}"
+                                  for name in stats["order"] if name in stats["selectors"])
+            lines.append(f"{self.site} {self.field} [{template}]: {stats['lookups']} lookups, "
+                         f"first choice hit {stats['first_choice_rate']:.0%}; {selectors}")
+        return "\n".join(lines)
+
+
+def cascade_summary(site):
+    return "\n".join(cascade.summary() for cascade in CASCADES[site] if cascade.lookups) or f"{site}: no selector lookups"
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import importlib
+from urllib.parse import urlparse
+
+# One entry per member scraper. start_page is only used by the scrapers
+# whose scrape_all_press_releases takes it. resource_allowlist lists
+# browser.BLOCKED_URL_PATTERNS entries a Selenium site still needs loaded, and
+# ready_selectors the elements whose text marks a detail page ready.
+# first_page is a site's first listing page and end_page the last one seen,
+# which pagination.boundary_search starts probing from. page_url builds a
+# listing page URL (the first page is the bare base_url when bare_first_page
+# is set), and listing_selector matches the entries on a listing page. detail_pattern matches press release URLs in
+# the site's sitemaps, and feeds (formatted with the site origin) add recent
+# ones; sites without a detail_pattern always page through listings.
+# content_selector is the element the scraper takes a release's text from
+# (benchmarks compare the generic extractor against it); "extractor":
+# "generic" makes the scraper use content_extractor instead of its selectors.
+SITES = {
+    "aoc": {
+        "module": "aoc_press_releases",
+        "engine": "aiohttp",
+        "base_url": "https://ocasio-cortez.house.gov/media/press-releases",
+        "page_url": "{base_url}?page={page}",
+        "listing_selector": "div.h3",
+        "content_selector": "div.evo-press-release__body",
+        "detail_pattern": r"/media/press-releases/[^/?#]+$",
+        "first_page": 0,
+    },
+    "hawley": {
+        "module": "hawley_press_releases",
+        "engine": "selenium",
+        "base_url": "https://www.hawley.senate.gov/press-releases",
+        "page_url": "{base_url}/page/{page}/?et_blog",
+        "bare_first_page": True,
+        "listing_selector": "article.et_pb_post",
+        "content_selector": "div.et_pb_post_content",
+        "start_page": 1,
+        "end_page": 92,
+        "resource_allowlist": [],
+        "ready_selectors": {"detail": "div.et_pb_post_content"},
+    },
+    "lee": {
+        "module": "lee_press_releases",
+        "engine": "selenium",
+        "base_url": "https://www.lee.senate.gov/press-releases",
+        "page_url": "{base_url}?page={page}",
+        "bare_first_page": True,
+        "listing_selector": "div.element",
+        "content_selector": "div.element-content",
+        "detail_pattern": r"lee\.senate\.gov/\d{4}/\d{1,2}/[^/?#]+",
+        "start_page": 1,
+        "end_page": 119,
+        "resource_allowlist": [],
+        "ready_selectors": {"detail": "div.element-content"},
+    },
+    "manchin": {
+        "module": "manchin_press_releases",
+        "engine": "selenium",
+        "base_url": "https://www.manchin.senate.gov/newsroom/press-releases",
+        "page_url": "{base_url}?PageNum_rs={page}",
+        "listing_selector": "a[href*='/newsroom/press-releases/']",
+        "content_selector": "#press",
+        "detail_pattern": r"/newsroom/press-releases/[^/?#]+",
+        "start_page": 1,
+        "end_page": 298,
+        "resource_allowlist": [],
+        "ready_selectors": {"detail": "#press, p"},
+    },
+    "markey": {
+        "module": "markey_press_releases",
+        "engine": "aiohttp",
+        "base_url": "https://www.markey.senate.gov/news/press-releases?pagenum_rs=",
+        "page_url": "{base_url}{page}",
+        "listing_selector": "a.ArticleBlock__title__link",
+        "content_selector": "div.RawHTML",
+        "detail_pattern": r"/news/press-releases/[^/?#]+",
+        "start_page": 0,
+    },
+    "mtg": {
+        "module": "mtg_press_releases",
+        "engine": "aiohttp",
+        "base_url": "https://greene.house.gov/news/documentquery.aspx?DocumentTypeID=27",
+        "page_url": "{base_url}&Page={page}",
+        "listing_selector": "h2.newsie-titler",
+        "content_selector": "div.newsbody",
+        "detail_pattern": r"documentsingle\.aspx\?DocumentID=\d+",
+        "feeds": ["{origin}/news/rss.aspx"],
+    },
+    "pocan": {
+        "module": "pocan_pr_scraper",
+        "engine": "aiohttp",
+        "base_url": "https://pocan.house.gov/media-center",
+        "page_url": "{base_url}?page={page}",
+        "listing_selector": "a.btn-primary",
+        "content_selector": "div.evo-press-release__body",
+        "detail_pattern": r"/media/press-releases/[^/?#]+$",
+        "first_page": 0,
+    },
+    "sanders": {
+        "module": "sanders_pr_scraper",
+        "engine": "aiohttp",
+        "base_url": "https://www.sanders.senate.gov/media/press-releases",
+        "page_url": "{base_url}/{page}/",
+        "bare_first_page": True,
+        "listing_selector": "h2.elementor-post__title",
+        "content_selector": "div.elementor-text-editor",
+        "detail_pattern": r"/press-releases/[^/?#]+/?$",
+        "feeds": ["{origin}/press-releases/feed/"],
+        "end_page": 425,
+    },
+    "stefanik": {
+        "module": "stefanik_press_releases",
+        "engine": "aiohttp",
+        "base_url": "https://stefanik.house.gov/press-releases",
+        "page_url": "{base_url}?page={page}",
+        "listing_selector": "td.recordListTitle",
+        "content_selector": "div.content",
+        "detail_pattern": r"stefanik\.house\.gov/\d{4}/\d{1,2}/[^/?#]+",
+        "feeds": ["{origin}/rss.xml"],
+    },
+}
+
+
+def origin_of(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def page_range(name):
+    # end_page is None when the site has no known last page
+    site = SITES[name]
+    first = site.get("first_page", site.get("start_page", 1))
+    return first, site.get("end_page")
+
+
+def page_url(name, base_url, page):
+    site = SITES[name]
+    if site.get("bare_first_page") and page <= page_range(name)[0]:
+        return base_url
+    return site["page_url"].format(base_url=base_url, page=page)
+
+
+@functools.lru_cache(maxsize=None)
+def listing_strainer(name):
+    from html_text import selector_strainer
+    return selector_strainer(SITES[name]["listing_selector"])
+
+
+def load_scraper(name):
+    return importlib.import_module(SITES[name]["module"])
+
+
+def run_scraper(name, base_url=None, filename=None, start_page=None, end_page=None):
+    site = SITES[name]
+    module = load_scraper(name)
+    base_url = base_url or site["base_url"]
+    filename = filename or f"{name}_press_releases.txt"
+    start_page = site.get("start_page") if start_page is None else start_page
+
+    if site["engine"] == "selenium":
+        result = module.scrape_all_press_releases(base_url, start_page, end_page, filename)
+    elif "start_page" in site:
+        result = asyncio.run(module.scrape_all_press_releases(base_url, start_page, filename))
+    else:
+        result = asyncio.run(module.scrape_all_press_releases(base_url))
+
+    # Some scrapers return (count, filename), others just the count
+    return result[0] if isinstance(result, tuple) else result
@@ -1,6 +1,17 @@
 import asyncio
+import logging
 import aiohttp
 from bs4 import BeautifulSoup
+from html_text import preserve_formatting
+from robots_policy import RobotsCache
+from proxy_pool import ProxyPool, report_session, open_session
+from log_setup import setup_logging
+from crawl_metrics import metrics, host_label, start_display
+from checkpoint import CrawlJournal, fetch_release
+from sites import listing_strainer, page_url
+from content_extractor import generic_text, uses_generic
+from url_discovery import scrape_discovered
+from pagination import find_last_page, scrape_listing_pages
 import time
 from urllib.parse import urljoin
 import ssl
@@ -11,25 +22,29 @@ ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
-async def get_soup(session, url):
-    print(f"Fetching URL: {url}")
-    async with session.get(url, ssl=ssl_context) as response:
-        print(f"Status code: {response.status} for {url}")
-        return BeautifulSoup(await response.text(), 'html.parser')
+robots = RobotsCache()
+proxies = ProxyPool()
+logger = logging.getLogger("stefanik")
 
-def preserve_formatting(element):
-    if not element:
-        return "No content found"
-    
-    formatted_text = ""
-    for child in element.find_all('p'):
-        text = child.get_text(strip=True)
-        if text:
-            if formatted_text:
-                formatted_text += "\n\n"  # Add one paragraph spacing
-            formatted_text += text
-    
-    return formatted_text.strip()
+async def get_soup(session, url, phase="detail", parse_only=None):
+    logger.debug("Fetching %s", url)
+    host = host_label(url)
+    start = time.time()
+    try:
+        with metrics.timer("crawl_request_seconds", host=host, phase=phase):
+            async with session.get(url, ssl=ssl_context) as response:
+                logger.debug("Status %s for %s", response.status, url, extra={"url": url, "status": response.status})
+                robots.mark(url)
+                body = await response.read()
+                text = await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        report_session(proxies, session, False)
+        raise
+    report_session(proxies, session, True, time.time() - start)
+    metrics.inc("crawl_responses_total", host=host, status=response.status)
+    metrics.inc("crawl_bytes_in_total", len(body), host=host)
+    with metrics.timer("crawl_phase_seconds", phase="parse"):
+        return BeautifulSoup(text, 'html.parser', parse_only=parse_only)
 
 async def scrape_press_release(session, url):
     soup = await get_soup(session, url)
@@ -43,65 +58,74 @@ async def scrape_press_release(session, url):
     date_text = date_elem.get_text(strip=True) if date_elem else 'No date found'
     
     # Scrape the main content
-    content_elem = soup.find('div', class_='content')
+    content_elem = None if uses_generic("stefanik") else soup.find('div', class_='content')
     if content_elem:
         text = preserve_formatting(content_elem)
     else:
-        print(f"No content found for {url}")
-        text = 'No content found'
+        text = generic_text("stefanik", soup, url)
     
     return f"Title: {title_text}\nDate: {date_text}\n\nContent:\n{text}\n\n==\n"
 
-async def scrape_page(session, base_url, page):
-    url = f"{base_url}?page={page}"
-    soup = await get_soup(session, url)
+async def scrape_page(session, base_url, page, journal=None):
+    url = page_url("stefanik", base_url, page)
+    if not robots.can_fetch(url):
+        logger.info("robots.txt disallows scraping %s", url)
+        return []
+    
+    await robots.wait(url)
+    soup = await get_soup(session, url, "listing", listing_strainer("stefanik"))
     
     links = soup.find_all('td', class_='recordListTitle')
     if not links:
-        print(f"No more press releases found on page {page}. Stopping.")
+        logger.info("No more press releases found on page %s. Stopping.", page)
         return []
     
-    print(f"Found {len(links)} press release links on page {page}")
+    logger.debug("Found %s press release links on page %s", len(links), page)
     
     tasks = []
     for link in links:
         a_tag = link.find('a')
         if a_tag and 'href' in a_tag.attrs:
             full_url = urljoin(base_url, a_tag['href'])
-            tasks.append(scrape_press_release(session, full_url))
+            if robots.can_fetch(full_url):
+                tasks.append(fetch_release(journal, full_url, scrape_press_release, session, robots=robots))
+            else:
+                logger.info("robots.txt disallows scraping %s", full_url)
     
     return await asyncio.gather(*tasks)
 
-async def scrape_all_press_releases(base_url, max_concurrent=5):
-    all_releases = []
+async def scrape_all_press_releases(base_url, max_concurrent=5, use_proxy=False):
+    scraped = 0  # Releases live only in the output file; this is just the count
     page = 1
-    connector = aiohttp.TCPConnector(ssl=ssl_context)
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"stefanik_press_releases_{timestamp}.txt"
+    journal = CrawlJournal("stefanik", filename)
+    filename = journal.filename
+    page = journal.resume_page(page)
     
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while True:
-            page_releases = await scrape_page(session, base_url, page)
-            if not page_releases:
-                break
-            all_releases.extend(page_releases)
-            
-            # Save after each page
-            with open(filename, 'a', encoding='utf-8') as f:
-                for release in page_releases:
-                    f.write(release)
-            
-            page += 1
-            print(f"Moving to page {page}")
-            await asyncio.sleep(2)  # Short delay between pages
+    async with open_session(proxies, use_proxy, ssl=ssl_context) as session:
+        await robots.load(session, base_url, ssl=ssl_context)
+
+        discovered = await scrape_discovered(session, "stefanik", base_url, journal)
+        if discovered is not None:
+            return discovered, filename
+        
+        last_page, probes = await find_last_page("stefanik", base_url, session)
+        logger.info("Last listing page is %s (%d probes)", last_page, len(probes))
+        scraped = await scrape_listing_pages(scrape_page, session, base_url, page, last_page, journal, max_concurrent)
+
+        journal.finish()
     
-    return all_releases, filename
+    return scraped, filename
 
 if __name__ == "__main__":
+    setup_logging(json_path="stefanik_scrape.jsonl")
     base_url = "https://stefanik.house.gov/press-releases"
     start_time = time.time()
-    all_releases, filename = asyncio.run(scrape_all_press_releases(base_url))
+    display = start_display("stefanik_metrics.prom")
+    scraped, filename = asyncio.run(scrape_all_press_releases(base_url))
+    display.stop()
     end_time = time.time()
-    print(f"Total press releases scraped: {len(all_releases)}")
+    print(f"Total press releases scraped: {scraped}")
     print(f"Press releases saved to: {filename}")
     print(f"Total time taken: {end_time - start_time:.2f} seconds")
\ No newline at end of file
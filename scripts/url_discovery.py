@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+import ssl
+import urllib.request
+import zlib
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from checkpoint import CrawlJournal, fetch_release, fetch_release_sync
+from crawl_metrics import metrics, host_label
+from log_setup import setup_logging
+from sites import SITES, load_scraper, origin_of
+
+CHUNK_SIZE = 64 * 1024
+MAX_DOCUMENTS = 500  # Sitemap index fan-out cap per site
+BATCH_SIZE = 20  # Discovered detail pages scraped (and checkpointed) together
+
+logger = logging.getLogger("url_discovery")
+
+ssl_context = ssl.create_default_context()
+ssl_context.check_hostname = False
+ssl_context.verify_mode = ssl.CERT_NONE
+
+
+class FeedParser:
+    # Incremental parser for sitemaps, sitemap indexes, RSS and Atom. Chunks
+    # go in as they arrive off the socket; each <url>/<item>/<entry> is
+    # handled and cleared as soon as its end tag is seen, so only an empty
+    # stub per entry outlives it. Gzipped documents (sitemap.xml.gz) are
+    # detected from their magic bytes.
+    def __init__(self):
+        self.parser = XMLPullParser(events=("end",))
+        self.decompressor = None
+        self.started = False
+        self.failed = False
+        self.pages = []  # (url, lastmod)
+        self.sitemaps = []
+
+    def feed(self, chunk):
+        if self.failed:
+            return
+        if not self.started:
+            self.started = True
+            if chunk[:2] == b"\x1f\x8b":
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk)
+        try:
+            self.parser.feed(chunk)
+            for _, element in self.parser.read_events():
+                self._handle(element)
+        except ParseError:
+            # Not XML (often an HTML 404 page served with status 200)
+            self.failed = True
+
+    def _handle(self, element):
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag in ("url", "sitemap"):
+            loc = lastmod = None
+            for child in element:
+                name = child.tag.rsplit('}', 1)[-1]
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (child.text or "").strip()
+            if loc:
+                (self.pages if tag == "url" else self.sitemaps).append((loc, lastmod))
+            element.clear()
+        elif tag == "item":
+            link = element.findtext("link")
+            published = element.findtext("pubDate")
+            if link:
+                self.pages.append((link.strip(), published))
+            element.clear()
+        elif tag == "entry":
+            link = updated = None
+            for child in element:
+                name = child.tag.rsplit('}', 1)[-1]
+                if name == "link" and child.get("rel", "alternate") == "alternate":
+                    link = child.get("href")
+                elif name == "updated":
+                    updated = (child.text or "").strip()
+            if link:
+                self.pages.append((link, updated))
+            element.clear()
+
+
+def discovery(name, base_url, robots):
+    # Generator shared by the async and sync fetchers: yields a document URL
+    # and is sent its FeedParser (None when the fetch failed); returns detail
+    # URLs, newest first. Feeds only add to a sitemap, as they usually list
+    # just the latest items.
+    site = SITES[name]
+    origin = origin_of(base_url)
+    pattern = site.get("detail_pattern")
+    if not pattern:
+        return []
+    pattern = re.compile(pattern)
+
+    queue = list(robots.sitemaps(base_url)) or [f"{origin}/sitemap.xml"]
+    seen_documents = set()
+    found = {}
+    from_sitemaps = False
+    documents = 0
+    while queue and documents < MAX_DOCUMENTS:
+        document = queue.pop(0)
+        if document in seen_documents:
+            continue
+        seen_documents.add(document)
+        documents += 1
+        parsed = yield document
+        if parsed is None:
+            continue
+        queue.extend(loc for loc, _ in parsed.sitemaps)
+        for url, lastmod in parsed.pages:
+            if pattern.search(url):
+                found.setdefault(url, lastmod or "")
+                from_sitemaps = True
+
+    if not from_sitemaps:
+        return []
+    for feed in site.get("feeds", []):
+        parsed = yield feed.format(origin=origin)
+        for url, published in parsed.pages if parsed else []:
+            if pattern.search(url):
+                found.setdefault(url, "")
+
+    urls = [url for url in found if robots.can_fetch(url)]
+    # ISO lastmod strings sort chronologically; undated URLs go last
+    urls.sort(key=lambda url: found[url], reverse=True)
+    return urls
+
+
+async def fetch_document(session, url, **kwargs):
+    parser = FeedParser()
+    host = host_label(url)
+    try:
+        with metrics.timer("crawl_request_seconds", host=host, phase="discovery"):
+            async with session.get(url, **kwargs) as response:
+                metrics.inc("crawl_responses_total", host=host, status=response.status)
+                if response.status != 200:
+                    return None
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    metrics.inc("crawl_bytes_in_total", len(chunk), host=host)
+                    parser.feed(chunk)
+    except Exception as e:
+        logger.warning("Could not fetch %s: %s", url, e)
+        return None
+    return None if parser.failed else parser
+
+
+def fetch_document_sync(url, user_agent="*"):
+    parser = FeedParser()
+    request = urllib.request.Request(url, headers={"User-Agent": user_agent})
+    host = host_label(url)
+    try:
+        with metrics.timer("crawl_request_seconds", host=host, phase="discovery"), \
+                urllib.request.urlopen(request, context=ssl_context, timeout=30) as response:
+            metrics.inc("crawl_responses_total", host=host, status=response.status)
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                metrics.inc("crawl_bytes_in_total", len(chunk), host=host)
+                parser.feed(chunk)
+    except Exception as e:
+        logger.warning("Could not fetch %s: %s", url, e)
+        return None
+    return None if parser.failed else parser
+
+
+async def discover_urls(session, name, base_url=None):
+    module = load_scraper(name)
+    base_url = base_url or SITES[name]["base_url"]
+    kwargs = {"ssl": module.ssl_context, "headers": getattr(module, "HEADERS", None)}
+    steps = discovery(name, base_url, module.robots)
+    try:
+        document = next(steps)
+        while True:
+            await module.robots.wait(document)
+            document = steps.send(await fetch_document(session, document, **kwargs))
+    except StopIteration as done:
+        return done.value
+
+
+def discover_urls_sync(name, base_url=None):
+    module = load_scraper(name)
+    base_url = base_url or SITES[name]["base_url"]
+    steps = discovery(name, base_url, module.robots)
+    try:
+        document = next(steps)
+        while True:
+            module.robots.wait_sync(document)
+            document = steps.send(fetch_document_sync(document, module.robots.user_agent))
+    except StopIteration as done:
+        return done.value
+
+
+def batches(urls, start):
+    for batch in range(start, (len(urls) + BATCH_SIZE - 1) // BATCH_SIZE):
+        yield batch, urls[batch * BATCH_SIZE:(batch + 1) * BATCH_SIZE]
+
+
+async def scrape_discovered(session, name, base_url, journal):
+    # Returns the number of releases written, or None when the crawl should
+    # page through listings instead: no usable sitemap, or an interrupted
+    # paginated crawl is being resumed. A resumed sitemap crawl walks the URL
+    # list saved when it started, not a fresh discovery whose order may have
+    # shifted since
+    if journal.page is not None:
+        return None
+    module = load_scraper(name)
+    sitemap_journal = CrawlJournal(f"{name}-sitemap", journal.filename, os.path.dirname(journal.path), parent=journal)
+    urls = sitemap_journal.saved_urls()
+    if urls is None:
+        urls = await discover_urls(session, name, base_url)
+        if not urls:
+            logger.info("No sitemap URLs for %s; paging through listings", name)
+            return None
+        sitemap_journal.save_urls(urls)
+        logger.info("Discovered %d press release URLs for %s from sitemaps", len(urls), name)
+    scraped = 0
+    for batch, chunk in batches(urls, sitemap_journal.resume_page(0)):
+        batch_releases = await asyncio.gather(
+            *(fetch_release(sitemap_journal, url, module.scrape_press_release, session, robots=module.robots)
+              for url in chunk))
+        sitemap_journal.write_page(batch, batch_releases)
+        scraped += len(batch_releases)
+        logger.info("Completed batch %d of %d", batch + 1, (len(urls) + BATCH_SIZE - 1) // BATCH_SIZE, extra={"throttle": "batch"})
+    # Parent first, so a crash in between starts the next run afresh rather
+    # than re-crawling every sitemap URL into the old output file
+    journal.finish()
+    sitemap_journal.finish()
+    return scraped
+
+
+def scrape_discovered_sync(driver, name, base_url, journal):
+    if journal.page is not None:
+        return None
+    module = load_scraper(name)
+    sitemap_journal = CrawlJournal(f"{name}-sitemap", journal.filename, os.path.dirname(journal.path), parent=journal)
+    urls = sitemap_journal.saved_urls()
+    if urls is None:
+        urls = discover_urls_sync(name, base_url)
+        if not urls:
+            logger.info("No sitemap URLs for %s; paging through listings", name)
+            return None
+        sitemap_journal.save_urls(urls)
+        logger.info("Discovered %d press release URLs for %s from sitemaps", len(urls), name)
+    scraped = 0
+    for batch, chunk in batches(urls, sitemap_journal.resume_page(0)):
+        batch_releases = [fetch_release_sync(sitemap_journal, url, module.scrape_press_release, driver, robots=module.robots)
+                          for url in chunk]
+        sitemap_journal.write_page(batch, batch_releases)
+        scraped += len(batch_releases)
+        logger.info("Completed batch %d of %d", batch + 1, (len(urls) + BATCH_SIZE - 1) // BATCH_SIZE, extra={"throttle": "batch"})
+    journal.finish()
+    sitemap_journal.finish()
+    return scraped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List each member's press release URLs from sitemaps and feeds.")
+    parser.add_argument("sites", nargs="*", default=sorted(SITES))
+    parser.add_argument("--show", type=int, default=3, help="Print this many of the newest URLs")
+    args = parser.parse_args()
+    setup_logging()
+
+    for name in args.sites:
+        module = load_scraper(name)
+        module.robots.load_sync(SITES[name]["base_url"], context=ssl_context)
+        urls = discover_urls_sync(name)
+        print(f"{name}: {len(urls)} URLs" + ("" if urls else " (falls back to pagination)"))
+        for url in urls[:args.show]:
+            print(f"  {url}")
@@ -0,0 +1,345 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from corpus import corpus_files, iter_corpus, tokenize
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+QUERY_PART = re.compile(r'"([^"]+)"|(\S+)')
+YEAR = re.compile(r'\d{4}')
+
+ARRAYS = ["term_entry_start", "term_byte_start", "doc_bytes", "tf", "entry_pos_start", "pos_bytes", "doc_len", "doc_member", "doc_date"]
+
+
+def varbyte_widths(values):
+    widths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        widths += values >= (np.uint64(1) << np.uint64(shift))
+    return widths
+
+
+def varbyte_encode(values):
+    # Little-endian base-128, high bit set on every byte except the last of a value
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.uint8)
+    widths = varbyte_widths(values)
+
+    ends = np.cumsum(widths)
+    starts = ends - widths
+    out = np.empty(ends[-1], dtype=np.uint8)
+    for byte in range(widths.max()):
+        has_byte = widths > byte
+        chunk = (values[has_byte] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        more = (widths[has_byte] > byte + 1).astype(np.uint8) << 7
+        out[starts[has_byte] + byte] = chunk.astype(np.uint8) | more
+    return out
+
+
+def delta_encode_runs(values, run_lengths):
+    # Delta-encode each run independently, then varbyte the whole stream at once;
+    # returns the bytes and each run's byte offset (with a trailing total)
+    values = np.asarray(values, dtype=np.uint64)
+    run_lengths = np.asarray(run_lengths, dtype=np.int64)
+    run_starts = np.cumsum(run_lengths) - run_lengths
+    deltas = np.diff(values, prepend=np.uint64(0))
+    deltas[run_starts] = values[run_starts]
+    run_bytes = np.add.reduceat(varbyte_widths(deltas), run_starts) if len(values) else run_lengths
+    offsets = np.concatenate(([0], np.cumsum(run_bytes)))
+    return varbyte_encode(deltas), offsets
+
+
+def varbyte_decode(data):
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.uint64)
+    last = (data & 0x80) == 0
+    group_starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+    group = np.cumsum(np.concatenate(([0], last[:-1].astype(np.int64))))
+    shifts = (np.arange(len(data)) - group_starts[group]) * 7
+    parts = (data & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(parts, group_starts)
+
+
+def date_key(value, end=False):
+    # YYYYMMDD as an int; a bare year keys as YYYY0000 (or YYYY1231 for the
+    # end of a range). Raises ValueError on anything else
+    if not value:
+        return 0
+    if YEAR.fullmatch(value):
+        return int(value + ("1231" if end else "0000"))
+    return int(datetime.date.fromisoformat(value).strftime("%Y%m%d"))
+
+
+def build_index(records):
+    postings = defaultdict(lambda: defaultdict(list))
+    docs = []
+    members = []
+    member_codes = {}
+    doc_len = []
+    doc_member = []
+    doc_date = []
+
+    for doc_id, record in enumerate(records):
+        tokens = tokenize(f"{record['title']}\n{record['content']}")
+        for position, token in enumerate(tokens):
+            postings[token][doc_id].append(position)
+        if record["member"] not in member_codes:
+            member_codes[record["member"]] = len(members)
+            members.append(record["member"])
+        docs.append({"id": record["id"], "title": record["title"], "date": record.get("date_iso") or record["date"]})
+        doc_len.append(len(tokens))
+        doc_member.append(member_codes[record["member"]])
+        doc_date.append(date_key(record.get("date_iso")))
+
+    terms = sorted(postings)
+    doc_ids = []
+    doc_counts = []
+    positions = []
+    tfs = []
+    for term in terms:
+        by_doc = postings[term]
+        doc_ids.extend(by_doc)
+        doc_counts.append(len(by_doc))
+        for doc_positions in by_doc.values():
+            positions.extend(doc_positions)
+            tfs.append(len(doc_positions))
+
+    doc_bytes, term_byte_start = delta_encode_runs(doc_ids, doc_counts)
+    pos_bytes, entry_pos_start = delta_encode_runs(positions, tfs)
+
+    index = SearchIndex()
+    index.terms = {term: i for i, term in enumerate(terms)}
+    index.docs = docs
+    index.members = members
+    index.arrays = {
+        "term_entry_start": np.concatenate(([0], np.cumsum(doc_counts))).astype(np.int64),
+        "term_byte_start": term_byte_start.astype(np.int64),
+        "doc_bytes": doc_bytes,
+        "tf": np.array(tfs, dtype=np.uint32),
+        "entry_pos_start": entry_pos_start.astype(np.int64),
+        "pos_bytes": pos_bytes,
+        "doc_len": np.array(doc_len, dtype=np.uint32),
+        "doc_member": np.array(doc_member, dtype=np.uint8),
+        "doc_date": np.array(doc_date, dtype=np.int64),
+    }
+    return index
+
+
+class SearchIndex:
+    def __init__(self):
+        self.terms = {}
+        self.docs = []
+        self.members = []
+        self.arrays = {}
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), self.arrays[name])
+        with open(os.path.join(directory, "meta.json"), 'w', encoding='utf-8') as file:
+            json.dump({"terms": list(self.terms), "docs": self.docs, "members": self.members}, file)
+
+    @classmethod
+    def load(cls, directory):
+        index = cls()
+        # Arrays are memory-mapped, so only the pages a query touches are read
+        index.arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in ARRAYS}
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        index.terms = {term: i for i, term in enumerate(meta["terms"])}
+        index.docs = meta["docs"]
+        index.members = meta["members"]
+        return index
+
+    def postings(self, term):
+        term_id = self.terms.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        a = self.arrays
+        doc_bytes = a["doc_bytes"][a["term_byte_start"][term_id]:a["term_byte_start"][term_id + 1]]
+        doc_ids = np.cumsum(varbyte_decode(doc_bytes)).astype(np.int64)
+        entries = np.arange(a["term_entry_start"][term_id], a["term_entry_start"][term_id + 1])
+        return doc_ids, entries
+
+    def positions(self, entry):
+        a = self.arrays
+        data = a["pos_bytes"][a["entry_pos_start"][entry]:a["entry_pos_start"][entry + 1]]
+        return np.cumsum(varbyte_decode(data)).astype(np.int64)
+
+    def phrase_docs(self, tokens):
+        first_docs, first_entries = self.postings(tokens[0])
+        candidates = dict(zip(first_docs.tolist(), first_entries.tolist()))
+        others = []
+        for token in tokens[1:]:
+            doc_ids, entries = self.postings(token)
+            lookup = dict(zip(doc_ids.tolist(), entries.tolist()))
+            candidates = {doc: entry for doc, entry in candidates.items() if doc in lookup}
+            others.append(lookup)
+
+        matches = []
+        for doc, entry in candidates.items():
+            starts = self.positions(entry)
+            for offset, lookup in enumerate(others, 1):
+                starts = np.intersect1d(starts, self.positions(lookup[doc]) - offset, assume_unique=True)
+                if len(starts) == 0:
+                    break
+            if len(starts):
+                matches.append(doc)
+        return np.array(sorted(matches), dtype=np.int64)
+
+    def search(self, query, member=None, start=None, end=None, limit=20):
+        a = self.arrays
+        n_docs = len(self.docs)
+        if n_docs == 0:
+            return []
+        doc_len = np.asarray(a["doc_len"], dtype=np.float64)
+        avg_len = doc_len.mean() or 1.0
+        scores = np.zeros(n_docs, dtype=np.float64)
+        allowed = np.ones(n_docs, dtype=bool)
+
+        terms = []
+        for phrase, word in QUERY_PART.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if len(tokens) > 1:
+                    mask = np.zeros(n_docs, dtype=bool)
+                    mask[self.phrase_docs(tokens)] = True
+                    allowed &= mask
+                terms.extend(tokens)
+            else:
+                terms.extend(tokenize(word))
+
+        if member is not None:
+            if member not in self.members:
+                return []
+            allowed &= np.asarray(a["doc_member"]) == self.members.index(member)
+        if start or end:
+            # A year-only release (all of Stefanik's) could fall on any day of
+            # its year, so it matches every range that overlaps that year
+            first = np.asarray(a["doc_date"])
+            last = np.where(first % 10000 == 0, first + 1231, first)
+            allowed &= first > 0
+            if start:
+                allowed &= last >= date_key(start)
+            if end:
+                allowed &= first <= date_key(end, end=True)
+
+        matched = np.zeros(n_docs, dtype=bool)
+        for term in terms:
+            doc_ids, entries = self.postings(term)
+            if len(doc_ids) == 0:
+                continue
+            tf = np.asarray(a["tf"][entries], dtype=np.float64)
+            idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = K1 * (1 - B + B * doc_len[doc_ids] / avg_len)
+            scores[doc_ids] += idf * tf * (K1 + 1) / (tf + norm)
+            matched[doc_ids] = True
+
+        hits = np.flatnonzero(matched & allowed)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind='stable')]
+        return [dict(self.docs[doc], score=round(float(scores[doc]), 4)) for doc in hits]
+
+
+def search_params(query_string):
+    params = {key: values[0] for key, values in parse_qs(query_string).items()}
+    try:
+        limit = int(params.get("limit", 20))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    for name in ("start", "end"):
+        try:
+            date_key(params.get(name))
+        except ValueError:
+            raise ValueError(f"{name} must be YYYY or YYYY-MM-DD")
+    return params.get("q", ""), params.get("member"), params.get("start"), params.get("end"), limit
+
+
+def make_server(index, host="127.0.0.1", port=8765, cache_size=1024):
+    @lru_cache(maxsize=cache_size)
+    def cached_search(query, member, start, end, limit):
+        return json.dumps(index.search(query, member, start, end, limit)).encode('utf-8')
+
+    class SearchHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search":
+                self.send_error(404)
+                return
+            try:
+                params = search_params(url.query)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            body = cached_search(*params)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), SearchHandler)
+
+
+def serve(index, host="127.0.0.1", port=8765, cache_size=1024):
+    server = make_server(index, host, port, cache_size)
+    print(f"Serving search on http://{host}:{port}/search?q=...")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, query and serve an inverted index over the press releases.")
+    parser.add_argument("--snapshot", default="search_index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("input_directory", nargs="?", default="output")
+
+    query_parser = subparsers.add_parser("query")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--member")
+    query_parser.add_argument("--start", help="ISO date or year, inclusive")
+    query_parser.add_argument("--end", help="ISO date or year, inclusive")
+    query_parser.add_argument("--limit", type=int, default=20)
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args()
+    start_time = time.time()
+
+    if args.command == "build":
+        # Prefer the speech_corrector output, falling back to the raw archives
+        formatted = bool(corpus_files(args.input_directory, formatted=True))
+        index = build_index(iter_corpus(args.input_directory, formatted))
+        index.save(args.snapshot)
+        print(f"Indexed {len(index.docs)} releases, {len(index.terms)} terms into {args.snapshot}")
+    else:
+        index = SearchIndex.load(args.snapshot)
+        print(f"Loaded snapshot in {time.time() - start_time:.3f} seconds")
+        if args.command == "query":
+            for hit in index.search(args.query, args.member, args.start, args.end, args.limit):
+                print(f"{hit['score']:.2f}\t{hit['date']}\t{hit['id']}\t{hit['title']}")
+        else:
+            serve(index, args.host, args.port)
+
+    print(f"Total time taken: {time.time() - start_time:.3f} seconds")
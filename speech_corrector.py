@@ -1,9 +1,51 @@
+import functools
+import logging
+import multiprocessing
 import os
 import re
+import sys
 from spellchecker import SpellChecker
+from collections import Counter
 from concurrent.futures import ProcessPoolExecutor, as_completed
+from lexicon import LEXICON_FILENAME, POSSESSIVE, WORD, load_terms, update_lexicon
+
+# Shared helpers live with the scrapers and import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from log_setup import setup_logging, worker_logging
+
+logger = logging.getLogger("speech_corrector")
+
+# Spans passed through untouched: URLs, emails and bill numbers (H.R. 1234,
+# S. 567, H.Res. 12, S.J.Res. 5). Everything outside a WORD match (spacing,
+# punctuation, numbers) is never looked at, so the text keeps its layout.
+PROTECTED = r'(?:https?://|www\.)\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+|\b[HS]\.\s?(?:R\.|(?:J\.\s?|Con\.\s?)?Res\.)?\s?\d+\b'
+TOKEN_PATTERN = re.compile(f"(?P<protected>{PROTECTED})|(?P<word>{WORD})")
+
+# Set aside by clean_text so its spacing fixes can't split them: protected
+# spans, words with inner apostrophes (don't, Senate’s) that the quote rules
+# would otherwise pull apart, and mixed-case names from the lexicon
+# (DeSantis, McConnell) that the camelCase rule would
+SET_ASIDE_PATTERN = re.compile(rf"{PROTECTED}|[A-Za-z]+(?:['’][A-Za-z]+)+|(?P<camel>[A-Za-z]*[a-z][A-Z][A-Za-z]*)")
+PLACEHOLDER_PATTERN = re.compile(r"\x00(\d+)\x00")
+
+# Names and domain words mined from the corpus (see lexicon.py); loaded into
+# each worker by init_worker
+LEXICON = frozenset()
+
+# Per process: words seen, skipped before lookup, found in the dictionary or
+# the lexicon, not found (unknown), and unknown words that needed an
+# edit-distance search rather than a cached answer (searched)
+SPELLING_STATS = Counter()
 
 def clean_text(text):
+    spans = []
+    def set_aside(match):
+        if match.group('camel') and match.group().lower() not in LEXICON:
+            return match.group()  # Words run together, split below
+        spans.append(match.group())
+        return f"\x00{len(spans) - 1}\x00"
+    text = SET_ASIDE_PATTERN.sub(set_aside, text)
+
     # Fix common formatting issues
     text = re.sub(r'\s+', ' ', text)  # Remove extra whitespace
     text = re.sub(r'\.([A-Z])', r'. \1', text)  # Add space after periods if missing
@@ -26,13 +68,54 @@ def clean_text(text):
     text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
     
     text = text.strip()  # Remove leading and trailing whitespace
-    return text
+    return PLACEHOLDER_PATTERN.sub(lambda match: spans[int(match.group(1))], text)
+
+@functools.lru_cache(maxsize=None)
+def spell_checker():
+    # Loading the word frequency list is the slow part; once per process
+    return SpellChecker()
+
+@functools.lru_cache(maxsize=65536)
+def cached_correction(word):
+    SPELLING_STATS["searched"] += 1
+    return spell_checker().correction(word)
+
+def match_case(original, corrected):
+    if original[0].isupper():
+        return corrected[0].upper() + corrected[1:]
+    return corrected
+
+def correct_word(match):
+    word = match.group('word')
+    if word is None:
+        return match.group()  # URL, email or bill number
+    SPELLING_STATS["words"] += 1
+    if len(word) == 1 or word.isupper():
+        SPELLING_STATS["skipped"] += 1  # Single letters and acronyms
+        return word
+    spell = spell_checker()
+    plain = word.replace('’', "'")  # The dictionary only has straight apostrophes
+    if plain in spell or POSSESSIVE.sub('', plain) in spell:
+        SPELLING_STATS["known"] += 1
+        return word
+    lower = word.lower()
+    if lower in LEXICON or POSSESSIVE.sub('', lower) in LEXICON:
+        SPELLING_STATS["lexicon"] += 1
+        return word
+
+    SPELLING_STATS["unknown"] += 1
+    corrected = cached_correction(lower)
+    if corrected is None:
+        return word
+    return match_case(word, corrected)
 
 def correct_spelling(text):
-    spell = SpellChecker()
-    words = text.split()
-    corrected_words = [spell.correction(word) if spell.correction(word) is not None else word for word in words]
-    return ' '.join(corrected_words)
+    return TOKEN_PATTERN.sub(correct_word, text)
+
+def init_worker(log_queue, lexicon_path):
+    global LEXICON
+    worker_logging(log_queue)
+    LEXICON = load_terms(lexicon_path)
 
 def process_release(release):
     sections = release.split('\n\n')
@@ -51,6 +134,7 @@ def process_file(input_file, output_file, chunk_size=1000):
     with open(output_file, 'w', encoding='utf-8') as file:
         file.write("")
     
+    stats_before = SPELLING_STATS.copy()
     for idx, release in enumerate(releases):
         processed_release = process_release(release)
         processed_releases.append(processed_release)
@@ -60,7 +144,14 @@ def process_file(input_file, output_file, chunk_size=1000):
                 file.write('\n\n==\n\n'.join(processed_releases) + '\n\n==\n\n')
             processed_releases = []
         
-        print(f"Processed {idx + 1} out of {len(releases)} releases.")
+        logger.info("Processed %d out of %d releases.", idx + 1, len(releases),
+                    extra={"file": input_file, "throttle": input_file if idx + 1 < len(releases) else None})
+
+    stats = SPELLING_STATS - stats_before
+    logger.info("%s: %d words, %d skipped, %d in the dictionary, %d in the lexicon, %d unknown, "
+                "%d edit-distance searches", input_file, stats["words"], stats["skipped"], stats["known"],
+                stats["lexicon"], stats["unknown"], stats["searched"],
+                extra={"file": input_file, "spelling": dict(stats)})
 
 def process_all_files_in_directory(input_directory):
     files = [
@@ -77,16 +168,25 @@ def process_all_files_in_directory(input_directory):
     
     total_files = len(files)
 
-    with ProcessPoolExecutor() as executor:
+    # Workers hand their records to the parent's listener through this queue
+    log_queue = multiprocessing.Manager().Queue()
+    setup_logging(log_queue=log_queue)
+
+    # Only releases added since the last run are mined
+    lexicon_path = os.path.join(input_directory, LEXICON_FILENAME)
+    lexicon, added = update_lexicon(input_directory, lexicon_path)
+    logger.info("Lexicon has %d terms (%d new releases mined)", len(lexicon.terms()), added)
+
+    with ProcessPoolExecutor(initializer=init_worker, initargs=(log_queue, lexicon_path)) as executor:
         futures = []
         for idx, filename in enumerate(files):
             input_file = os.path.join(input_directory, filename)
             output_file = os.path.join(input_directory, f"{filename.split('.')[0]}_formatted.txt")
-            print(f"Starting processing of file {idx + 1} of {total_files}: {filename}")
+            logger.info("Starting processing of file %d of %d: %s", idx + 1, total_files, filename)
             futures.append(executor.submit(process_file, input_file, output_file))
         
         for future in as_completed(futures):
-            print(f"Completed processing of a file.")
+            logger.info("Completed processing of a file.")
 
 if __name__ == "__main__":
     input_directory = 'output'
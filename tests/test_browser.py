@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+import time
+import types
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import browser
+from browser import BLOCKED_URL_PATTERNS, blocked_patterns, saved_page_coverage, url_blocked, wait_for_content
+
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def test_versioned_assets_are_blocked():
+    for url in ("https://www.hawley.senate.gov/wp-content/themes/Divi/style.css?ver=4.24.2",
+                "https://www.hawley.senate.gov/wp-content/uploads/2019/01/favicon-32x32.png?w=32",
+                "https://www.manchin.senate.gov/themes/manchin/css/site.css?20231115",
+                "https://www.lee.senate.gov/themes/lee/assets/images/logo.svg"):
+        assert url_blocked(url, BLOCKED_URL_PATTERNS), url
+
+
+def test_pages_and_scripts_are_not_blocked():
+    for url in ("https://www.hawley.senate.gov/press-releases/?page=2",
+                "https://www.lee.senate.gov/2024/3/sen-lee-introduces-the-fair-repayment-act",
+                "https://www.lee.senate.gov/themes/lee/assets/js/vendor/jquery.min.js",
+                "https://www.manchin.senate.gov/search?q=style.css.html"):
+        assert not url_blocked(url, BLOCKED_URL_PATTERNS), url
+
+
+def test_allowlist_covers_the_query_string_form():
+    patterns = blocked_patterns(["*.css"])
+    assert "*.css" not in patterns and "*.css?*" not in patterns
+    assert not url_blocked("https://example.com/style.css?ver=1", patterns)
+    assert url_blocked("https://example.com/logo.png?w=32", patterns)
+
+
+def test_saved_pages_only_load_scripts():
+    for site in ("hawley", "lee", "manchin"):
+        blocked, loaded = saved_page_coverage(os.path.join(PAGES, f"{site}.html"), site)
+        assert blocked
+        assert all(".js" in url for url in loaded), (site, loaded)
+
+
+class LoadedPage:
+    # Finished loading, but nothing matches the ready selector
+    site = "lee"
+
+    def execute_script(self, script, *args):
+        return "complete"
+
+
+def test_detail_page_without_content_times_out(monkeypatch):
+    monkeypatch.setattr(browser, "READY_GRACE", 0.05)
+    with pytest.raises(TimeoutException):
+        wait_for_content(LoadedPage(), "detail", time.time())
+
+
+def test_empty_listing_page_is_accepted_after_the_grace(monkeypatch):
+    monkeypatch.setattr(browser, "READY_GRACE", 0.05)
+    wait_for_content(LoadedPage(), "listing", time.time())
+
+
+class FakeDriverManager:
+    # Stands in for webdriver_manager's ChromeDriverManager, which downloads
+    def __init__(self, directory):
+        self.directory = directory
+        self.installs = []
+
+    def __call__(self):
+        return self
+
+    def install(self):
+        path = self.directory / f"chromedriver-{len(self.installs)}"
+        path.write_text("")
+        self.installs.append(str(path))
+        return str(path)
+
+
+@pytest.fixture
+def driver_manager(monkeypatch, tmp_path):
+    manager = FakeDriverManager(tmp_path)
+    monkeypatch.setitem(sys.modules, "webdriver_manager.chrome", types.SimpleNamespace(ChromeDriverManager=manager))
+    monkeypatch.setattr(browser, "CACHE_DIRECTORY", str(tmp_path / "cache"))
+    monkeypatch.setattr(browser, "DRIVER_CACHE", str(tmp_path / "cache" / "chromedriver.json"))
+    return manager
+
+
+def test_driver_path_is_resolved_once_and_reused(driver_manager):
+    first = browser.resolve_driver_path()
+    assert browser.resolve_driver_path() == first
+    assert driver_manager.installs == [first]
+    with open(browser.DRIVER_CACHE, encoding='utf-8') as file:
+        assert json.load(file)["path"] == first
+
+    assert browser.resolve_driver_path(refresh=True) != first
+    os.remove(driver_manager.installs[-1])  # Deleted from under the cache
+    browser.resolve_driver_path()
+    assert len(driver_manager.installs) == 3
+
+
+def test_browser_launches_share_the_pinned_driver(monkeypatch, driver_manager):
+    launched = []
+
+    class Chrome:
+        def __init__(self, service, options):
+            if len(launched) == 2:
+                launched.append(None)
+                raise WebDriverException("session not created: this version of ChromeDriver only supports ...")
+            launched.append(service.path)
+
+    monkeypatch.setattr(browser.webdriver, "Chrome", Chrome)
+    for _ in range(3):
+        browser.setup_driver(block=False)
+    first, second = driver_manager.installs
+    assert launched == [first, first, None, second]
+
+
+def test_lean_options_load_eagerly_without_images():
+    options = browser.lean_options()
+    assert options.page_load_strategy == "eager"
+    for flag in ("--headless", "--disable-extensions", "--disable-gpu", "--blink-settings=imagesEnabled=false"):
+        assert flag in options.arguments
+    assert options.experimental_options["prefs"]["profile.managed_default_content_settings.images"] == 2
@@ -0,0 +1,114 @@
+import asyncio
+import types
+
+import pytest
+
+import url_discovery
+from checkpoint import CrawlJournal
+
+URLS = [f"https://example.com/press/{number}" for number in range(50)]
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Robots:
+    async def wait(self, url):
+        pass
+
+
+def fake_scraper(fail_at=None):
+    async def scrape_press_release(session, url):
+        if url == fail_at:
+            raise Interrupted(url)
+        return f"{url}\n\n"
+    return types.SimpleNamespace(robots=Robots(), scrape_press_release=scrape_press_release)
+
+
+def run_sitemap_crawl(monkeypatch, tmp_path, module, urls=URLS):
+    async def discover_urls(session, name, base_url=None):
+        return urls
+
+    monkeypatch.setattr(url_discovery, "load_scraper", lambda name: module)
+    monkeypatch.setattr(url_discovery, "discover_urls", discover_urls)
+    journal = CrawlJournal("site", str(tmp_path / "out.txt"), str(tmp_path / "checkpoints"))
+    scraped = asyncio.run(url_discovery.scrape_discovered(None, "site", "https://example.com", journal))
+    return journal, scraped
+
+
+def test_interrupted_sitemap_crawl_resumes_without_losing_batches(monkeypatch, tmp_path):
+    # Dies in the third batch, after two batches reached the output
+    with pytest.raises(Interrupted):
+        run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper(fail_at=URLS[45]))
+    written = (tmp_path / "out.txt").read_text()
+    assert written == "".join(f"{url}\n\n" for url in URLS[:40])
+
+    journal, scraped = run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper())
+    assert journal.resumed
+    assert scraped == 10
+    assert (tmp_path / "out.txt").read_text() == "".join(f"{url}\n\n" for url in URLS)
+    assert journal.finished
+
+
+def test_resume_walks_the_saved_url_list(monkeypatch, tmp_path):
+    with pytest.raises(Interrupted):
+        run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper(fail_at=URLS[45]))
+
+    # A release published before the resume shifts every URL down one place
+    newest = "https://example.com/press/new"
+    journal, scraped = run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper(), urls=[newest] + URLS)
+    assert scraped == 10
+    assert (tmp_path / "out.txt").read_text() == "".join(f"{url}\n\n" for url in URLS)
+    assert not (tmp_path / "checkpoints" / "site-sitemap.urls.json").exists()
+
+
+def test_torn_batch_is_dropped_and_rewritten(monkeypatch, tmp_path):
+    run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper(fail_at=None))
+    complete = (tmp_path / "out.txt").read_text()
+
+    # A fresh crawl of a new file, then a partial batch left behind by a crash mid-write
+    (tmp_path / "out.txt").unlink()
+    with pytest.raises(Interrupted):
+        run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper(fail_at=URLS[25]))
+    with open(tmp_path / "out.txt", "a", encoding="utf-8") as file:
+        file.write("half a rel")
+
+    run_sitemap_crawl(monkeypatch, tmp_path, fake_scraper())
+    assert (tmp_path / "out.txt").read_text() == complete
+
+
+def test_finished_parent_discards_stale_sitemap_journal(tmp_path):
+    directory = str(tmp_path / "checkpoints")
+    parent = CrawlJournal("site", str(tmp_path / "old.txt"), directory)
+    child = CrawlJournal("site-sitemap", parent.filename, directory, parent=parent)
+    child.write_page(0, ["release\n"])
+    parent.finish()  # Crash before the child was marked finished
+
+    parent = CrawlJournal("site", str(tmp_path / "new.txt"), directory)
+    child = CrawlJournal("site-sitemap", parent.filename, directory, parent=parent)
+    assert not child.resumed
+    assert child.filename == str(tmp_path / "new.txt")
+    assert child.resume_page(0) == 0
+
+
+def test_listing_page_that_failed_to_load_is_not_sealed(monkeypatch, tmp_path):
+    import lee_press_releases as lee
+
+    checkpoints = str(tmp_path / "checkpoints")
+    results = {1: [["release 1\n\n==\n"]], 2: [None, None]}
+    monkeypatch.setattr(lee, "setup_driver", lambda *args, **kwargs: types.SimpleNamespace(quit=lambda: None))
+    monkeypatch.setattr(lee.robots, "load_sync", lambda url: None)
+    monkeypatch.setattr(lee, "scrape_discovered_sync", lambda *args: None)
+    monkeypatch.setattr(lee, "CrawlJournal", lambda member, filename: CrawlJournal(member, filename, checkpoints))
+    monkeypatch.setattr(lee, "scrape_page", lambda driver, base_url, page, journal: results[page].pop(0))
+    monkeypatch.setattr(lee, "find_last_page_sync", lambda name, base_url, driver: (5, []))
+
+    first = str(tmp_path / "first.txt")
+    scraped, filename = lee.scrape_all_press_releases("https://example.com", 1, None, first, workers=1)
+    assert (scraped, filename) == (1, first)
+
+    journal = CrawlJournal("lee", str(tmp_path / "second.txt"), checkpoints)
+    assert journal.filename == first
+    assert not journal.finished
+    assert journal.resume_page(1) == 2
@@ -0,0 +1,49 @@
+import datetime
+
+from columnar_export import export, filter_table, read_arrow, read_parquet
+from corpus import format_release, iter_corpus
+
+
+def write_archive(path, releases):
+    with open(path, 'w', encoding='utf-8') as file:
+        for title, date in releases:
+            file.write(format_release({"title": title, "date": date, "content": f"{title} text."}))
+
+
+def ids(table):
+    return sorted(table.column("id").to_pylist())
+
+
+def test_export_appends_only_new_releases(tmp_path):
+    archives, out = tmp_path / "output", str(tmp_path / "columnar")
+    archives.mkdir()
+    write_archive(archives / "lee.txt", [("Farm bill", "March 1, 2024")])
+    assert export(iter_corpus(str(archives)), out) == 1
+    assert export(iter_corpus(str(archives)), out) == 0
+
+    write_archive(archives / "lee.txt", [("Farm bill", "March 1, 2024"), ("Broadband", "November 20, 2023")])
+    assert export(iter_corpus(str(archives)), out) == 1
+    table = read_arrow(out)
+    assert ids(table) == ["lee:0", "lee:1"]
+    assert ids(read_parquet(out)) == ["lee:0", "lee:1"]
+    row = [row for row in table.to_pylist() if row["id"] == "lee:0"][0]
+    assert (row["title"], row["date"], row["year"], row["date_status"]) == \
+        ("Farm bill", datetime.date(2024, 3, 1), 2024, "parsed")
+
+
+def test_year_only_releases_survive_date_filters(tmp_path):
+    archives, out = tmp_path / "output", str(tmp_path / "columnar")
+    archives.mkdir()
+    write_archive(archives / "lee.txt", [("Farm bill", "March 1, 2024"), ("Broadband", "November 20, 2023")])
+    write_archive(archives / "stefanik.txt", [("Dairy", "2024"), ("Defense", "2023"), ("Undated", "No date found")])
+    export(iter_corpus(str(archives)), out)
+
+    table = read_arrow(out)
+    dairy = [row for row in table.to_pylist() if row["id"] == "stefanik:0"][0]
+    assert (dairy["date"], dairy["year"], dairy["date_status"]) == (datetime.date(2024, 1, 1), 2024, "year_only")
+
+    for read in (lambda **kw: filter_table(table, **kw), lambda **kw: read_parquet(out, **kw)):
+        assert ids(read(start="2024-01-01")) == ["lee:0", "stefanik:0"]
+        assert ids(read(start="2024-06-01", end="2024-06-30")) == ["stefanik:0"]
+        assert ids(read(end="2023-12-31")) == ["lee:1", "stefanik:1"]
+        assert ids(read(member="stefanik", start="2023-06-01")) == ["stefanik:0", "stefanik:1"]
@@ -0,0 +1,44 @@
+import os
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+from content_extractor import main_text
+from html_text import preserve_formatting
+from sites import SITES
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+MIN_RECALL = 0.9
+
+
+def words(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def test_br_only_container_beats_its_parent():
+    soup = BeautifulSoup('<body><nav><a href="/">Home</a></nav><div id="x">The senator announced a new bill today, '
+                         'which<br>would fund rural hospitals across the state.</div></body>', 'html.parser')
+    assert main_text(soup) == "The senator announced a new bill today, which\n\nwould fund rural hospitals across the state."
+
+
+def test_paragraphs_still_lift_their_container():
+    soup = BeautifulSoup('<body><div class="menu"><a href="/">Home</a></div><div class="post">'
+                         '<div>First paragraph of the release, long enough to count.</div>'
+                         '<div>Second paragraph of the release, also long enough.</div></div></body>', 'html.parser')
+    assert main_text(soup) == ("First paragraph of the release, long enough to count.\n"
+                               "Second paragraph of the release, also long enough.")
+
+
+@pytest.mark.parametrize("site", sorted(SITES))
+def test_generic_extractor_recall_on_saved_pages(site):
+    # The site's own selector and renderer are the reference; the page's
+    # navigation, header and footer must stay out
+    with open(os.path.join(PAGES, f"{site}.html"), 'r', encoding='utf-8') as file:
+        soup = BeautifulSoup(file.read(), 'html.parser')
+    reference = words(preserve_formatting(soup.select_one(SITES[site]["content_selector"])))
+    text = main_text(soup)
+    assert len(reference & words(text)) / len(reference) >= MIN_RECALL
+    for chrome in soup.select("nav, header, footer, #header, #footer, #nav"):
+        chrome_text = chrome.get_text(" ", strip=True)
+        assert not chrome_text or chrome_text not in text
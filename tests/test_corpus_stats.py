@@ -0,0 +1,65 @@
+from collections import Counter
+
+import numpy as np
+
+from corpus import format_release, iter_corpus, tokenize
+from corpus_stats import CorpusStats
+
+ARCHIVES = {
+    "lee.txt": [
+        ("Farm bill", "March 1, 2024", "The farm bill funds crop insurance for farm families."),
+        ("Broadband", "March 20, 2024", "Rural broadband grants reach every county."),
+        ("Farm grants", "April 2, 2024", "Farm grants for rural farm families."),
+    ],
+    "stefanik.txt": [
+        ("Dairy", "2024", "Visited a dairy farm and talked about the farm bill."),
+        ("Defense", "2023", "The defense bill passed the House."),
+    ],
+}
+
+
+def write_archives(directory):
+    for filename, releases in ARCHIVES.items():
+        with open(directory / filename, 'w', encoding='utf-8') as file:
+            for title, date, content in releases:
+                file.write(format_release({"title": title, "date": date, "content": content}))
+
+
+def test_counts_match_a_plain_recount_of_the_archive(tmp_path):
+    write_archives(tmp_path)
+    stats = CorpusStats.from_directory(str(tmp_path), cache_directory=str(tmp_path / "cache"))
+
+    by_member = {}
+    by_month = {}
+    for record in iter_corpus(str(tmp_path)):
+        tokens = tokenize(f"{record['title']}\n{record['content']}")
+        by_member.setdefault(record["member"], Counter()).update(tokens)
+        month = record["date_iso"][:7] if record["date_status"] == "parsed" else ""
+        by_month.setdefault(month, Counter()).update(tokens)
+
+    assert stats.members == ["lee", "stefanik"]
+    assert stats.months == ["2024-03", "2024-04", ""]
+    assert len(stats.doc_starts) == 5
+    unigrams = stats.unigram_counts()
+    assert unigrams[stats.term_ids["farm"]] == 8
+    assert unigrams.sum() == sum(sum(counts.values()) for counts in by_member.values())
+
+    for table, labels, expected in ((stats.member_table(), stats.members, by_member),
+                                    (stats.month_table(), stats.months, by_month)):
+        for row, label in enumerate(labels):
+            counted = {stats.vocab[i]: int(n) for i, n in enumerate(table[row]) if n}
+            assert counted == dict(expected[label])
+
+
+def test_bigrams_do_not_cross_documents_and_cache_round_trips(tmp_path):
+    write_archives(tmp_path)
+    cache = str(tmp_path / "cache")
+    stats = CorpusStats.from_directory(str(tmp_path), cache_directory=cache)
+    first, second, counts = stats.bigram_counts()
+    pairs = {(stats.vocab[a], stats.vocab[b]): int(n) for a, b, n in zip(first, second, counts)}
+    assert pairs[("farm", "bill")] == 3
+    assert ("families", "broadband") not in pairs
+
+    cached = CorpusStats.from_directory(str(tmp_path), cache_directory=cache)
+    assert cached.vocab == stats.vocab and cached.members == stats.members
+    assert np.array_equal(cached.member_table(), stats.member_table())
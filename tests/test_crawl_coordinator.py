@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+import crawl_coordinator
+from crawl_coordinator import (DONE, FAILED, LEASED, MAX_ATTEMPTS, PENDING, connect, lease, plan, read_page,
+                               run_shard)
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    conn = connect(path)
+    yield path, conn
+    conn.close()
+
+
+def state(conn, shard_id):
+    return conn.execute("SELECT state, attempts, error FROM shards WHERE id = ?", (shard_id,)).fetchone()
+
+
+def expire_leases(conn):
+    conn.execute("UPDATE shards SET lease_expires = ? WHERE state = ?", (time.time() - 1, LEASED))
+
+
+def test_expired_lease_is_leased_again_until_the_attempt_limit(db):
+    _, conn = db
+    plan(conn, "hawley", 1, 10)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        shard = lease(conn, f"worker-{attempt}")
+        assert shard["attempt"] == attempt
+        expire_leases(conn)  # The worker died without failing the shard
+
+    assert lease(conn, "worker-last") is None
+    assert state(conn, shard["id"])[:2] == (FAILED, MAX_ATTEMPTS)
+
+
+def test_live_lease_on_the_last_attempt_is_left_alone(db):
+    _, conn = db
+    plan(conn, "hawley", 1, 10)
+    conn.execute("UPDATE shards SET attempts = ?", (MAX_ATTEMPTS - 1,))
+    shard = lease(conn, "worker")
+    assert lease(conn, "other") is None
+    assert state(conn, shard["id"])[0] == LEASED
+
+
+def crawl_with(monkeypatch, results):
+    # Stands in for the browser: each listing page returns the scripted result
+    def crawl_pages(site, pages, on_page):
+        for page in pages:
+            if not on_page(page, results.get(page, [])):
+                return
+    monkeypatch.setattr(crawl_coordinator, "crawl_pages_selenium", crawl_pages)
+
+
+def test_page_that_failed_to_load_is_retried_not_sealed(db, tmp_path, monkeypatch):
+    path, conn = db
+    out = str(tmp_path / "pages")
+    plan(conn, "hawley", 1, 3, shard_size=3)
+
+    crawl_with(monkeypatch, {1: ["one\n"], 2: None, 3: ["three\n"]})
+    shard = lease(conn, "worker")
+    assert not run_shard(path, conn, shard, "worker", out)
+    assert state(conn, shard["id"])[0] == PENDING
+    assert read_page(out, "hawley", 1) == ["one\n"]
+    assert read_page(out, "hawley", 2) is None
+
+    crawl_with(monkeypatch, {2: ["two\n"], 3: ["three\n"]})
+    shard = lease(conn, "worker")
+    assert run_shard(path, conn, shard, "worker", out)
+    assert state(conn, shard["id"])[0] == DONE
+    assert [read_page(out, "hawley", page) for page in (1, 2, 3)] == [["one\n"], ["two\n"], ["three\n"]]
+
+
+def test_empty_listing_pages_end_the_site(db, tmp_path, monkeypatch):
+    path, conn = db
+    out = str(tmp_path / "pages")
+    plan(conn, "hawley", 1, 20, shard_size=10)
+    crawl_with(monkeypatch, {1: ["one\n"]})
+    shard = lease(conn, "worker")
+    assert run_shard(path, conn, shard, "worker", out)
+    assert read_page(out, "hawley", 2) == []
+    assert conn.execute("SELECT state FROM shards WHERE first_page = 11").fetchone()[0] == "skipped"
@@ -0,0 +1,72 @@
+import pytest
+
+import crawl_metrics
+from crawl_metrics import MetricsRegistry
+
+
+def test_counters_sum_across_matching_labels():
+    registry = MetricsRegistry()
+    registry.inc("crawl_responses_total", host="a", status=200)
+    registry.inc("crawl_responses_total", 2, host="a", status=200)
+    registry.inc("crawl_responses_total", host="b", status=404)
+    assert registry.total("crawl_responses_total") == 4
+    assert registry.total("crawl_responses_total", host="a") == 3
+    assert registry.total("crawl_responses_total", status=404) == 1
+    assert registry.total("crawl_releases_total") == 0
+
+
+def test_timer_observes_into_the_histogram(monkeypatch):
+    clock = iter([10.0, 10.3, 20.0, 27.0])
+    monkeypatch.setattr(crawl_metrics.time, "perf_counter", lambda: next(clock))
+    registry = MetricsRegistry(buckets=(0.5, 5.0))
+    with registry.timer("crawl_request_seconds", host="a", phase="listing"):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.timer("crawl_request_seconds", host="b", phase="listing"):
+            raise RuntimeError  # A failed request is still timed
+
+    histogram = registry.merged_histogram("crawl_request_seconds", phase="listing")
+    assert histogram.counts == [1, 0, 1]
+    assert histogram.count == 2
+    assert histogram.sum == pytest.approx(7.3)
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_prometheus_output_is_cumulative_and_labelled():
+    registry = MetricsRegistry(buckets=(0.5, 5.0))
+    registry.inc("crawl_releases_total", 3, member="lee")
+    registry.set("crawl_queue_depth", 4, queue="detail")
+    registry.observe("crawl_request_seconds", 0.2, host="a")
+    registry.observe("crawl_request_seconds", 1.0, host="a")
+    assert registry.to_prometheus().splitlines() == [
+        "# HELP crawl_queue_depth Work waiting or in flight, by queue.",
+        "# TYPE crawl_queue_depth gauge",
+        'crawl_queue_depth{queue="detail"} 4',
+        "# HELP crawl_releases_total Releases written to the output, by member.",
+        "# TYPE crawl_releases_total counter",
+        'crawl_releases_total{member="lee"} 3',
+        "# HELP crawl_request_seconds Time from request to parsed response, by host and phase (listing/detail).",
+        "# TYPE crawl_request_seconds histogram",
+        'crawl_request_seconds_bucket{host="a",le="0.5"} 1',
+        'crawl_request_seconds_bucket{host="a",le="5.0"} 2',
+        'crawl_request_seconds_bucket{host="a",le="+Inf"} 2',
+        'crawl_request_seconds_sum{host="a"} 1.200000',
+        'crawl_request_seconds_count{host="a"} 2',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("crawl_selector_total", site="lee", selector='div[class="body"] \\ p\nspan')
+    assert registry.to_prometheus().splitlines()[-1] == \
+        'crawl_selector_total{selector="div[class=\\"body\\"] \\\\ p\\nspan",site="lee"} 1'
+
+
+def test_prometheus_file_is_replaced_whole(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("crawl_releases_total", member="lee")
+    path = tmp_path / "crawl.prom"
+    registry.write_prometheus(str(path))
+    assert path.read_text() == registry.to_prometheus()
+    assert not (tmp_path / "crawl.prom.tmp").exists()
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from date_normalizer import PARSED, UNPARSED, YEAR_ONLY, DateNormalizer
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("July 31, 2024", "2024-07-31"),
+    ("Thursday, August 01, 2024", "2024-08-01"),
+    ("Washington, DC, March 11, 2024", "2024-03-11"),
+    ("11 Mar 2024", "2024-03-11"),
+    ("2024-03-11T09:00:00", "2024-03-11"),
+    ("3/11/24", "2024-03-11"),
+    ("Released on Sept. 5, 2023 by the office", "2023-09-05"),
+])
+def test_known_shapes_parse_to_iso(raw, expected):
+    assert DateNormalizer().normalize("site", raw) == (expected, PARSED)
+
+
+def test_bare_year_falls_back_to_year_only():
+    assert DateNormalizer().normalize("stefanik", " 2024 ") == ("2024", YEAR_ONLY)
+
+
+@pytest.mark.parametrize("raw", ["No date found", "", None, "February 30, 2024", "sometime soon"])
+def test_missing_or_impossible_dates_are_unparsed(raw):
+    normalizer = DateNormalizer()
+    assert normalizer.normalize("lee", raw) == (None, UNPARSED)
+
+
+def test_learned_formats_survive_a_save_and_reload(tmp_path):
+    path = str(tmp_path / "formats.json")
+    normalizer = DateNormalizer(path)
+    for raw in ("July 31, 2024", "August 1, 2024", "Thursday, August 01, 2024"):
+        normalizer.normalize("lee", raw)
+    normalizer.save()
+    assert json.load(open(path, encoding='utf-8')) == {"lee": "month_day_year"}
+
+    reloaded = DateNormalizer(path)
+    assert reloaded.winners == {"lee": "month_day_year"}
+    assert reloaded.normalize("lee", "May 2, 2024") == ("2024-05-02", PARSED)
+    assert reloaded.stats() == {"lee": {"month_day_year": 1}}  # Hit on the fast path
+
+
+def test_cached_winner_for_an_unknown_format_is_dropped(tmp_path):
+    path = tmp_path / "formats.json"
+    path.write_text(json.dumps({"lee": "retired_format"}))
+    normalizer = DateNormalizer(str(path))
+    assert normalizer.winners == {}
+    assert normalizer.normalize("lee", "May 2, 2024") == ("2024-05-02", PARSED)
+
+
+def test_default_normalizer_reads_the_saved_formats():
+    from date_normalizer import FORMATS_FILENAME, default_normalizer
+    assert default_normalizer.cache_path == FORMATS_FILENAME
@@ -0,0 +1,87 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from bench_scrapers import listing_key, loop_aliases
+from fixture_server import FixtureBundle, FixtureServer, make_site_local, start_in_thread
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    bundle = FixtureBundle(str(tmp_path / "aoc"), "https://ocasio-cortez.house.gov")
+    bundle.put(listing_key("aoc", 0), 200, "text/html; charset=utf-8", b"<div class='h3'>page 0</div>")
+    bundle.put("/media/press-releases/release-1", 200, "text/html", b"<h1>Release 1</h1>")
+    bundle.put("/gone", 410, "text/plain", b"Gone")
+    return bundle
+
+
+def fetch(port, key):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{key}") as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def test_replays_recorded_responses_from_disk(bundle):
+    reloaded = FixtureBundle(bundle.directory)
+    assert reloaded.origin == "https://ocasio-cortez.house.gov"
+    server = FixtureServer(reloaded)
+    port, stop = start_in_thread(server)
+    try:
+        status, headers, body = fetch(port, "/media/press-releases/release-1")
+        assert (status, headers["Content-Type"], body) == (200, "text/html", b"<h1>Release 1</h1>")
+        assert fetch(port, "/gone")[0] == 410
+        assert fetch(port, "/never-recorded")[0] == 404
+    finally:
+        stop()
+    assert server.requests == 3
+    assert server.bytes_sent == len(b"<h1>Release 1</h1>") + len(b"Gone")
+
+
+def test_throttle_and_error_injection(bundle):
+    port, stop = start_in_thread(FixtureServer(bundle, throttle_rate=1.0))
+    try:
+        status, headers, _ = fetch(port, "/media/press-releases/release-1")
+        assert (status, headers["Retry-After"]) == (429, "1")
+    finally:
+        stop()
+
+    server = FixtureServer(bundle, throttle_rate=0.25, error_rate=0.25, seed=0)
+    port, stop = start_in_thread(server)
+    try:
+        statuses = [fetch(port, "/media/press-releases/release-1")[0] for _ in range(200)]
+    finally:
+        stop()
+    assert set(statuses) == {200, 429, 500}
+    assert 25 < statuses.count(429) < 75 and 25 < statuses.count(500) < 75
+
+
+def test_loop_aliases_replay_the_first_listing_page_then_404(bundle):
+    port, stop = start_in_thread(FixtureServer(bundle, aliases=loop_aliases("aoc", 3)))
+    try:
+        first = fetch(port, listing_key("aoc", 0))
+        assert first[0] == 200
+        assert [fetch(port, listing_key("aoc", page))[2] for page in (1, 2)] == [first[2]] * 2
+        assert fetch(port, listing_key("aoc", 3))[0] == 404
+        assert fetch(port, "/sitemap.xml")[0] == 404
+        assert fetch(port, "/media/press-releases/release-1")[0] == 200  # Unaliased keys pass through
+    finally:
+        stop()
+
+
+def test_alias_to_a_missing_page_is_not_recorded(bundle):
+    # Even a recording server answers a None alias itself instead of asking upstream
+    server = FixtureServer(bundle, record=True, aliases={"/sitemap.xml": None})
+    port, stop = start_in_thread(server)
+    try:
+        assert fetch(port, "/sitemap.xml")[0] == 404
+    finally:
+        stop()
+    assert "/sitemap.xml" not in bundle.responses
+
+
+def test_absolute_links_to_the_live_site_become_local():
+    body = b'<a href="https://www.hawley.senate.gov/x/">x</a><img src="//www.hawley.senate.gov/i.png">'
+    assert make_site_local(body, "https://www.hawley.senate.gov") == b'<a href="/x/">x</a><img src="/i.png">'
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from html_text import preserve_formatting
+from sites import SITES, listing_strainer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Golden files hold the shared renderer's output for each aiohttp site's
+# saved page; regenerate them with REGENERATE_GOLDEN=1 when the format changes
+GOLDEN_SITES = sorted(name for name, site in SITES.items() if site["engine"] == "aiohttp")
+
+
+def read(*parts):
+    with open(os.path.join(FIXTURES, *parts), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def content(site):
+    soup = BeautifulSoup(read("pages", f"{site}.html"), 'html.parser')
+    return soup.select_one(SITES[site]["content_selector"])
+
+
+@pytest.mark.parametrize("site", GOLDEN_SITES)
+def test_site_output_matches_golden(site):
+    text = preserve_formatting(content(site))
+    if os.environ.get("REGENERATE_GOLDEN"):
+        with open(os.path.join(FIXTURES, "golden", f"{site}.txt"), 'w', encoding='utf-8') as file:
+            file.write(text)
+    assert text == read("golden", f"{site}.txt")
+
+
+def test_each_string_is_emitted_once():
+    soup = BeautifulSoup("<div><p>Plain paragraph.</p><div><span>Loose text</span></div></div>", 'html.parser')
+    assert preserve_formatting(soup.div) == "Plain paragraph.\n\nLoose text"
+
+
+def test_nested_list_items_are_kept():
+    soup = BeautifulSoup("<div><ul><li>Outer<ul><li>Inner</li></ul></li></ul></div>", 'html.parser')
+    assert preserve_formatting(soup.div) == "• OuterInner\n• Inner"
+
+
+def test_missing_element():
+    assert preserve_formatting(None) == "No content found"
+
+
+def listing_links(site, strainer):
+    soup = BeautifulSoup(read("listings", f"{site}.html"), 'html.parser', parse_only=strainer)
+    links = []
+    for entry in soup.select(SITES[site]["listing_selector"]):
+        anchors = [entry] if entry.name == "a" else entry.find_all('a', href=True)
+        links.extend(anchor["href"] for anchor in anchors if anchor.get("href"))
+    return links
+
+
+@pytest.mark.parametrize("site", sorted(SITES))
+def test_every_listing_selector_has_a_strainer(site):
+    assert listing_strainer(site) is not None
+
+
+@pytest.mark.parametrize("site", sorted(SITES))
+def test_strained_listing_parse_finds_the_same_links(site):
+    links = listing_links(site, None)
+    assert len(links) >= 4
+    assert listing_links(site, listing_strainer(site)) == links
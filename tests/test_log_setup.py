@@ -0,0 +1,77 @@
+import atexit
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import log_setup
+from log_setup import RateFilter, setup_logging
+
+SCRIPTS = os.path.dirname(log_setup.__file__)
+
+
+def record(msg="Completed page %d", **extra):
+    return logging.makeLogRecord(dict(name="crawler", msg=msg, **extra))
+
+
+def test_throttle_passes_one_record_per_interval_and_counts_the_rest(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log_setup.time, "monotonic", lambda: now[0])
+    rate = RateFilter(interval=5.0)
+
+    passed = [rate.filter(record(throttle="page")) for _ in range(4)]
+    assert passed == [True, False, False, False]
+    assert rate.filter(record(throttle="other"))  # Keys are throttled separately
+
+    now[0] += 5.0
+    late = record(throttle="page")
+    assert rate.filter(late)
+    assert late.suppressed == 3
+
+
+def test_sample_passes_every_nth_record():
+    rate = RateFilter()
+    records = [record(sample=3) for _ in range(7)]
+    assert [rate.filter(r) for r in records] == [True, False, False, True, False, False, True]
+    assert records[3].suppressed == 2
+    assert rate.filter(record())  # Unmarked records are never filtered
+
+
+def test_records_go_through_the_queue_to_every_handler(tmp_path):
+    json_path = tmp_path / "log.jsonl"
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    listener = setup_logging("INFO", str(json_path), console=False)
+    try:
+        assert [type(handler) for handler in root.handlers] == [logging.handlers.QueueHandler]
+        logger = logging.getLogger("crawler")
+        logger.debug("Below the level")
+        for page in range(50):
+            logger.info("Completed page %d", page, extra={"site": "lee"})
+    finally:
+        atexit.unregister(listener.stop)
+        listener.stop()
+        root.handlers[:], level = saved
+        root.setLevel(level)
+
+    entries = [json.loads(line) for line in json_path.read_text().splitlines()]
+    assert [entry["message"] for entry in entries] == [f"Completed page {page}" for page in range(50)]
+    assert entries[0]["site"] == "lee" and entries[0]["logger"] == "crawler"
+
+
+def test_listener_flushes_queued_records_on_exit(tmp_path):
+    # The process exits straight after logging; the atexit hook has to drain
+    # the queue before the listener thread dies with it
+    json_path = tmp_path / "log.jsonl"
+    script = (
+        f"import sys, logging; sys.path.insert(0, {SCRIPTS!r})\n"
+        "from log_setup import setup_logging\n"
+        f"setup_logging('INFO', {str(json_path)!r}, console=False)\n"
+        "for number in range(2000):\n"
+        "    logging.getLogger('crawler').info('record %d', number)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+    lines = json_path.read_text().splitlines()
+    assert len(lines) == 2000
+    assert json.loads(lines[-1])["message"] == "record 1999"
@@ -0,0 +1,34 @@
+from corpus import format_release
+from near_duplicates import MinHashLSH, build_index
+
+TEXT = ("The senator introduced legislation today that would expand broadband access to rural "
+        "communities across the state and fund new towers in underserved counties.")
+
+
+def write_archive(path, contents):
+    with open(path, 'w', encoding='utf-8') as file:
+        for content in contents:
+            file.write(format_release({"title": "Release", "date": "May 1, 2024", "content": content}))
+
+
+def test_two_archives_of_one_member_keep_all_records(tmp_path):
+    write_archive(tmp_path / "hawley.txt", [TEXT, "An unrelated statement on the farm bill and crop insurance."])
+    write_archive(tmp_path / "hawley_press_releases_20240501_120000.txt", [TEXT])
+
+    index = build_index(str(tmp_path))
+    assert sorted(index.ids) == ["hawley:0", "hawley:1", "hawley_press_releases_20240501_120000:0"]
+    assert [record_id for record_id, score in index.query("hawley:0", threshold=0.8)] == ["hawley_press_releases_20240501_120000:0"]
+
+
+def test_formatted_archive_shares_ids_with_its_source(tmp_path):
+    write_archive(tmp_path / "hawley_formatted.txt", [TEXT])
+    assert build_index(str(tmp_path), formatted=True).ids == ["hawley:0"]
+
+
+def test_empty_text_is_not_indexed():
+    index = MinHashLSH()
+    assert index.add("hawley:0", "") is None
+    assert index.add("hawley:1", " \n\t") is None
+    index.add("hawley:2", TEXT)
+    assert index.ids == ["hawley:2"]
+    assert index.clusters(0.8) == []
@@ -0,0 +1,81 @@
+import asyncio
+import math
+
+import pytest
+
+from checkpoint import CrawlJournal
+from pagination import boundary_search, scrape_listing_pages, scrape_listing_pages_sync
+
+
+def search(last_page, first_page=1, hint=None):
+    probes = []
+    steps = boundary_search(first_page, hint)
+    try:
+        page = next(steps)
+        while True:
+            probes.append(page)
+            page = steps.send(first_page <= page <= last_page)
+    except StopIteration as done:
+        return done.value, probes
+
+
+@pytest.mark.parametrize("last_page", [1, 2, 3, 17, 92, 425, 1000])
+def test_finds_the_last_page_without_a_hint(last_page):
+    found, probes = search(last_page)
+    assert found == last_page
+    assert len(probes) <= 2 * math.ceil(math.log2(last_page + 1)) + 2
+
+
+def test_exact_hint_takes_two_probes_past_the_first():
+    found, probes = search(92, hint=92)
+    assert found == 92
+    assert probes == [1, 92, 93]
+
+
+def test_stale_hint_below_the_last_page():
+    found, probes = search(119, hint=92)
+    assert found == 119
+    assert len(probes) <= 2 + 2 * math.ceil(math.log2(119 - 92 + 1)) + 1
+
+
+def test_stale_hint_above_the_last_page():
+    found, probes = search(290, hint=298)
+    assert found == 290
+    assert len(probes) <= 2 + 2 * math.ceil(math.log2(298)) + 1
+
+
+def test_single_page_site():
+    assert search(1, hint=92)[0] == 1
+    assert search(1)[0] == 1
+
+
+def test_empty_site_and_zero_based_pages():
+    assert search(0, first_page=1) == (0, [1])
+    assert search(40, first_page=0, hint=50)[0] == 40
+
+
+def out_of_order_pages():
+    async def scrape_page(session, base_url, page, journal):
+        await asyncio.sleep(0.01 * (page % 3))  # Finish out of order
+        return [f"page {page} release {i}\n" for i in range(2)]
+    return scrape_page
+
+
+def test_listing_pages_are_written_in_order(tmp_path):
+    journal = CrawlJournal("site", str(tmp_path / "out.txt"), str(tmp_path / "checkpoints"))
+    scraped = asyncio.run(scrape_listing_pages(out_of_order_pages(), None, "https://example.com", 1, 7, journal, concurrency=3))
+    assert scraped == 14
+    assert (tmp_path / "out.txt").read_text() == "".join(f"page {page} release {i}\n" for page in range(1, 8) for i in range(2))
+    assert journal.resume_page(1) == 8
+
+
+def test_sync_listing_pages_stop_at_a_page_that_keeps_failing(tmp_path):
+    journal = CrawlJournal("site", str(tmp_path / "out.txt"), str(tmp_path / "checkpoints"))
+
+    def scrape_page(driver, base_url, page, journal):
+        return None if page == 4 else [f"page {page} via {driver}\n"]
+
+    scraped, completed = scrape_listing_pages_sync(scrape_page, ["a", "b"], "https://example.com", 1, 6, journal)
+    assert (scraped, completed) == (3, False)
+    assert (tmp_path / "out.txt").read_text() == "page 1 via a\npage 2 via b\npage 3 via a\n"
+    assert journal.resume_page(1) == 4
@@ -0,0 +1,162 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from proxy_pool import ProxyError, ProxyPool, RotatingSession, report_driver, report_session
+
+
+class Socks5StandIn:
+    # Local SOCKS5 server that answers the greeting and, when credentials
+    # are set, the RFC 1929 username/password login. It runs on its own
+    # event loop thread so both the sync and async pool paths can reach it.
+    def __init__(self, username="", password=""):
+        self.username = username
+        self.password = password
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            version, count = await reader.readexactly(2)
+            methods = await reader.readexactly(count)
+            wanted = 0x02 if self.username else 0x00
+            if version != 0x05 or wanted not in methods:
+                writer.write(bytes([0x05, 0xFF]))
+                return
+            writer.write(bytes([0x05, wanted]))
+            if self.username:
+                await reader.readexactly(1)
+                user = await reader.readexactly((await reader.readexactly(1))[0])
+                secret = await reader.readexactly((await reader.readexactly(1))[0])
+                ok = user.decode() == self.username and secret.decode() == self.password
+                writer.write(bytes([0x01, 0x00 if ok else 0x01]))
+            await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    def __enter__(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+@pytest.fixture
+def socks():
+    with Socks5StandIn() as server:
+        yield server
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_probe_measures_a_live_proxy_and_evicts_a_dead_one(socks, closed_port):
+    live, dead = ("127.0.0.1", socks.port), ("127.0.0.1", closed_port)
+    pool = ProxyPool([live, dead], username="", max_failures=3)
+    pool.probe_all_sync(timeout=2)
+    assert pool.stats[live].latency is not None
+    assert pool.healthy() == [live]
+    assert pool.acquire() == live
+
+
+def test_login_is_checked_against_the_stand_in(closed_port):
+    with Socks5StandIn("user", "secret") as server:
+        endpoint = ("127.0.0.1", server.port)
+        assert ProxyPool([endpoint], username="user", password="secret").acquire() == endpoint
+        rejected = ProxyPool([endpoint], username="user", password="wrong")
+        rejected.probe_all_sync(timeout=2)
+        assert rejected.healthy() == []
+
+
+def test_acquire_async_works_inside_a_running_event_loop(socks):
+    endpoint = ("127.0.0.1", socks.port)
+
+    async def crawl():
+        pool = ProxyPool([endpoint], username="")
+        return await pool.acquire_async()
+
+    assert asyncio.run(crawl()) == endpoint
+    assert socks.connections == 1
+
+
+def test_repeated_failures_evict_with_growing_backoff():
+    endpoint = ("127.0.0.1", 1)
+    pool = ProxyPool([endpoint], username="", max_failures=2, backoff=10)
+    for _ in range(2):
+        pool.report(endpoint, False)
+    first = pool.stats[endpoint].evicted_until
+    assert not pool.is_healthy(endpoint)
+    for _ in range(2):
+        pool.report(endpoint, False)
+    assert pool.stats[endpoint].evicted_until - first == pytest.approx(10, abs=1)
+
+
+def test_choose_prefers_the_faster_of_two_healthy_proxies():
+    fast, slow = ("fast", 1080), ("slow", 1080)
+    pool = ProxyPool([fast, slow], username="", seed=1)
+    pool.probed = True
+    pool.report(fast, True, 0.05)
+    pool.report(slow, True, 0.5)
+    assert {pool.choose() for _ in range(10)} == {fast}
+
+
+def test_reports_from_drivers_without_a_proxy_are_ignored():
+    pool = ProxyPool([("host", 1080)], username="")
+    report_driver(pool, object(), False)
+    assert pool.stats[("host", 1080)].requests == 0
+
+
+def test_session_moves_off_an_evicted_proxy(monkeypatch):
+    import aiohttp
+    first, second = ("first", 1080), ("second", 1080)
+    pool = ProxyPool([first, second], username="", max_failures=1, seed=1)
+    pool.probed = True
+
+    def connector(endpoint, **kwargs):
+        connector = aiohttp.TCPConnector(**kwargs)
+        connector.proxy_endpoint = endpoint
+        return connector
+    monkeypatch.setattr(pool, "connector", connector)
+
+    async def crawl():
+        async with RotatingSession(pool) as session:
+            used = session.connector.proxy_endpoint
+            report_session(pool, session, False)
+            request = session.get("http://127.0.0.1:1/")
+            request.close()  # Only the routing is under test
+            moved = session.connector.proxy_endpoint
+            closed = [old.closed for old in session.retired]
+        return used, moved, closed
+
+    used, moved, closed = asyncio.run(crawl())
+    assert {used, moved} == {first, second}
+    assert closed == [False]  # Requests already on the old proxy may finish
+
+
+def test_chrome_refuses_an_authenticated_pool():
+    endpoint = ("host", 1080)
+    with pytest.raises(ProxyError):
+        ProxyPool([endpoint], username="user", password="secret").chrome_argument(endpoint)
+    assert ProxyPool([endpoint], username="").chrome_argument(endpoint) == ("--proxy-server=socks5://host:1080", endpoint)
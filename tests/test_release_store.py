@@ -0,0 +1,51 @@
+from corpus import format_release
+from release_store import connect, load_directory, search
+
+
+def write_archive(path, releases):
+    with open(path, 'w', encoding='utf-8') as file:
+        for title, date, content in releases:
+            file.write(format_release({"title": title, "date": date, "content": content}))
+
+
+def titles(rows):
+    return sorted(row["title"] for row in rows)
+
+
+def load(tmp_path):
+    write_archive(tmp_path / "lee.txt", [
+        ("Farm bill", "March 1, 2024", "Senator Lee voted for H.R. 1234, the farm bill."),
+        ("Broadband", "November 20, 2023", "Rural broadband grants reach every county."),
+    ])
+    write_archive(tmp_path / "stefanik.txt", [
+        ("Dairy", "2024", "Congresswoman Stefanik visited a dairy farm."),
+        ("Defense", "2023", "The \"defense\" bill passed the House."),
+    ])
+    conn = connect(str(tmp_path / "releases.db"))
+    return conn, load_directory(conn, str(tmp_path))
+
+
+def test_loading_twice_inserts_nothing_new(tmp_path):
+    conn, first = load(tmp_path)
+    assert first == 4
+    assert load_directory(conn, str(tmp_path)) == 0
+    assert conn.execute("SELECT count(*) FROM releases").fetchone()[0] == 4
+    assert conn.execute("SELECT count(*) FROM releases_fts").fetchone()[0] == 4
+
+
+def test_search_treats_punctuation_and_quotes_as_text(tmp_path):
+    conn, _ = load(tmp_path)
+    assert titles(search(conn, "farm")) == ["Dairy", "Farm bill"]
+    assert titles(search(conn, "H.R. 1234")) == ["Farm bill"]
+    assert titles(search(conn, '"defense')) == ["Defense"]
+    assert titles(search(conn, "bill AND OR NOT")) == []
+    assert titles(search(conn, "farm", member="stefanik")) == ["Dairy"]
+
+
+def test_year_only_dates_match_ranges_inside_their_year(tmp_path):
+    conn, _ = load(tmp_path)
+    assert titles(search(conn, start="2024-01-01")) == ["Dairy", "Farm bill"]
+    assert titles(search(conn, start="2024-06-01", end="2024-06-30")) == ["Dairy"]
+    assert titles(search(conn, end="2023-12-31")) == ["Broadband", "Defense"]
+    assert titles(search(conn, start="2023-12-01", end="2024")) == ["Dairy", "Defense", "Farm bill"]
+    assert titles(search(conn, year=2024)) == ["Dairy", "Farm bill"]
@@ -0,0 +1,93 @@
+import asyncio
+import time
+import urllib.request
+
+import pytest
+
+import robots_policy
+from checkpoint import fetch_release
+from robots_policy import RobotsCache
+
+ROBOTS = b"User-agent: *\nDisallow: /private/\nCrawl-delay: 7\n"
+
+
+class Response:
+    status = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def robots(monkeypatch):
+    responses = [ROBOTS]
+
+    def urlopen(request, context=None, timeout=None):
+        body = responses.pop(0)
+        if isinstance(body, Exception):
+            raise body
+        return Response(body)
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    cache = RobotsCache(ttl=60)
+    cache.load_sync("https://example.com/press")
+    cache.responses = responses
+    return cache
+
+
+def expire(cache):
+    for host, (parser, _) in cache.policies.items():
+        cache.policies[host] = (parser, time.monotonic() - 1)
+
+
+def test_expired_policy_is_kept_when_the_reload_fails(robots):
+    robots.responses.append(OSError("connection reset"))
+    expire(robots)
+    robots.wait_sync("https://example.com/press/1")
+    assert not robots.can_fetch("https://example.com/private/1")
+    assert robots.delay("https://example.com/press/1") == 7
+    assert not robots._expired("https://example.com")
+
+
+def test_expired_policy_is_never_treated_as_allow_all(robots):
+    expire(robots)
+    assert not robots.can_fetch("https://example.com/private/1")
+    assert robots.delay("https://example.com/press/1") == 7
+
+
+def test_expired_policy_is_reloaded_before_the_next_request(robots):
+    robots.responses.append(b"User-agent: *\nDisallow: /drafts/\n")
+    expire(robots)
+    robots.enforce_delay = False
+    robots.wait_sync("https://example.com/press/1")
+    assert robots.can_fetch("https://example.com/private/1")
+    assert not robots.can_fetch("https://example.com/drafts/1")
+
+
+def test_concurrent_detail_fetches_are_spaced_by_the_crawl_delay(robots, monkeypatch):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    async def scrape(url):
+        return url
+
+    monkeypatch.setattr(robots_policy.asyncio, "sleep", sleep)
+    urls = [f"https://example.com/press/{number}" for number in range(3)]
+
+    async def crawl():
+        return await asyncio.gather(*(fetch_release(None, url, scrape, robots=robots) for url in urls))
+
+    assert asyncio.run(crawl()) == urls
+    assert sleeps[0] == pytest.approx(7, abs=0.1)
+    assert sleeps[1] == pytest.approx(14, abs=0.1)
@@ -0,0 +1,73 @@
+import asyncio
+import gc
+
+import aoc_press_releases as aoc
+from checkpoint import CrawlJournal
+from fixture_server import FixtureBundle, FixtureServer, local_base_url, start_in_thread
+from bench_scrapers import listing_key
+
+PAGES = 12
+PER_PAGE = 3
+CONCURRENCY = 5
+
+
+def release_number(page, entry):
+    return page * PER_PAGE + entry
+
+
+def aoc_bundle(directory):
+    # Listing pages 0..PAGES-1, each linking PER_PAGE detail pages; anything
+    # else (robots.txt, sitemap.xml, the page after the last) is a 404
+    bundle = FixtureBundle(str(directory), "https://ocasio-cortez.house.gov")
+    for page in range(PAGES):
+        entries = "".join(
+            f'<div class="h3"><a href="/media/press-releases/release-{release_number(page, entry)}">x</a></div>'
+            for entry in range(PER_PAGE))
+        bundle.put(listing_key("aoc", page), 200, "text/html", f"<html><body>{entries}</body></html>".encode())
+        for entry in range(PER_PAGE):
+            number = release_number(page, entry)
+            bundle.put(f"/media/press-releases/release-{number}", 200, "text/html", (
+                f'<html><body><h1 class="display-4">Release {number}</h1>'
+                f'<div class="evo-create-type"><div class="col-auto">May 1, 2024</div></div>'
+                f'<div class="evo-press-release__body"><p>Body of release {number}.</p></div>'
+                f'</body></html>').encode())
+    return bundle
+
+
+def lists_holding(numbers):
+    # Containers still referencing the release text of any of these releases
+    wanted = {f"Title: Release {number}\n" for number in numbers}
+    found = []
+    for obj in gc.get_objects():
+        if isinstance(obj, (list, tuple, dict)):
+            values = obj.values() if isinstance(obj, dict) else obj
+            if any(isinstance(value, str) and value[:value.find("\n") + 1] in wanted for value in values):
+                found.append(obj)
+    return found
+
+
+def test_releases_stream_to_disk_in_page_order(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(aoc.robots, "enforce_delay", False)
+    writes = []
+    write_page = CrawlJournal.write_page
+
+    def checked_write_page(journal, page, releases):
+        write_page(journal, page, releases)
+        # Earlier windows are on disk and nothing in memory still holds them
+        window_start = page - page % CONCURRENCY
+        on_disk = open(journal.filename, encoding='utf-8').read().count("==\n")
+        held = lists_holding(range(release_number(window_start, 0)))
+        writes.append((page, on_disk, len(held)))
+    monkeypatch.setattr(CrawlJournal, "write_page", checked_write_page)
+
+    port, stop = start_in_thread(FixtureServer(aoc_bundle(tmp_path / "fixtures")))
+    try:
+        scraped, filename = asyncio.run(aoc.scrape_all_press_releases(local_base_url("aoc", port), CONCURRENCY))
+    finally:
+        stop()
+
+    assert scraped == PAGES * PER_PAGE
+    assert writes == [(page, (page + 1) * PER_PAGE, 0) for page in range(PAGES)]
+    titles = [line for line in open(filename, encoding='utf-8').read().splitlines() if line.startswith("Title: ")]
+    assert titles == [f"Title: Release {number}" for number in range(PAGES * PER_PAGE)]
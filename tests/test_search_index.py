@@ -0,0 +1,97 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from search_index import SearchIndex, build_index, date_key, make_server
+
+
+def record(number, member, title, content, date_iso):
+    return {"id": f"{member}:{number}", "member": member, "title": title, "content": content,
+            "date": date_iso or "No date found", "date_iso": date_iso}
+
+
+RECORDS = [
+    record(0, "lee", "Farm bill", "The farm bill funds crop insurance for farm families.", "2024-03-01"),
+    record(1, "lee", "Broadband", "Rural broadband grants reach every county.", "2023-11-20"),
+    record(2, "stefanik", "Farm visit", "Visited a dairy farm and talked about the farm bill.", "2024"),
+    record(3, "stefanik", "Defense", "The defense bill passed the House.", "2023"),
+    record(4, "hawley", "Undated", "A farm statement with no date on the page.", None),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    # Round-trip through the memory-mapped snapshot, as the CLI and server load it
+    build_index(RECORDS).save(str(tmp_path))
+    return SearchIndex.load(str(tmp_path))
+
+
+def ids(hits):
+    return [hit["id"] for hit in hits]
+
+
+def test_postings_decode_to_the_documents_and_positions_of_a_term(index):
+    doc_ids, entries = index.postings("farm")
+    assert doc_ids.tolist() == [0, 2, 4]
+    # "Farm visit\nVisited a dairy farm ..." has farm at token 0, 5 and 10
+    assert index.positions(entries[1]).tolist() == [0, 5, 10]
+    assert len(index.postings("nonexistent")[0]) == 0
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity(index):
+    hits = index.search("farm")
+    assert ids(hits) == ["lee:0", "stefanik:2", "hawley:4"]
+    assert hits[0]["score"] > hits[1]["score"] > hits[2]["score"]
+    # "dairy" is in one document, so it outweighs the common "farm"
+    assert ids(index.search("farm dairy"))[0] == "stefanik:2"
+
+
+def test_phrase_query_requires_adjacent_terms(index):
+    assert ids(index.search('"farm bill"')) == ["lee:0", "stefanik:2"]
+    assert ids(index.search('"bill farm"')) == []
+
+
+def test_member_filter(index):
+    assert sorted(ids(index.search("bill", member="stefanik"))) == ["stefanik:2", "stefanik:3"]
+    assert index.search("bill", member="nobody") == []
+
+
+def test_year_only_release_matches_any_range_inside_its_year(index):
+    assert ids(index.search("farm", start="2024-01-01")) == ["lee:0", "stefanik:2"]
+    assert ids(index.search("farm", start="2024-06-01", end="2024-06-30")) == ["stefanik:2"]
+    assert ids(index.search("farm", end="2023-12-31")) == []
+    assert sorted(ids(index.search("bill", start="2023", end="2023"))) == ["stefanik:3"]
+    assert sorted(ids(index.search("bill", start="2023-06-01", end="2024-02-01"))) == ["stefanik:2", "stefanik:3"]
+
+
+def test_undated_release_is_left_out_of_date_filters(index):
+    assert "hawley:4" in ids(index.search("farm"))
+    assert "hawley:4" not in ids(index.search("farm", end="2030-01-01"))
+
+
+def test_date_key_rejects_malformed_dates():
+    assert date_key("2024-03-01") == 20240301
+    assert date_key("2024", end=True) == 20241231
+    for value in ("yesterday", "2024-13-01", "24"):
+        with pytest.raises(ValueError):
+            date_key(value)
+
+
+def test_server_answers_bad_dates_with_400(index):
+    server = make_server(index, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/search"
+    try:
+        with urllib.request.urlopen(f"{base}?q=farm&start=2024-01-01") as response:
+            assert [hit["id"] for hit in json.load(response)] == ["lee:0", "stefanik:2"]
+        for query in ("q=farm&start=last-week", "q=farm&end=2024-02-30", "q=farm&limit=many"):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f"{base}?{query}")
+            assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
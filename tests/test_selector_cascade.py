@@ -0,0 +1,79 @@
+from bs4 import BeautifulSoup
+
+import manchin_press_releases
+from selector_cascade import SelectorCascade
+
+
+def soup(html):
+    return BeautifulSoup(html, 'html.parser')
+
+
+def find(tag, class_name):
+    return lambda page: page.find(tag, class_=class_name)
+
+
+def test_the_usual_winner_is_tried_first_per_template():
+    cascade = SelectorCascade("test", "content", [
+        ("div.old", find("div", "old")),
+        ("div.new", find("div", "new")),
+        ("body", lambda page: page.body),
+    ], catch_all=["body"], templates=("redesign",))
+    new_page = soup('<body class="redesign"><div class="new">text</div></body>')
+    old_page = soup('<body><div class="old">text</div></body>')
+    for _ in range(3):
+        assert cascade.extract(new_page).text == "text"
+        assert cascade.extract(old_page).text == "text"
+
+    assert cascade.order("redesign") == ["div.new", "div.old", "body"]
+    assert cascade.order("default") == ["div.old", "div.new", "body"]
+
+
+def test_catch_all_stays_last_even_when_it_wins():
+    cascade = SelectorCascade("test", "content", [
+        ("div.body", find("div", "body")),
+        ("body", lambda page: page.body),
+    ], catch_all=["body"])
+    for _ in range(5):
+        cascade.extract(soup("<body><p>no content div</p></body>"))
+    assert cascade.order("default") == ["div.body", "body"]
+
+
+def test_fixed_strategies_keep_their_written_order():
+    cascade = SelectorCascade("test", "content", [
+        ("a", find("div", "a")),
+        ("b", find("div", "b")),
+        ("c", find("div", "c")),
+    ], fixed=["a", "b"])
+    for _ in range(5):
+        cascade.extract(soup('<div class="b">b</div>'))
+        cascade.extract(soup('<div class="c">c</div>'))
+        cascade.extract(soup('<div class="c">c</div>'))
+    assert cascade.order("default") == ["c", "a", "b"]
+    assert cascade.extract(soup('<div class="a">a</div><div class="b">b</div>')).text == "a"
+
+
+def test_stats_report_hit_rates_and_first_choice_rate():
+    cascade = SelectorCascade("test", "title", [
+        ("h1", lambda page: page.h1),
+        ("h2", lambda page: page.h2),
+    ])
+    cascade.extract(soup("<h1>one</h1>"))
+    cascade.extract(soup("<h2>two</h2>"))
+    cascade.extract(soup("<p>none</p>"))
+
+    stats = cascade.stats()["default"]
+    assert stats["lookups"] == 3
+    assert stats["first_choice_rate"] == 1 / 3
+    assert stats["selectors"]["h1"] == {"tries": 3, "hits": 1, "hit_rate": 1 / 3}
+    assert stats["selectors"]["h2"] == {"tries": 2, "hits": 1, "hit_rate": 0.5}
+    assert "test title [default]: 3 lookups" in cascade.summary()
+
+
+def test_manchin_content_matches_the_old_paragraph_first_output():
+    press_page = soup('<div id="newscontent"><div class="article"><div id="press">'
+                      '<div>First block</div><div>Second block</div></div></div></div>')
+    mixed_page = soup('<div id="newscontent"><div class="article"><div id="press">'
+                      '<div><p>Paragraph one</p></div><div>Loose block</div></div></div></div>')
+    for _ in range(10):
+        assert manchin_press_releases.extract_content(press_page) == "First block\n\nSecond block"
+    assert manchin_press_releases.extract_content(mixed_page) == "Paragraph one"
@@ -0,0 +1,49 @@
+from lexicon import Lexicon, load_terms
+import speech_corrector
+from speech_corrector import clean_text, process_release
+
+
+def test_urls_survive_cleaning_and_correction():
+    text = "Watch it here: https://t.co/sX6LuX7oRk and www.sanders.senate.gov/news?id=12"
+    assert process_release(text) == "Watch it here : https://t.co/sX6LuX7oRk and www.sanders.senate.gov/news?id=12"
+
+
+def test_emails_and_bill_numbers_pass_through():
+    text = "Contact press@markey.senate.gov about H.R. 1234, S. 567 and S.J.Res. 5.Reporters welcome."
+    assert process_release(text) == ("Contact press@markey.senate.gov about H.R. 1234, S. 567 and S.J.Res. 5. "
+                                     "Reporters welcome.")
+
+
+def test_contractions_stay_whole():
+    text = "We don’t agree, and the Senate's bill won't pass."
+    assert clean_text(text) == text
+    assert process_release(text) == text
+
+
+def test_quotes_are_still_spaced_and_misspellings_corrected():
+    assert process_release('Teh senator said:"no".') == 'The senator said : " no " .'
+
+
+def test_sections_are_cleaned_separately():
+    assert process_release("First   paragraph.\n\nSecond\nparagraph.") == "First paragraph.\n\nSecond paragraph."
+
+
+def test_lexicon_words_are_not_corrected(monkeypatch):
+    monkeypatch.setattr(speech_corrector, "LEXICON", frozenset({"ossoff"}))
+    assert process_release("Senator Ossoff’s bill") == "Senator Ossoff’s bill"
+
+
+def test_mined_names_survive_process_release(monkeypatch, tmp_path):
+    lexicon = Lexicon()
+    for number in range(5):
+        lexicon.add_release({"content": f"Today Governor DeSantis, Leader McConnell and Rep. LaHood met on bill {number}."})
+    path = str(tmp_path / "lexicon.json")
+    lexicon.save(path)
+    monkeypatch.setattr(speech_corrector, "LEXICON", load_terms(path))
+
+    text = "Governor DeSantis thanked Leader McConnell’s staff and Rep. LaHood."
+    assert process_release(text) == text
+
+
+def test_run_together_words_outside_the_lexicon_are_still_split():
+    assert process_release("the Senate passed theBill") == "the Senate passed the Bill"